@@ -0,0 +1,486 @@
+"""
+다른 시스템이 납입요청서를 요청할 수 있는 로컬 HTTP 렌더링 API.
+앱(app.py)과 같은 파이프라인/캐시를 쓰며, 앱 프로세스에서 띄우면 상주 LibreOffice 서버 풀과
+템플릿/워크북 캐시를 그대로 공유한다. HTTP/1.1 keep-alive 로 연결을 재사용한다.
+
+    POST /render   (multipart/form-data)
+        docx    워드 템플릿 (필수)
+        xlsx    엑셀 파일 — 없으면 cells 만으로 채움
+        cells   {"B5": 값, ...} JSON — 엑셀 값 위에 덮어씀
+        sheet, name, engine(docx|xml), format(zip|docx|pdf, 기본 zip)
+        → 문서 1건 (DOCX / PDF / ZIP)
+
+    POST /batch    (multipart/form-data)
+        docx, xlsx, sheet, start_row, name_col, engine, workers, pdf(1|0)
+        (workers 기본 1 = 요청 스레드에서 렌더링. 2 이상이면 요청마다 렌더링 프로세스 풀을 띄우므로
+         기동 시간보다 렌더링이 훨씬 긴 큰 배치에서만, 최대 RENDER_WORKERS)
+        또는 xlsx 대신 rows: [{"B": 값, ...}, ...] JSON (+ 고정 셀 cells)
+        → 행별 DOCX(+PDF) 를 끝나는 대로 담아 보내는 ZIP (chunked 전송)
+          실패한 행은 마지막 errors.txt 에 기록
+
+    GET /health
+
+    python api.py --port 8510           # 단독 실행
+    API_PORT=8510 streamlit run app.py  # 앱과 같은 프로세스에서 실행
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from openpyxl.utils.exceptions import InvalidFileException
+
+import converter
+from archive import add_member
+from cache import cached_cells, cached_sheetnames, compiled_template, content_hash
+from converter import POOL_SIZE, ConverterPool
+from engine import TEMPLATE_ENGINES, render_batch, sheet_name
+from lru import SizedLRU
+from pipeline import (
+    build_zip,
+    convert_docx_to_pdf_bytes,
+    default_out,
+    ensure_docx,
+    ensure_pdf,
+    finish_run,
+    row_stem,
+    zip_file_name,
+)
+from render_pool import RENDER_WORKERS
+from timing import StageTimer
+
+# 0 이면 앱에서 API 서버를 띄우지 않음 (단독 실행은 --port)
+API_HOST = os.environ.get("API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("API_PORT", "0"))
+# 동시에 처리할 생성 요청 수 (넘으면 앞 요청이 끝날 때까지 대기)
+API_WORKERS = int(os.environ.get("API_WORKERS", "4"))
+# 요청 본문 크기 상한 (MB)
+API_MAX_MB = int(os.environ.get("API_MAX_MB", "50"))
+
+_MIME = {
+    "zip": "application/zip",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pdf": "application/pdf",
+}
+_STREAM_CHUNK = 64 * 1024
+
+
+class RequestError(Exception):
+    """클라이언트에 status 로 돌려줄 요청 오류"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- 요청 파싱 ---------- #
+
+def parse_form(content_type: str, body: bytes) -> Dict[str, bytes]:
+    """multipart/form-data 본문 → {필드 이름: 값 bytes}"""
+    if not content_type.startswith("multipart/form-data"):
+        raise RequestError(415, "multipart/form-data 로 보내야 합니다.")
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    if not message.is_multipart():
+        raise RequestError(400, "multipart 본문을 읽을 수 없습니다.")
+    form = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            form[name] = part.get_payload(decode=True) or b""
+    return form
+
+
+def _text(form: Dict[str, bytes], name: str, default: Optional[str] = None) -> Optional[str]:
+    value = form.get(name)
+    if value is None:
+        return default
+    try:
+        return value.decode("utf-8").strip() or default
+    except UnicodeDecodeError:
+        raise RequestError(400, f"{name} 는 UTF-8 문자열이어야 합니다.")
+
+
+def _int(form: Dict[str, bytes], name: str, default: int, minimum: Optional[int] = None) -> int:
+    try:
+        value = int(_text(form, name) or default)
+    except ValueError:
+        raise RequestError(400, f"{name} 는 정수여야 합니다.")
+    if minimum is not None and value < minimum:
+        raise RequestError(400, f"{name} 는 {minimum} 이상이어야 합니다.")
+    return value
+
+
+def _json(form: Dict[str, bytes], name: str, kind: type):
+    raw = form.get(name)
+    if raw is None:
+        return None
+    try:
+        value = json.loads(raw)
+    except ValueError as e:
+        raise RequestError(400, f"{name} JSON 을 읽을 수 없습니다: {e}")
+    if not isinstance(value, kind):
+        raise RequestError(400, f"{name} 는 JSON {kind.__name__} 이어야 합니다.")
+    return value
+
+
+def _template(form: Dict[str, bytes]):
+    docx = form.get("docx")
+    if not docx:
+        raise RequestError(400, "워드 템플릿(docx)이 필요합니다.")
+    engine = _text(form, "engine", "docx")
+    if engine not in TEMPLATE_ENGINES:
+        raise RequestError(400, f"engine 은 {', '.join(TEMPLATE_ENGINES)} 중 하나여야 합니다.")
+    return docx, engine, compiled_template(docx, content_hash(docx), engine)
+
+
+def _sheet(form: Dict[str, bytes], xlsx: bytes, xlsx_hash: str) -> str:
+    return sheet_name(cached_sheetnames(xlsx, xlsx_hash), _text(form, "sheet"))
+
+
+def _base_name(form: Dict[str, bytes]) -> str:
+    name = _text(form, "name", "")
+    return ensure_docx(name) if name else default_out()
+
+
+# ---------- 단건 ---------- #
+
+def render_one(form: Dict[str, bytes], pool: Optional[ConverterPool]) -> Tuple[str, str, bytes]:
+    """/render → (파일 이름, 형식, 내용)"""
+    fmt = _text(form, "format", "zip")
+    if fmt not in _MIME:
+        raise RequestError(400, "format 은 zip, docx, pdf 중 하나여야 합니다.")
+    inline = _json(form, "cells", dict) or {}
+    xlsx = form.get("xlsx")
+    if not xlsx and not inline:
+        raise RequestError(400, "엑셀 파일(xlsx) 또는 셀 값(cells) 이 필요합니다.")
+
+    _, engine, template = _template(form)
+    name = _base_name(form)
+    timer = StageTimer("api")
+    try:
+        cells: Dict[str, Any] = {}
+        if xlsx:
+            xlsx_hash = content_hash(xlsx)
+            with timer.stage("엑셀 로드", len(xlsx)):
+                cells = cached_cells(xlsx, _sheet(form, xlsx, xlsx_hash), template.addrs, xlsx_hash)
+        cells.update(inline)
+        docx_bytes = template.render(cells, stage=timer.stage)
+        if fmt == "docx":
+            finish_run(timer, engine, "success", format=fmt)
+            return name, fmt, docx_bytes
+
+        notes: List[str] = []
+        with timer.stage("PDF 변환", len(docx_bytes)) as rec:
+            pdf_bytes = convert_docx_to_pdf_bytes(
+                docx_bytes, pool, verbose=False, notify=lambda level, text: notes.append(text)
+            )
+            rec["bytes_out"] = len(pdf_bytes or b"")
+        if fmt == "pdf":
+            if pdf_bytes is None:
+                raise RequestError(502, "PDF 변환 실패" + "".join(f": {n}" for n in notes))
+            finish_run(timer, engine, "success", format=fmt)
+            return ensure_pdf(name[: -len(".docx")]), fmt, pdf_bytes
+
+        out = io.BytesIO()
+        with timer.stage("ZIP 묶기"):
+            build_zip(out, docx_bytes, pdf_bytes, pdf_bytes is not None, name)
+    except Exception as e:
+        finish_run(timer, engine, "failure", format=fmt, error=repr(e))
+        raise
+    finish_run(timer, engine, "success", format=fmt, pdf_ok=pdf_bytes is not None)
+    return zip_file_name(name), fmt, out.getvalue()
+
+
+# ---------- 일괄 ---------- #
+
+def _inline_rows(
+    rows: List[Any], fixed: Dict[str, Any], template
+) -> Iterator[Tuple[int, Dict[str, Any], Optional[bytes], Optional[str]]]:
+    """rows JSON 을 render_batch 와 같은 (행 번호, 행 값, DOCX, 오류) 로 렌더링"""
+    for index, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            yield index, {}, None, "행은 {열: 값} JSON 객체여야 합니다."
+            continue
+        try:
+            yield index, row, template.render(fixed, row), None
+        except Exception as e:
+            yield index, row, None, f"{type(e).__name__}: {e}"
+
+
+def render_stream(
+    form: Dict[str, bytes], pool: Optional[ConverterPool], out
+) -> Dict[str, int]:
+    """
+    /batch: 행별 문서를 렌더링하는 대로 ZIP 멤버로 out 에 흘려보낸다.
+    PDF 변환은 서버 풀 크기만큼 병렬로 돌리고 끝나는 순서대로 넣는다
+    (같은 내용의 문서는 변환 한 번만).
+    """
+    docx, engine, template = _template(form)
+    rows = _json(form, "rows", list)
+    xlsx = form.get("xlsx")
+    if not xlsx and rows is None:
+        raise RequestError(400, "엑셀 파일(xlsx) 또는 행 값(rows) 이 필요합니다.")
+    with_pdf = _text(form, "pdf", "1") not in ("0", "false", "no")
+    name_col = (_text(form, "name_col") or "").upper() or None
+    base = _base_name(form)[: -len(".docx")]
+
+    if rows is not None:
+        results = _inline_rows(rows, _json(form, "cells", dict) or {}, template)
+    else:
+        xlsx_hash = content_hash(xlsx)
+        sheet = _sheet(form, xlsx, xlsx_hash)
+        results = render_batch(
+            xlsx,
+            docx,
+            sheet,
+            start_row=_int(form, "start_row", 2, minimum=1),
+            extra_cols=[name_col] if name_col else (),
+            # 프로세스 풀 기동(spawn)이 요청마다 수 초라 기본은 요청 스레드에서 렌더링
+            workers=min(RENDER_WORKERS, _int(form, "workers", 1, minimum=1)),
+            template=template,
+            # 고정 셀은 앱/단건 API 와 같은 워크북 캐시에서 (같은 엑셀을 다시 읽지 않음)
+            fixed=cached_cells(xlsx, sheet, template.addrs, xlsx_hash),
+        )
+    # 첫 행까지 렌더링해 봐야 입력 오류(시트/토큰 없음 등)를 응답 전에 알 수 있다
+    first = next(results, None)
+
+    timer = StageTimer("api_batch")
+    count = pdf_failed = 0
+    errors: List[str] = []
+    pdf_memo = SizedLRU(64 * 1024 * 1024)
+    inflight: Dict[str, Tuple[Future, List[str]]] = {}  # DOCX 해시 → (변환, 이 내용의 파일명들)
+
+    def convert(docx_bytes: bytes) -> Optional[bytes]:
+        return convert_docx_to_pdf_bytes(docx_bytes, pool, verbose=False)
+
+    def finish(done):
+        nonlocal pdf_failed
+        for digest in [d for d, (fut, _) in inflight.items() if fut in done]:
+            fut, stems = inflight.pop(digest)
+            pdf_bytes = fut.result()
+            if pdf_bytes is None:
+                pdf_failed += len(stems)
+                continue
+            pdf_memo.put(digest, pdf_bytes, len(pdf_bytes))
+            for stem in stems:
+                add_member(zf, f"{stem}.pdf", pdf_bytes)
+            out.flush()
+
+    try:
+        with ThreadPoolExecutor(POOL_SIZE, thread_name_prefix="api-pdf") as executor, \
+                ZipFile(out, "w", ZIP_DEFLATED) as zf:
+            used = set()
+            item = first
+            while item is not None:
+                row_idx, row, docx_bytes, error = item
+                if error:
+                    errors.append(f"{row_idx}행: {error}")
+                else:
+                    stem = row_stem(base, row_idx, row, name_col, used)
+                    add_member(zf, f"{stem}.docx", docx_bytes)
+                    count += 1
+                    if with_pdf:
+                        digest = content_hash(docx_bytes)
+                        pdf_bytes = pdf_memo.get(digest)
+                        if pdf_bytes is not None:
+                            add_member(zf, f"{stem}.pdf", pdf_bytes)
+                        elif digest in inflight:
+                            inflight[digest][1].append(stem)
+                        else:
+                            inflight[digest] = (executor.submit(convert, docx_bytes), [stem])
+                    out.flush()
+                finish({fut for fut, _ in inflight.values() if fut.done()})
+                with timer.stage("행별 렌더링"):
+                    item = next(results, None)
+            while inflight:
+                done, _ = wait([fut for fut, _ in inflight.values()], return_when=FIRST_COMPLETED)
+                finish(done)
+            if errors:
+                zf.writestr("errors.txt", "\n".join(errors) + "\n")
+    except Exception as e:
+        finish_run(timer, engine, "failure", error=repr(e))
+        raise
+    finish_run(
+        timer,
+        engine,
+        "success" if count and not errors else "failure",
+        documents=count,
+        render_failed=len(errors),
+        pdf_failed=pdf_failed,
+    )
+    return {"documents": count, "render_failed": len(errors), "pdf_failed": pdf_failed}
+
+
+class _ChunkedWriter:
+    """HTTP chunked 전송 본문. flush 할 때 모인 내용을 청크 하나로 보낸다"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.buf = bytearray()
+
+    def write(self, data) -> int:
+        self.buf += data
+        if len(self.buf) >= _STREAM_CHUNK:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buf:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(self.buf), self.buf))
+            self.wfile.flush()
+            self.buf.clear()
+
+    def close(self):
+        self.flush()
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+# ---------- HTTP ---------- #
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server_version = "leewoon-render"
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/health":
+            self._send_json(404, {"error": "없는 경로입니다."})
+            return
+        self._send_json(200, {"status": "ok", "pdf": self.server.pool is not None})
+
+    def do_POST(self):
+        route = {"/render": self._render, "/batch": self._batch}.get(self.path.split("?")[0])
+        try:
+            form = self._read_form()
+            if route is None:
+                raise RequestError(404, "없는 경로입니다.")
+            with self.server.slots:
+                route(form)
+        except RequestError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except InvalidFileException as e:
+            self._send_json(422, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": f"문서 생성 실패 ({e!r})"})
+
+    def _read_form(self) -> Dict[str, bytes]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > API_MAX_MB * 1024 * 1024:
+            # 본문을 읽지 않고 응답하므로 연결을 재사용할 수 없다
+            self.close_connection = True
+            raise RequestError(413, f"요청 본문이 {API_MAX_MB}MB 를 넘습니다.")
+        body = self.rfile.read(length)
+        return parse_form(self.headers.get("Content-Type", ""), body)
+
+    def _render(self, form: Dict[str, bytes]):
+        file_name, fmt, data = render_one(form, self.server.pool)
+        self.send_response(200)
+        self.send_header("Content-Type", _MIME[fmt])
+        self.send_header("Content-Disposition", _attachment(file_name))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _batch(self, form: Dict[str, bytes]):
+        out = _ChunkedWriter(self.wfile)
+        started = False
+
+        def start():
+            nonlocal started
+            started = True
+            self.send_response(200)
+            self.send_header("Content-Type", _MIME["zip"])
+            base = _base_name(form)[: -len(".docx")]
+            self.send_header("Content-Disposition", _attachment(f"{base}_batch.zip"))
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        class _Deferred:
+            """첫 출력 전까지 응답 헤더를 미뤄, 입력 오류는 오류 응답으로 돌려준다"""
+
+            def write(self, data):
+                if not started:
+                    start()
+                return out.write(data)
+
+            def flush(self):
+                if started:
+                    out.flush()
+
+        try:
+            render_stream(form, self.server.pool, _Deferred())
+        except Exception:
+            if not started:
+                raise
+            # 응답 중간에는 상태를 바꿀 수 없으므로 연결을 끊어 잘린 ZIP 임을 알린다
+            self.close_connection = True
+            return
+        out.close()
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _attachment(file_name: str) -> str:
+    return f"attachment; filename*=UTF-8''{quote(file_name)}"
+
+
+def start_server(
+    pool: Optional[ConverterPool] = None, host: str = API_HOST, port: int = API_PORT
+) -> Optional[ThreadingHTTPServer]:
+    """API 를 서비스하는 데몬 스레드. 포트가 0 이거나 이미 쓰이면 None"""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    server.pool = pool
+    server.slots = threading.BoundedSemaphore(max(1, API_WORKERS))
+    threading.Thread(target=server.serve_forever, name="render-api", daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="로컬 HTTP 렌더링 API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT or 8510)
+    parser.add_argument("--no-pdf", action="store_true", help="상주 LibreOffice 서버 풀 없이 실행")
+    args = parser.parse_args(argv)
+
+    pool = None if args.no_pdf else converter.start_pool()
+    server = start_server(pool, args.host, args.port)
+    if server is None:
+        print(f"{args.host}:{args.port} 에서 서버를 열 수 없습니다.", file=sys.stderr)
+        return 1
+    print(f"http://{args.host}:{args.port} 에서 대기 중 (PDF 서버 풀: {'있음' if pool else '없음'})",
+          file=sys.stderr)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,264 +1,112 @@
-import io
 import os
-import re
-import subprocess
-import tempfile
-import platform
-from datetime import date, datetime
-from decimal import Decimal
+from datetime import date
 from typing import Optional
-from zipfile import BadZipFile, ZipFile, ZIP_DEFLATED
 
 import streamlit as st
-from docx import Document
-from docx.table import _Cell
-from docx.text.paragraph import Paragraph
-from openpyxl import Workbook, load_workbook
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from openpyxl.utils.exceptions import InvalidFileException
 
+from api import start_server as start_api_server
+from blobstore import BLOB_STORE, Blob
+from cache import RESULT_CACHE, cached_sheetnames, result_key
+from converter import ConverterPool, start_pool
+from engine import TARGET_SHEET, TEMPLATE_ENGINES
+from jobs import DONE, FAILED, QUEUED, Job, JobQueue
+import pdf_batch
+from metrics import GENERATIONS, REGISTRY, SESSIONS
+from metrics import start_server as start_metrics_server
+from pipeline import default_out, ensure_docx, run_batch, run_single, zip_file_name
+from render_pool import RENDER_WORKERS
+from timing import StageTimer
 from ui_style import inject as inject_style
 
-# docx → pdf (MS Word or LibreOffice)
-try:
-    from docx2pdf import convert as docx2pdf_convert
-except Exception:
-    docx2pdf_convert = None
+# 진행 중인 작업 상태를 다시 그리는 주기(초)
+JOB_POLL = float(os.environ.get("JOB_POLL", "1.0"))
 
-TOKEN_RE = re.compile(r"\{\{([A-Z]+[0-9]+)(?:\|([^}]+))?\}\}")
-DEFAULT_OUT = f"{datetime.today():%Y%m%d}_#_납입요청서_DB저축은행.docx"
-TARGET_SHEET = "2. 배정후 청약시"
 
+# ---------- 공유 자원 ---------- #
 
-# ---------- 유틸 ---------- #
-
-def ensure_docx(name: str) -> str:
-    name = (name or "").strip()
-    return name if name.lower().endswith(".docx") else name + ".docx"
-
-
-def ensure_pdf(name: str) -> str:
-    base = (name or "output").strip()
-    return base if base.lower().endswith(".pdf") else base + ".pdf"
-
-
-def has_soffice() -> bool:
-    try:
-        subprocess.run(
-            ["soffice", "--version"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=False,
+@st.cache_resource(show_spinner=False)
+def get_pdf_pool() -> Optional[ConverterPool]:
+    """프로세스 전체에서 공유하는 상주 LibreOffice 서버 풀 (앱 기동 시 pre-warm)"""
+    pool = start_pool()
+    if pool is not None:
+        REGISTRY.gauge_func(
+            "leewoon_conversion_queue_depth",
+            "유휴 LibreOffice 서버를 기다리는 PDF 변환 요청 수",
+            lambda: pool.waiting,
         )
-        return True
-    except FileNotFoundError:
-        return False
-
-
-def try_format_as_date(v) -> str:
-    try:
-        if isinstance(v, (datetime, date)):
-            return f"{v.year}. {v.month}. {v.day}."
-        if isinstance(v, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", v.strip()):
-            dt = datetime.strptime(v.strip(), "%Y-%m-%d").date()
-            return f"{dt.year}. {dt.month}. {dt.day}."
-    except Exception:
-        pass
-    return ""
-
-
-def fmt_number(v) -> str:
-    try:
-        if isinstance(v, (int, float, Decimal)):
-            return f"{float(v):,.0f}"
-        if isinstance(v, str):
-            raw = v.replace(",", "")
-            if re.fullmatch(r"-?\d+(\.\d+)?", raw):
-                return f"{float(raw):,.0f}"
-    except Exception:
-        pass
-    return ""
-
-
-def value_to_text(v) -> str:
-    s = try_format_as_date(v)
-    if s:
-        return s
-    s = fmt_number(v)
-    if s:
-        return s
-    return "" if v is None else str(v)
-
-
-def apply_inline_format(value, fmt: Optional[str]) -> str:
-    if not fmt or not fmt.strip():
-        return value_to_text(value)
-
-    # 날짜 포맷
-    if any(tok in fmt for tok in ("YYYY", "MM", "DD")):
-        if isinstance(value, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", value.strip()):
-            value = datetime.strptime(value.strip(), "%Y-%m-%d").date()
-        if isinstance(value, (datetime, date)):
-            f = fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d")
-            return value.strftime(f)
-        return value_to_text(value)
-
-    # 숫자 포맷
-    if re.fullmatch(r"[#,0]+(?:\.[0#]+)?", fmt.replace(",", "")):
-        try:
-            num = float(str(value).replace(",", ""))
-            decimals = len(fmt.split(".")[1]) if "." in fmt else 0
-            return f"{num:,.{decimals}f}"
-        except Exception:
-            return value_to_text(value)
+        REGISTRY.gauge_func(
+            "leewoon_conversion_servers",
+            "상주 LibreOffice 서버 수 (사용 중/유휴)",
+            lambda: {(("state", "busy"),): pool.busy, (("state", "idle"),): pool.idle.qsize()},
+        )
+    return pool
 
-    return value_to_text(value)
 
+@st.cache_resource(show_spinner=False)
+def get_job_queue() -> JobQueue:
+    """프로세스 전체에서 공유하는 생성 작업 큐 (동시 실행 수 제한 + 세션별 공정 순번)"""
+    queue = JobQueue()
+    REGISTRY.gauge_func(
+        "leewoon_job_queue_depth", "실행을 기다리는 생성 작업 수", lambda: queue.depth
+    )
+    return queue
 
-# ---------- DOCX 치환 ---------- #
 
-def replace_in_paragraph(paragraph: Paragraph, repl_func):
-    if not paragraph.text:
-        return
-    new_text = repl_func(paragraph.text)
-    if new_text == paragraph.text:
-        return
-    for run in paragraph.runs:
-        run.text = ""
-    if paragraph.runs:
-        paragraph.runs[0].text = new_text
-    else:
-        paragraph.add_run(new_text)
-
-
-def replace_in_table(cell: _Cell, repl_func):
-    for p in cell.paragraphs:
-        replace_in_paragraph(p, repl_func)
-    for t in cell.tables:
-        for row in t.rows:
-            for c in row.cells:
-                replace_in_table(c, repl_func)
-
-
-def iter_block_items(parent):
-    if hasattr(parent, "paragraphs") and hasattr(parent, "tables"):
-        for p in parent.paragraphs:
-            yield p
-        for t in parent.tables:
-            for row in t.rows:
-                for cell in row.cells:
-                    for item in iter_block_items(cell):
-                        yield item
-
-
-def replace_everywhere(doc: Document, repl_func):
-    for item in iter_block_items(doc):
-        if isinstance(item, Paragraph):
-            replace_in_paragraph(item, repl_func)
-    for section in doc.sections:
-        for container in (section.header, section.footer):
-            for item in iter_block_items(container):
-                if isinstance(item, Paragraph):
-                    replace_in_paragraph(item, repl_func)
-
-
-def make_replacer(ws):
-    def _repl(text: str) -> str:
-        def sub(m):
-            addr, fmt = m.group(1), m.group(2)
-            try:
-                v = ws[addr].value
-            except Exception:
-                v = None
-            return apply_inline_format(v, fmt)
+@st.cache_resource(show_spinner=False)
+def get_metrics_server():
+    """Prometheus 지표 엔드포인트 (METRICS_HOST:METRICS_PORT/metrics, 프로세스당 1개)"""
+    return start_metrics_server()
 
-        replaced = TOKEN_RE.sub(sub, text)
 
-        today = datetime.today()
-        today_str = f"{today.year}년 {today.month}월 {today.day}일"
-        for token in ("YYYY년 MM월 DD일", "YYYY 년 MM 월 DD 일"):
-            replaced = replaced.replace(token, today_str)
+@st.cache_resource(show_spinner=False)
+def get_api_server():
+    """로컬 HTTP 렌더링 API (API_PORT 가 0 이 아니면, 앱의 PDF 서버 풀/캐시를 공유)"""
+    return start_api_server(get_pdf_pool())
 
-        return replaced
 
-    return _repl
+# ---------- Streamlit UI ---------- #
 
+def observe_session():
+    """이 세션이 참조하는 업로드 파일 크기를 지표에 기록하고 저장소 참조를 갱신"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    BLOB_STORE.touch(ctx.session_id)
+    SESSIONS.observe(
+        ctx.session_id,
+        len(st.session_state.xlsx_data or b"") + len(st.session_state.docx_data or b""),
+    )
 
-# ---------- 엑셀/워드 로드 & PDF 변환 ---------- #
 
-def load_workbook_from_bytes(data: bytes, filename: str = "file.xlsx") -> Workbook:
-    if not data:
-        raise InvalidFileException("엑셀 파일이 비어 있습니다 (0 bytes).")
-    try:
-        return load_workbook(filename=io.BytesIO(data), data_only=True)
-    except BadZipFile:
-        raise InvalidFileException("엑셀 파일이 손상되었거나 XLS 형식일 수 있습니다.")
-    except Exception as e:
-        raise InvalidFileException(f"엑셀 파일 로드 오류: {e}")
+def init_session_state():
+    # *_data 는 bytes 가 아니라 저장소의 Blob 핸들 (*_hash 는 그 내용 해시)
+    for key in (
+        "xlsx_data", "xlsx_name", "xlsx_hash", "xlsx_file_id",
+        "docx_data", "docx_name", "docx_hash", "docx_file_id",
+    ):
+        if key not in st.session_state:
+            st.session_state[key] = None
 
 
-def convert_docx_to_pdf_bytes(docx_bytes: bytes) -> Optional[bytes]:
+def store_upload(kind: str, uploaded) -> Blob:
     """
-    DOCX → PDF 변환.
-    - 1순위: Windows + MS Word(docx2pdf)
-    - 2순위: LibreOffice(soffice)
+    업로드 파일을 디스크 저장소로 옮기고 세션에는 Blob 만 남긴다.
+    같은 업로드(file_id)는 재실행마다 다시 쓰지 않고, 세션별 참조를 옮겨 잡는다.
     """
-    try:
-        with tempfile.TemporaryDirectory() as td:
-            in_path = os.path.join(td, "doc.docx")
-            out_path = os.path.join(td, "doc.pdf")
-
-            with open(in_path, "wb") as f:
-                f.write(docx_bytes)
-
-            system = platform.system().lower()
-
-            # 1) Windows + docx2pdf (Word) 우선
-            if system == "windows" and docx2pdf_convert is not None:
-                try:
-                    st.info("PDF 변환: MS Word(docx2pdf) 엔진 사용 중...")
-                    docx2pdf_convert(in_path, out_path)
-                    if os.path.exists(out_path):
-                        with open(out_path, "rb") as f:
-                            return f.read()
-                except Exception as e:
-                    st.warning(f"MS Word(docx2pdf) 변환 실패, LibreOffice로 재시도합니다. ({e})")
-
-            # 2) LibreOffice(soffice)
-            if has_soffice():
-                try:
-                    st.info("PDF 변환: LibreOffice(soffice) 엔진 사용 중 (폰트가 일부 바뀔 수 있습니다).")
-                    subprocess.run(
-                        [
-                            "soffice",
-                            "--headless",
-                            "--convert-to",
-                            "pdf",
-                            in_path,
-                            "--outdir",
-                            td,
-                        ],
-                        check=True,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                    )
-                    if os.path.exists(out_path):
-                        with open(out_path, "rb") as f:
-                            return f.read()
-                except Exception as e:
-                    st.error(f"LibreOffice 변환 실패: {e}")
-
-    except Exception as e:
-        st.error(f"PDF 변환 중 예외 발생: {e}")
-
-    return None
-
-
-# ---------- Streamlit UI ---------- #
-
-def init_session_state():
-    for key in ("xlsx_data", "xlsx_name", "docx_data", "docx_name"):
-        if key not in st.session_state:
-            st.session_state[key] = None
+    if st.session_state[f"{kind}_file_id"] == uploaded.file_id and st.session_state[f"{kind}_data"]:
+        return st.session_state[f"{kind}_data"]
+    blob = BLOB_STORE.put(uploaded.getvalue())
+    session = current_session()
+    old = st.session_state[f"{kind}_data"]
+    BLOB_STORE.acquire(session, blob)
+    if old is not None and old.digest != blob.digest:
+        BLOB_STORE.release(session, old)
+    st.session_state[f"{kind}_data"] = blob
+    st.session_state[f"{kind}_hash"] = blob.digest
+    st.session_state[f"{kind}_file_id"] = uploaded.file_id
+    return blob
 
 def render_file_uploads():
     """파일 업로드 카드 2개를 가로로 배치"""
@@ -276,9 +124,8 @@ def render_file_uploads():
         xlsx_file = st.file_uploader("엑셀 업로드", type=["xlsx", "xlsm"], key="xlsx", label_visibility="collapsed")
         if xlsx_file is not None:
             try:
-                data = xlsx_file.getvalue()
+                data = store_upload("xlsx", xlsx_file)
                 if data:
-                    st.session_state.xlsx_data = data
                     st.session_state.xlsx_name = xlsx_file.name
                     st.success(f"✓ {xlsx_file.name} ({len(data):,} bytes)")
                 else:
@@ -291,16 +138,15 @@ def render_file_uploads():
         <div class="word-card">
             <div class="card-icon">📝</div>
             <div class="card-title">워드 템플릿</div>
-            <div class="card-description">{{A1}}, {{B5|#,###}} 형식의 태그가 포함된 템플릿</div>
+            <div class="card-description">{{A1}}, {{B5|#,###}}, 행별 {{B#}} 형식의 태그가 포함된 템플릿</div>
         </div>
         ''', unsafe_allow_html=True)
         
         docx_file = st.file_uploader("워드 템플릿 업로드", type=["docx"], key="docx", label_visibility="collapsed")
         if docx_file is not None:
             try:
-                data = docx_file.getvalue()
+                data = store_upload("docx", docx_file)
                 if data:
-                    st.session_state.docx_data = data
                     st.session_state.docx_name = docx_file.name
                     st.success(f"✓ {docx_file.name} ({len(data):,} bytes)")
                 else:
@@ -318,112 +164,292 @@ def render_options():
     sheet_choice = None
     if st.session_state.xlsx_data:
         try:
-            wb = load_workbook_from_bytes(
-                st.session_state.xlsx_data, st.session_state.xlsx_name
+            sheets = cached_sheetnames(
+                st.session_state.xlsx_data, st.session_state.xlsx_hash
             )
-            sheets = wb.sheetnames
             index = sheets.index(TARGET_SHEET) if TARGET_SHEET in sheets else 0
             
             col1, col2 = st.columns(2, gap="large")
             with col1:
                 sheet_choice = st.selectbox("📑 사용할 시트", sheets, index=index)
             with col2:
-                out_name = st.text_input("📄 출력 파일명", value=DEFAULT_OUT)
+                out_name = st.text_input("📄 출력 파일명", value=default_out())
         except Exception as e:
             st.error(f"엑셀 시트 읽기 오류: {e}")
-            out_name = DEFAULT_OUT
+            out_name = default_out()
     else:
-        out_name = st.text_input("📄 출력 파일명", value=DEFAULT_OUT)
+        out_name = st.text_input("📄 출력 파일명", value=default_out())
+
+    engine = st.selectbox(
+        "⚙️ 치환 엔진",
+        list(TEMPLATE_ENGINES),
+        format_func=TEMPLATE_ENGINES.get,
+        key="engine",
+    )
+
+    profile = st.checkbox(
+        "🔬 이번 실행 프로파일링 (cProfile + tracemalloc, 느려짐)", key="profile_run"
+    )
+
+    batch = None
+    if st.checkbox("📚 행별 일괄 생성 (행마다 문서 1개, {{B#}} 토큰 사용)", key="batch_mode"):
+        col1, col2, col3, col4 = st.columns(4, gap="large")
+        with col1:
+            start_row = st.number_input("시작 행", min_value=1, value=2, step=1)
+        with col2:
+            name_col = st.text_input("파일명 열 (예: B, 비우면 행 번호)", value="")
+        with col3:
+            workers = st.number_input("렌더링 프로세스 수", min_value=1, value=RENDER_WORKERS, step=1)
+        with col4:
+            with_pdf = st.checkbox("PDF 포함", value=True)
+            merge_pdf = st.checkbox(
+                "PDF 병합 변환",
+                value=False,
+                disabled=not with_pdf or not pdf_batch.available(),
+                help="모든 문서를 하나로 합쳐 한 번만 변환한 뒤 문서별로 나눕니다. "
+                "합친 PDF 도 따로 받을 수 있습니다.",
+            )
+        batch = {
+            "start_row": int(start_row),
+            "name_col": name_col.strip().upper() or None,
+            "workers": int(workers),
+            "with_pdf": with_pdf,
+            "merge_pdf": with_pdf and merge_pdf,
+        }
     
     st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown('<div style="height: 2rem;"></div>', unsafe_allow_html=True)
     gen_bottom = st.button("🚀 ZIP 생성", key="btn_bottom", use_container_width=True)
     
-    return sheet_choice, out_name, gen_bottom
+    return sheet_choice, out_name, engine, batch, profile, gen_bottom
+
+
+def current_session() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+
+def show_job(job: Job, *inputs: Blob):
+    """
+    작업 id 를 URL 에 남겨 새로고침해도 같은 작업을 이어서 보여준다.
+    입력 파일은 작업이 끝날 때까지 작업 id 로도 참조해 세션이 업로드를 바꿔도 지워지지 않게 한다.
+    """
+    for blob in inputs:
+        BLOB_STORE.acquire(job.id, blob)
+    st.query_params["job"] = job.id
+
 
+def previous_batch_result() -> Optional[Blob]:
+    """URL 의 작업이 끝난 일괄 생성이면 그 결과 ZIP (매니페스트 포함)"""
+    job_id = st.query_params.get("job")
+    job = get_job_queue().get(job_id) if job_id else None
+    if job is None or job.status != DONE or job.result is None:
+        return None
+    return job.result if job.file_name.endswith("_batch.zip") else None
 
-def handle_generate(sheet_choice: Optional[str], out_name: str):
+
+def handle_generate(
+    sheet_choice: Optional[str], out_name: str, engine: str = "docx", profile: bool = False
+):
     if not st.session_state.xlsx_data or not st.session_state.docx_data:
         st.error("엑셀과 워드 템플릿을 모두 업로드하세요.")
         return
 
-    progress = st.progress(0)
-    try:
-        with st.spinner("ZIP 생성 중입니다..."):
-            # 1) 엑셀 로드
-            progress.progress(10)
-            wb = load_workbook_from_bytes(
-                st.session_state.xlsx_data, st.session_state.xlsx_name
-            )
-            ws = (
-                wb[sheet_choice]
-                if sheet_choice
-                else (
-                    wb[TARGET_SHEET]
-                    if TARGET_SHEET in wb.sheetnames
-                    else wb[wb.sheetnames[0]]
-                )
-            )
+    key = result_key(
+        "single",
+        st.session_state.xlsx_hash,
+        st.session_state.docx_hash,
+        sheet_choice or "",
+        out_name,
+        engine,
+        date.today().isoformat(),
+    )
+    cached = RESULT_CACHE.get(key)
+    if cached is not None:
+        GENERATIONS.labels(run="single", engine=engine, outcome="cached").inc()
+        st.query_params.pop("job", None)
+        st.success("✅ ZIP 파일이 준비되었습니다! (이전 생성 결과 재사용)")
+        render_zip_download(cached, out_name)
+        return
 
-            # 2) 워드 템플릿 로드
-            progress.progress(35)
-            doc = Document(io.BytesIO(st.session_state.docx_data))
+    # 작업은 세션 상태가 아닌 지금 시점의 값만 들고 간다
+    xlsx, xlsx_hash = st.session_state.xlsx_data, st.session_state.xlsx_hash
+    docx, docx_hash = st.session_state.docx_data, st.session_state.docx_hash
 
-            # 3) 치환
-            replacer = make_replacer(ws)
-            replace_everywhere(doc, replacer)
-            progress.progress(60)
+    pool = get_pdf_pool()
 
-            # 4) DOCX 저장
-            buf = io.BytesIO()
-            doc.save(buf)
-            buf.seek(0)
-            docx_bytes = buf.getvalue()
-            progress.progress(75)
+    def run(job: Job):
+        run_single(
+            job, xlsx, xlsx_hash, docx, docx_hash, sheet_choice, out_name, engine, profile, key, pool
+        )
 
-            # 5) PDF 변환
-            pdf_bytes = convert_docx_to_pdf_bytes(docx_bytes)
-            pdf_ok = pdf_bytes is not None
-            progress.progress(90)
+    show_job(get_job_queue().submit(current_session(), run, label=out_name), xlsx, docx)
 
-        progress.progress(100)
 
-    except InvalidFileException as e:
-        st.error(str(e))
+def handle_batch_generate(
+    sheet_choice: Optional[str],
+    out_name: str,
+    batch: dict,
+    engine: str = "docx",
+    profile: bool = False,
+):
+    """행마다 DOCX(+PDF) 를 만들어 ZIP 하나로 묶는 작업을 큐에 올린다"""
+    if not st.session_state.xlsx_data or not st.session_state.docx_data:
+        st.error("엑셀과 워드 템플릿을 모두 업로드하세요.")
         return
-    except Exception as e:
-        st.exception(e)
+
+    base = (ensure_docx(out_name) if out_name.strip() else default_out())[: -len(".docx")]
+    key = result_key(
+        "batch",
+        st.session_state.xlsx_hash,
+        st.session_state.docx_hash,
+        sheet_choice or "",
+        out_name,
+        engine,
+        batch["start_row"],
+        batch["name_col"] or "",
+        batch["with_pdf"],
+        batch["merge_pdf"],
+        date.today().isoformat(),
+    )
+    cached = RESULT_CACHE.get(key)
+    if cached is not None:
+        GENERATIONS.labels(run="batch", engine=engine, outcome="cached").inc()
+        st.query_params.pop("job", None)
+        st.success("✅ ZIP 파일이 준비되었습니다! (이전 생성 결과 재사용)")
+        render_batch_download(cached, base)
+        merged = RESULT_CACHE.get(result_key("merged", key)) if batch["merge_pdf"] else None
+        if merged is not None:
+            render_merged_download(merged, base)
         return
 
-    st.success("✅ ZIP 파일이 준비되었습니다!")
-    render_zip_download(docx_bytes, pdf_bytes, pdf_ok, out_name)
+    xlsx, xlsx_hash = st.session_state.xlsx_data, st.session_state.xlsx_hash
+    docx, docx_hash = st.session_state.docx_data, st.session_state.docx_hash
+    # 화면에 있는 이전 일괄 생성 결과 (수정된 엑셀로 다시 만들면 바뀐 문서만 다시 렌더링/변환)
+    previous = previous_batch_result()
 
-def render_zip_download(
-    docx_bytes: bytes,
-    pdf_bytes: Optional[bytes],
-    pdf_ok: bool,
-    out_name: str,
-):
-    zip_buf = io.BytesIO()
-    with ZipFile(zip_buf, "w", ZIP_DEFLATED) as zf:
-        docx_name = ensure_docx(out_name) if out_name.strip() else DEFAULT_OUT
-        zf.writestr(docx_name, docx_bytes)
+    pool = get_pdf_pool()
 
-        if pdf_ok and pdf_bytes:
-            pdf_name = ensure_pdf(out_name)
-            zf.writestr(pdf_name, pdf_bytes)
+    def run(job: Job):
+        run_batch(
+            job, xlsx, xlsx_hash, docx, docx_hash, sheet_choice, base, batch, engine, profile, key, pool,
+            previous=previous,
+        )
+
+    inputs = (xlsx, docx) if previous is None else (xlsx, docx, previous)
+    show_job(get_job_queue().submit(current_session(), run, label=f"{base} (일괄)"), *inputs)
 
-    zip_buf.seek(0)
 
-    base_zip_name = (ensure_docx(out_name) if out_name.strip() else DEFAULT_OUT)
-    base_zip_name = base_zip_name.replace(".docx", "")
-    zip_name = f"{base_zip_name}_both.zip"
+def render_job_panel():
+    """URL 의 작업 id 로 진행 상황을 보여주고, 끝나면 결과/다운로드를 표시"""
+    job_id = st.query_params.get("job")
+    if not job_id:
+        return
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        st.info("이전 작업 결과가 만료되었거나 서버가 다시 시작되었습니다. 다시 생성해 주세요.")
+        return
+
+    polling = not job.done
+
+    @st.fragment(run_every=JOB_POLL if polling else None)
+    def _panel():
+        if job.done:
+            # 폴링 중에 끝났으면 전체를 다시 그려 결과를 표시하고 폴링을 멈춘다
+            if polling:
+                st.rerun()
+            return
+        if job.status == QUEUED:
+            st.info(f"⏳ 대기 중 — 앞에 {queue.position(job)}건이 있습니다. (작업 {job.id[:8]})")
+        elif job.progress is None:
+            st.info(f"⚙️ {job.message}")
+        else:
+            st.progress(job.progress, text=job.message)
+
+    _panel()
+    if not job.done:
+        return
+
+    for level, text in job.notes:
+        getattr(st, level)(text)
+    if job.status == FAILED:
+        if isinstance(job.error, InvalidFileException):
+            st.error(str(job.error))
+        else:
+            st.exception(job.error)
+        return
+    if job.result is not None:
+        BLOB_STORE.touch(job.id)
+        st.download_button(
+            job.download_label,
+            data=job.result.read_bytes,  # 눌렀을 때만 파일을 읽음
+            file_name=job.file_name,
+            use_container_width=True,
+        )
+    for label, file_name, blob in job.attachments:
+        st.download_button(
+            label, data=blob.read_bytes, file_name=file_name, use_container_width=True
+        )
+    if job.timer is not None:
+        render_timing(job.timer)
+
+
+def render_timing(timer: StageTimer):
+    """단계별 소요 시간 패널 (+ 프로파일링 결과 다운로드)"""
+    mb = 1024 * 1024
+    rows = [
+        {
+            "단계": rec["stage"],
+            "시간(초)": rec["seconds"],
+            "횟수": rec["calls"],
+            "입력(bytes)": rec["bytes_in"],
+            "출력(bytes)": rec["bytes_out"],
+            "최대 RSS(MB)": round((rec.get("max_rss_bytes") or 0) / mb, 1),
+            **(
+                {"최대 할당(MB)": round(rec["peak_traced_bytes"] / mb, 2)}
+                if "peak_traced_bytes" in rec
+                else {}
+            ),
+        }
+        for rec in timer.rows()
+    ]
+    with st.expander(f"⏱️ 단계별 소요 시간 (총 {timer.total_seconds:.2f}초)"):
+        st.table(rows)
+        profile_zip = timer.profile_zip()
+        if profile_zip:
+            st.download_button(
+                "🔬 프로파일 다운로드 (cProfile + tracemalloc)",
+                data=profile_zip,
+                file_name=f"profile_{timer.run_id}.zip",
+                use_container_width=True,
+            )
+
+
+def render_batch_download(zip_blob: Blob, base: str):
+    st.download_button(
+        "📥 ZIP 다운로드 (행별 WORD + PDF)",
+        data=zip_blob.read_bytes,  # 눌렀을 때만 파일을 읽음
+        file_name=f"{base}_batch.zip",
+        use_container_width=True,
+    )
+
+
+def render_merged_download(pdf_blob: Blob, base: str):
+    st.download_button(
+        "📄 병합 PDF 다운로드",
+        data=pdf_blob.read_bytes,
+        file_name=f"{base}_merged.pdf",
+        use_container_width=True,
+    )
+
 
+def render_zip_download(zip_blob: Blob, out_name: str):
     st.download_button(
         "📥 ZIP 다운로드 (WORD + PDF)",
-        data=zip_buf,
-        file_name=zip_name,
+        data=zip_blob.read_bytes,
+        file_name=zip_file_name(out_name),
         use_container_width=True,
     )
 
@@ -433,13 +459,21 @@ def render_zip_download(
 def main():
     inject_style()
     init_session_state()
+    get_pdf_pool()
+    get_metrics_server()
+    get_api_server()
+    observe_session()
 
     render_file_uploads()
-    sheet_choice, out_name, gen_bottom = render_options()
+    sheet_choice, out_name, engine, batch, profile, gen_bottom = render_options()
 
     generate = gen_bottom
     if generate:
-        handle_generate(sheet_choice, out_name)
+        if batch:
+            handle_batch_generate(sheet_choice, out_name, batch, engine, profile)
+        else:
+            handle_generate(sheet_choice, out_name, engine, profile)
+    render_job_panel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+import os
+import zlib
+from typing import Tuple
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+# 압축 여부를 정할 때 시험 압축해 보는 크기 (KB, 앞/중간/뒤에서 나눠 뽑음)
+ZIP_PROBE_KB = int(os.environ.get("ZIP_PROBE_KB", "16"))
+# 시험 압축 비율(압축 후 / 전) 이 이 값 이상이면 압축하지 않고 저장
+ZIP_STORE_RATIO = float(os.environ.get("ZIP_STORE_RATIO", "0.9"))
+# 이 값 이상이면 빠른 압축(레벨 1), 미만이면 ZIP_LEVEL 로 압축
+ZIP_FAST_RATIO = float(os.environ.get("ZIP_FAST_RATIO", "0.6"))
+ZIP_LEVEL = int(os.environ.get("ZIP_LEVEL", "6"))
+
+_PROBE_SLICES = 4
+
+
+def _sample(data: bytes, limit: int) -> bytes:
+    if len(data) <= limit:
+        return data
+    step = limit // _PROBE_SLICES
+    view = memoryview(data)
+    span = len(data) - step
+    return b"".join(
+        view[span * i // (_PROBE_SLICES - 1):][:step] for i in range(_PROBE_SLICES)
+    )
+
+
+def probe_ratio(data: bytes, limit: int = 0) -> float:
+    """data 일부를 빠르게 압축해 본 비율 (1 에 가까울수록 이미 압축된 내용)"""
+    sample = _sample(data, limit or ZIP_PROBE_KB * 1024)
+    if not sample:
+        return 1.0
+    return len(zlib.compress(sample, 1)) / len(sample)
+
+
+def choose_compression(data: bytes) -> Tuple[int, int]:
+    """
+    멤버별 (compress_type, compresslevel).
+    DOCX 는 이미 deflate 된 zip 이고 PDF 도 대부분 압축 스트림이라
+    다시 압축해도 거의 줄지 않으므로 저장만 하거나 가장 빠른 레벨을 쓴다.
+    """
+    ratio = probe_ratio(data)
+    if ratio >= ZIP_STORE_RATIO:
+        return ZIP_STORED, 0
+    if ratio >= ZIP_FAST_RATIO:
+        return ZIP_DEFLATED, 1
+    return ZIP_DEFLATED, ZIP_LEVEL
+
+
+def add_member(zf: ZipFile, name: str, data: bytes):
+    """압축 방식을 내용에 맞춰 골라 zf 에 멤버 하나를 쓴다"""
+    compress_type, level = choose_compression(data)
+    zf.writestr(
+        name,
+        data,
+        compress_type=compress_type,
+        compresslevel=level if compress_type == ZIP_DEFLATED else None,
+    )
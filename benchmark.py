@@ -0,0 +1,487 @@
+"""
+템플릿 채우기 파이프라인 벤치마크.
+
+합성 워크북/템플릿(토큰 다수, 깊은 중첩 표, 큰 머리글·바닥글, 큰 미디어)을
+크기별로 만들어 엔진별 단계 시간과 전체 시간을 재고, 결과를 JSON Lines 이력에 쌓는다.
+같은 케이스의 직전 기록과 비교해 느려진 항목을 표시한다.
+
+    python benchmark.py                      # 기본 케이스, 크기 1/4/16
+    python benchmark.py --cases tokens nested --sizes 1 8 --repeat 5
+    python benchmark.py --pdf                # PDF 변환 포함 (LibreOffice 필요)
+    python benchmark.py --verify-format      # 값 포맷 출력을 이전 구현과 대조
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from datetime import time as time_of_day
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from docx import Document
+from docx.shared import Inches
+from openpyxl import Workbook
+
+from archive import add_member
+from engine import (
+    TARGET_SHEET,
+    apply_inline_format,
+    load_workbook_from_bytes,
+    make_replacer,
+    make_template,
+    pick_sheet,
+    read_cells,
+    replace_everywhere,
+)
+from timing import StageTimer
+
+HISTORY = os.environ.get("BENCH_HISTORY", "bench_history.jsonl")
+CASES = ("tokens", "nested", "headers", "media")
+ENGINES = ("classic", "docx", "xml")  # classic = 전체 워크북 로드 + replace_everywhere
+FORMATS = (None, "#,###", "#,###.00", "YYYY.MM.DD", "YYYY-MM-DD", "")
+SEED = 20240301
+
+
+# ---------- 합성 입력 ---------- #
+
+def _cell_values(n: int, rng: random.Random) -> List[Any]:
+    values: List[Any] = []
+    for i in range(n):
+        k = i % 5
+        if k == 0:
+            values.append(rng.randint(0, 10**9))
+        elif k == 1:
+            values.append(round(rng.uniform(-1e6, 1e8), 2))
+        elif k == 2:
+            values.append(date(2020 + i % 5, 1 + i % 12, 1 + i % 28))
+        elif k == 3:
+            values.append(f"{2024}-{1 + i % 12:02d}-{1 + i % 28:02d}")
+        else:
+            values.append(f"투자자{i}")
+    return values
+
+
+def make_workbook(cells: int, rng: random.Random) -> bytes:
+    """TARGET_SHEET 의 A..J 열에 cells 개 값을 채운 워크북"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = TARGET_SHEET
+    for i, value in enumerate(_cell_values(cells, rng)):
+        ws.cell(row=i // 10 + 1, column=i % 10 + 1, value=value)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _addr(i: int, cells: int) -> str:
+    i %= cells
+    return f"{'ABCDEFGHIJ'[i % 10]}{i // 10 + 1}"
+
+
+def _token(i: int, cells: int) -> str:
+    fmt = FORMATS[i % len(FORMATS)]
+    return f"{{{{{_addr(i, cells)}{'|' + fmt if fmt else ''}}}}}"
+
+
+def _token_paragraph(container, i: int, cells: int, split: bool):
+    """토큰 4개짜리 문단. split 이면 토큰이 run 경계에 걸치게 나눈다"""
+    text = f"항목 {i}: " + " / ".join(_token(i * 4 + k, cells) for k in range(4))
+    p = container.add_paragraph()
+    if split:
+        cut = text.index("{{") + 3
+        p.add_run(text[:cut])
+        p.add_run(text[cut:])
+    else:
+        p.add_run(text)
+    return p
+
+
+def _nest(cell, depth: int, start: int, cells: int):
+    cell.paragraphs[0].text = f"깊이 {depth} {_token(start, cells)}"
+    if depth == 0:
+        return
+    table = cell.add_table(rows=2, cols=2)
+    for r in range(2):
+        for c in range(2):
+            _nest(table.cell(r, c), depth - 1, start * 4 + r * 2 + c + 1, cells)
+
+
+def _png(nbytes: int, rng: random.Random) -> bytes:
+    """압축이 거의 안 되는 (무작위 픽셀) RGB PNG, 대략 nbytes 크기"""
+    side = max(8, int((nbytes / 3) ** 0.5))
+    raw = b"".join(b"\x00" + rng.randbytes(side * 3) for _ in range(side))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_docx(case: str, size: int, cells: int, rng: random.Random) -> bytes:
+    doc = Document()
+    doc.add_paragraph("기준일 YYYY년 MM월 DD일")
+    if case == "tokens":
+        for i in range(200 * size):
+            _token_paragraph(doc, i, cells, split=i % 3 == 0)
+    elif case == "nested":
+        for t in range(5 * size):
+            table = doc.add_table(rows=1, cols=2)
+            _nest(table.cell(0, 0), min(2 + size // 4, 5), t, cells)
+            table.cell(0, 1).text = _token(t * 7, cells)
+    elif case == "headers":
+        for s in range(max(1, size)):
+            section = doc.sections[-1] if s == 0 else doc.add_section()
+            section.header.is_linked_to_previous = False
+            section.footer.is_linked_to_previous = False
+            for i in range(50 * size):
+                _token_paragraph(section.header, s * 1000 + i, cells, split=i % 2 == 0)
+                _token_paragraph(section.footer, s * 1000 + i + 500, cells, split=False)
+            _token_paragraph(doc, s, cells, split=False)
+    elif case == "media":
+        for i in range(20):
+            _token_paragraph(doc, i, cells, split=False)
+        for _ in range(2):
+            doc.add_picture(io.BytesIO(_png(size * 1024 * 1024, rng)), width=Inches(2))
+    else:
+        raise ValueError(f"알 수 없는 케이스: {case}")
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+# ---------- 실행 ---------- #
+
+def _zip(docx_bytes: bytes, pdf_bytes: Optional[bytes]) -> bytes:
+    """app.build_zip 과 같은 구성 (DOCX + PDF, 멤버별 압축 방식 선택)"""
+    buf = io.BytesIO()
+    with ZipFile(buf, "w", ZIP_DEFLATED) as zf:
+        add_member(zf, "out.docx", docx_bytes)
+        if pdf_bytes:
+            add_member(zf, "out.pdf", pdf_bytes)
+    return buf.getvalue()
+
+
+def run_once(
+    engine: str, xlsx: bytes, docx: bytes, pdf: Optional[Callable[[bytes], Optional[bytes]]]
+) -> StageTimer:
+    timer = StageTimer(engine)
+    if engine == "classic":
+        with timer.stage("엑셀 로드", len(xlsx)):
+            ws = pick_sheet(load_workbook_from_bytes(xlsx))
+        with timer.stage("템플릿 파싱", len(docx)):
+            doc = Document(io.BytesIO(docx))
+        with timer.stage("치환"):
+            replace_everywhere(doc, make_replacer(ws))
+        with timer.stage("DOCX 저장") as rec:
+            buf = io.BytesIO()
+            doc.save(buf)
+            out = buf.getvalue()
+            rec["bytes_out"] = len(out)
+    else:
+        with timer.stage("템플릿 파싱", len(docx)):
+            template = make_template(docx, engine)
+        with timer.stage("엑셀 로드", len(xlsx)):
+            cells = read_cells(xlsx, None, template.addrs)
+        out = template.render(cells, stage=timer.stage)
+
+    pdf_bytes = None
+    if pdf is not None:
+        with timer.stage("PDF 변환", len(out)) as rec:
+            pdf_bytes = pdf(out)
+            rec["bytes_out"] = len(pdf_bytes or b"")
+    with timer.stage("ZIP 묶기", len(out)) as rec:
+        rec["bytes_out"] = len(_zip(out, pdf_bytes))
+    timer.finished = time.perf_counter()
+    return timer
+
+
+def _median_stages(timers: List[StageTimer]) -> Dict[str, float]:
+    names = list(timers[0].stages)
+    return {
+        name: round(statistics.median(t.stages[name]["seconds"] for t in timers), 6)
+        for name in names
+    }
+
+
+def bench_case(
+    case: str, size: int, engines, repeat: int, pdf, warmup: int = 1
+) -> List[Dict[str, Any]]:
+    rng = random.Random(f"{SEED}-{case}-{size}")
+    cells = 40 * size
+    xlsx = make_workbook(cells, rng)
+    docx = make_docx(case, size, cells, rng)
+    results = []
+    for engine in engines:
+        for _ in range(warmup):
+            run_once(engine, xlsx, docx, None)
+        timers = [run_once(engine, xlsx, docx, pdf) for _ in range(repeat)]
+        totals = [t.total_seconds for t in timers]
+        results.append({
+            "name": f"{case}/{size}/{engine}{'/pdf' if pdf else ''}",
+            "case": case,
+            "size": size,
+            "engine": engine,
+            "pdf": pdf is not None,
+            "xlsx_bytes": len(xlsx),
+            "docx_bytes": len(docx),
+            "total_median": round(statistics.median(totals), 6),
+            "total_min": round(min(totals), 6),
+            "stages": _median_stages(timers),
+        })
+    return results
+
+
+def bench_micro(repeat: int) -> List[Dict[str, Any]]:
+    """apply_inline_format / make_replacer 단독 처리량"""
+    rng = random.Random(SEED)
+    values = _cell_values(500, rng) + [None, "", "1,234", "abc"]
+    pairs = [(v, FORMATS[i % len(FORMATS)]) for i, v in enumerate(values)]
+    cells = {_addr(i, 400): v for i, v in enumerate(_cell_values(400, rng))}
+    text = " ".join(_token(i, 400) for i in range(200)) + " YYYY년 MM월 DD일"
+    repl = make_replacer(cells)
+
+    def _time(fn, loops: int) -> float:
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter() - t0) / loops)
+        return round(statistics.median(samples), 9)
+
+    return [
+        {
+            "name": "micro/apply_inline_format",
+            "per_call": _time(lambda: [apply_inline_format(v, f) for v, f in pairs], 20)
+            / len(pairs),
+            "calls": len(pairs),
+        },
+        {
+            "name": "micro/make_replacer",
+            "per_call": _time(lambda: repl(text), 50),
+            "tokens": 200,
+        },
+    ]
+
+
+# ---------- 포맷 대조 ---------- #
+# 컴파일된 포맷터(engine.compile_format) 이전의 구현. 출력이 한 글자도 달라지지 않았는지
+# --verify-format 으로 대조한다.
+
+def _ref_date(v) -> str:
+    try:
+        if isinstance(v, (datetime, date)):
+            return f"{v.year}. {v.month}. {v.day}."
+        if isinstance(v, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", v.strip()):
+            dt = datetime.strptime(v.strip(), "%Y-%m-%d").date()
+            return f"{dt.year}. {dt.month}. {dt.day}."
+    except Exception:
+        pass
+    return ""
+
+
+def _ref_number(v) -> str:
+    try:
+        if isinstance(v, (int, float, Decimal)):
+            return f"{float(v):,.0f}"
+        if isinstance(v, str):
+            raw = v.replace(",", "")
+            if re.fullmatch(r"-?\d+(\.\d+)?", raw):
+                return f"{float(raw):,.0f}"
+    except Exception:
+        pass
+    return ""
+
+
+def _ref_text(v) -> str:
+    return _ref_date(v) or _ref_number(v) or ("" if v is None else str(v))
+
+
+def _ref_inline_format(value, fmt: Optional[str]) -> str:
+    if not fmt or not fmt.strip():
+        return _ref_text(value)
+    if any(tok in fmt for tok in ("YYYY", "MM", "DD")):
+        if isinstance(value, str) and re.fullmatch(r"\d{4}-\d{2}-\d{2}", value.strip()):
+            value = datetime.strptime(value.strip(), "%Y-%m-%d").date()
+        if isinstance(value, (datetime, date)):
+            f = fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d")
+            return value.strftime(f)
+        return _ref_text(value)
+    if re.fullmatch(r"[#,0]+(?:\.[0#]+)?", fmt.replace(",", "")):
+        try:
+            num = float(str(value).replace(",", ""))
+            decimals = len(fmt.split(".")[1]) if "." in fmt else 0
+            return f"{num:,.{decimals}f}"
+        except Exception:
+            return _ref_text(value)
+    return _ref_text(value)
+
+
+VERIFY_FORMATS = FORMATS + (
+    " ", "0", "0.0", "#,##0.000", "#,###.0,0", "##.#", "YYYY년 MM월 DD일", "MM/DD", "DD",
+    "YYYY%", "{YYYY}.{MM}", "YYYYY-MMM-DDD", "@", "#,###원", "0.00%", "abc",
+)
+
+
+def _verify_values(n: int, rng: random.Random) -> List[Any]:
+    values: List[Any] = [
+        None, True, False, 0, -0.0, 1, -1, 0.5, 1.5, 2.5, -2.5, 1e15, 1e300, 10**20, 10**400,
+        float("nan"), float("inf"), float("-inf"), Decimal("1234.5"), Decimal("NaN"),
+        Decimal("sNaN"), "", " ", "abc", "1,234", "1,234.567", "-12", "12.", ".5", " 42 ",
+        "1e5", "inf", "nan", "1_000", "٣٤", "2024-03-01", " 2024-03-01 ", "2024-13-45",
+        "0000-01-01", "0999-12-31", "2024-02-30", "2024-00-10", "٢٠٢٤-٠٣-٠١", "#N/A", date(2024, 3, 1), datetime(2024, 3, 1, 13, 5),
+        date(1, 1, 1), date(999, 12, 31), time_of_day(9, 30), timedelta(days=2),
+    ]
+    values += _cell_values(n, rng)
+    values += [rng.uniform(-1e12, 1e12) for _ in range(n)]
+    values += [f"{rng.randint(-10**7, 10**7):,}" for _ in range(n)]
+    return values
+
+
+def verify_format(n: int = 2000) -> List[str]:
+    """현재 apply_inline_format 과 이전 구현의 출력(예외 종류 포함)이 다른 경우 목록"""
+    rng = random.Random(SEED)
+    diffs = []
+    for value in _verify_values(n, rng):
+        for fmt in VERIFY_FORMATS:
+            got = want = None
+            try:
+                want = _ref_inline_format(value, fmt)
+            except Exception as e:
+                want = type(e)
+            try:
+                got = apply_inline_format(value, fmt)
+            except Exception as e:
+                got = type(e)
+            if got != want:
+                diffs.append(f"{value!r} | {fmt!r}: {got!r} != {want!r}")
+    return diffs
+
+
+# ---------- 이력 ---------- #
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _metric(result: Dict[str, Any]) -> float:
+    return result.get("total_median", result.get("per_call", 0.0))
+
+
+def compare(
+    history: List[Dict[str, Any]], results: List[Dict[str, Any]], threshold: float
+) -> List[str]:
+    """항목별 가장 최근 기록 대비 비교. threshold(비율) 이상 느려지면 표시"""
+    before = {r["name"]: _metric(r) for entry in history for r in entry.get("results", [])}
+    lines = []
+    for r in results:
+        old = before.get(r["name"])
+        if not old:
+            continue
+        ratio = _metric(r) / old
+        mark = "  ⚠️ 느려짐" if ratio > 1 + threshold else ""
+        lines.append(f"{r['name']:<32} {old:.6f} → {_metric(r):.6f}  ({ratio:.2f}x){mark}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="템플릿 채우기 파이프라인 벤치마크")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf", action="store_true", help="PDF 변환 포함 (LibreOffice 필요)")
+    parser.add_argument("--history", default=HISTORY, help="결과를 덧붙일 JSON Lines 파일")
+    parser.add_argument("--no-save", action="store_true", help="이력에 기록하지 않음")
+    parser.add_argument("--threshold", type=float, default=0.10, help="느려짐 표시 기준 (비율)")
+    parser.add_argument(
+        "--verify-format", action="store_true", help="값 포맷 출력을 이전 구현과 대조만 하고 종료"
+    )
+    args = parser.parse_args(argv)
+
+    if args.verify_format:
+        diffs = verify_format()
+        print("\n".join(diffs[:50]) or "값 포맷 출력이 이전 구현과 모두 같습니다.")
+        return 1 if diffs else 0
+
+    pdf: Optional[Callable[[bytes], Optional[bytes]]] = None
+    if args.pdf:
+        from converter import ConversionError, convert, start_pool
+
+        pool = start_pool()
+
+        def convert_pdf(data: bytes) -> Optional[bytes]:
+            try:
+                return convert(data, pool)
+            except ConversionError as e:
+                print(f"PDF 변환 실패: {e}", file=sys.stderr)
+                return None
+
+        pdf = convert_pdf
+
+    results: List[Dict[str, Any]] = []
+    for case in args.cases:
+        for size in args.sizes:
+            for r in bench_case(case, size, args.engines, args.repeat, pdf):
+                stages = ", ".join(f"{k} {v * 1000:.1f}ms" for k, v in r["stages"].items())
+                print(f"{r['name']:<32} {r['total_median'] * 1000:9.1f}ms  ({stages})")
+                results.append(r)
+    for r in bench_micro(args.repeat):
+        print(f"{r['name']:<32} {r['per_call'] * 1e6:9.2f}µs/call")
+        results.append(r)
+
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpu)",
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    history = load_history(args.history)
+    if history:
+        lines = compare(history, results, args.threshold)
+        if lines:
+            print(f"\n이전 기록 대비 (마지막: {history[-1].get('commit')}, {history[-1].get('timestamp')}):")
+            print("\n".join(lines))
+
+    if not args.no_save:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, Optional, Set
+
+# 업로드/결과 파일 저장소: 위치 / 용량 상한(MB) / 마지막 사용 후 보관 시간(초)
+BLOB_DIR = os.environ.get("BLOB_DIR") or os.path.join(tempfile.gettempdir(), "leewoon_blobs")
+BLOB_STORE_MB = int(os.environ.get("BLOB_STORE_MB", "2048"))
+BLOB_TTL = int(os.environ.get("BLOB_TTL", str(6 * 3600)))
+
+_CHUNK = 1024 * 1024
+
+
+def _hasher():
+    # cache.content_hash 와 같은 해시 (blake2b, 16 bytes) → 같은 내용이면 같은 키
+    return hashlib.blake2b(digest_size=16)
+
+
+class MmapReader(io.RawIOBase):
+    """mmap 위의 읽기 전용 파일 객체. 위치를 따로 가져 같은 맵을 여러 곳에서 읽을 수 있다"""
+
+    def __init__(self, mm: mmap.mmap):
+        self.mm = mm
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self.mm[self.pos:self.pos + len(b)]
+        n = len(data)
+        b[:n] = data
+        self.pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.pos = offset
+        elif whence == io.SEEK_CUR:
+            self.pos += offset
+        else:
+            self.pos = len(self.mm) + offset
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def close(self):
+        if not self.closed:
+            self.mm.close()
+        super().close()
+
+
+class Blob:
+    """
+    저장소에 있는 파일 하나 (내용 해시로 식별).
+    세션 상태에는 bytes 대신 이 핸들만 두고, 필요할 때 메모리 맵으로 연다.
+    경로만 들고 있어 pickle 로 다른 프로세스(렌더링 풀)에 넘길 수 있다.
+    """
+
+    def __init__(self, path: str, digest: str, size: int):
+        self.path = path
+        self.digest = digest
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __bool__(self) -> bool:
+        return self.size > 0
+
+    def __repr__(self) -> str:
+        return f"Blob({self.digest}, {self.size} bytes)"
+
+    def open(self) -> BinaryIO:
+        """메모리 맵 기반 읽기 스트림 (닫으면 맵도 해제)"""
+        if self.size == 0:
+            return io.BytesIO(b"")
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return io.BufferedReader(MmapReader(mm), buffer_size=_CHUNK)
+
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class BlobStore:
+    """
+    내용 주소 기반 디스크 저장소.
+    - 같은 내용은 파일 하나 (여러 세션이 같은 파일을 올려도 한 벌)
+    - owner(세션/작업)별 참조를 세고, 참조가 없는 파일부터 오래된 순으로 용량 상한까지 정리
+    - ttl 동안 쓰이지 않은 파일과 ttl 동안 움직임이 없는 owner 의 참조는 만료
+    """
+
+    def __init__(self, root: str, max_bytes: int, ttl: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.refs: Dict[str, Set[str]] = {}  # owner → digest 집합
+        self.seen: Dict[str, float] = {}  # owner → 마지막 활동 시각
+        self.lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest)
+
+    def get(self, digest: Optional[str]) -> Optional[Blob]:
+        if not digest:
+            return None
+        path = self._path(digest)
+        try:
+            size = os.path.getsize(path)
+            os.utime(path)
+        except OSError:
+            return None
+        return Blob(path, digest, size)
+
+    def put(self, data: bytes) -> Blob:
+        h = _hasher()
+        h.update(data)
+        digest = h.hexdigest()
+        blob = self.get(digest)
+        if blob is not None:
+            return blob
+        with self.writer() as f:
+            f.write(data)
+        return self.get(digest)
+
+    @contextmanager
+    def writer(self) -> Iterator["_HashingWriter"]:
+        """
+        with store.writer() as f: ... 로 바로 파일에 쓰고 (메모리에 전체를 모으지 않음)
+        끝나면 내용 해시 이름으로 옮긴다. f.blob 으로 결과를 얻는다.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp_")
+        writer = _HashingWriter(os.fdopen(fd, "w+b"))
+        try:
+            yield writer
+            writer.file.close()
+            digest = writer.hasher.hexdigest()
+            os.replace(tmp, self._path(digest))
+            writer.blob = Blob(self._path(digest), digest, writer.size)
+        finally:
+            if not writer.file.closed:
+                writer.file.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._evict()
+
+    # ---------- 참조 ---------- #
+
+    def acquire(self, owner: str, blob: Blob):
+        with self.lock:
+            self.refs.setdefault(owner, set()).add(blob.digest)
+            self.seen[owner] = time.time()
+
+    def release(self, owner: str, blob: Optional[Blob] = None):
+        """blob 이 없으면 owner 의 참조를 모두 놓는다"""
+        with self.lock:
+            if blob is None:
+                self.refs.pop(owner, None)
+                self.seen.pop(owner, None)
+            else:
+                self.refs.get(owner, set()).discard(blob.digest)
+
+    def touch(self, owner: str):
+        with self.lock:
+            if owner in self.refs:
+                self.seen[owner] = time.time()
+
+    def refcount(self, digest: str) -> int:
+        with self.lock:
+            return sum(digest in digests for digests in self.refs.values())
+
+    def owner_bytes(self) -> Dict[str, int]:
+        """owner 별 참조 중인 파일 크기 합"""
+        with self.lock:
+            refs = {owner: set(digests) for owner, digests in self.refs.items()}
+        sizes: Dict[str, int] = {}
+        for owner, digests in refs.items():
+            total = 0
+            for digest in digests:
+                try:
+                    total += os.path.getsize(self._path(digest))
+                except OSError:
+                    pass
+            sizes[owner] = total
+        return sizes
+
+    # ---------- 정리 ---------- #
+
+    def _evict(self):
+        with self.lock:
+            now = time.time()
+            for owner in [o for o, t in self.seen.items() if now - t > self.ttl]:
+                self.release(owner)
+            live = set().union(*self.refs.values()) if self.refs else set()
+
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.name.startswith(".tmp_"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.name not in live and now - st.st_mtime > self.ttl:
+                    _remove(entry.path)
+                else:
+                    entries.append((st.st_mtime, st.st_size, entry.name, entry.path))
+
+            total = sum(size for _, size, _, _ in entries)
+            for _, size, name, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if name in live:
+                    continue
+                _remove(path)
+                total -= size
+
+
+class _HashingWriter:
+    def __init__(self, file):
+        self.file = file
+        self.hasher = _hasher()
+        self.size = 0
+        self.blob: Optional[Blob] = None
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    # ZipFile 이 쓰기 대상에 요구하는 메서드
+    def tell(self) -> int:
+        return self.size
+
+    def flush(self):
+        self.file.flush()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+BLOB_STORE = BlobStore(BLOB_DIR, BLOB_STORE_MB * 1024 * 1024, BLOB_TTL)
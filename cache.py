@@ -0,0 +1,185 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from blobstore import Blob
+from engine import Data, make_template, read_cells, read_sheetnames
+from lru import SizedLRU
+from metrics import register_caches
+
+# 워크북 메타데이터/셀 스냅샷 캐시 상한 (MB)
+WORKBOOK_CACHE_MB = int(os.environ.get("WORKBOOK_CACHE_MB", "64"))
+# 컴파일된 템플릿 캐시 상한 (MB, 파싱된 XML 은 원본 DOCX 의 수 배 크기로 추정)
+TEMPLATE_CACHE_MB = int(os.environ.get("TEMPLATE_CACHE_MB", "128"))
+TEMPLATE_SIZE_FACTOR = 8
+# 생성 결과(디스크) 캐시: 위치 / 용량 상한(MB) / 마지막 사용 후 보관 시간(초)
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "leewoon_results"
+)
+RESULT_CACHE_MB = int(os.environ.get("RESULT_CACHE_MB", "512"))
+RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", str(24 * 3600)))
+
+
+def content_hash(data: Data) -> str:
+    if isinstance(data, Blob):  # 저장소 파일 이름이 곧 같은 해시
+        return data.digest
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def result_key(*parts) -> str:
+    """입력 조합(bytes 해시, 시트, 파일명, 날짜 등)으로 만든 결과 캐시 키"""
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        raw = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        h.update(len(raw).to_bytes(8, "little"))
+        h.update(raw)
+    return h.hexdigest()
+
+
+WORKBOOK_CACHE = SizedLRU(WORKBOOK_CACHE_MB * 1024 * 1024)
+TEMPLATE_CACHE = SizedLRU(TEMPLATE_CACHE_MB * 1024 * 1024)
+
+
+class DiskLRU:
+    """
+    항목 하나 = 파일 하나인 디스크 캐시.
+    mtime 을 마지막 사용 시각으로 쓰며, ttl 이 지난 항목과
+    총 용량이 max_bytes 를 넘는 만큼의 오래된 항목을 지운다.
+    """
+
+    def __init__(self, root: str, max_bytes: int, ttl: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, key: str) -> Optional[Blob]:
+        """
+        캐시된 파일의 핸들 (digest 는 캐시 키). 내용은 읽지 않으므로
+        작업 결과처럼 다운로드할 때 blob.read_bytes 로 읽는다.
+        """
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            os.utime(path)
+            size = os.path.getsize(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Blob(path, key, size)
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        self._store(key, lambda f: f.write(data))
+
+    def put_file(self, key: str, path: str):
+        """이미 디스크에 있는 결과 파일을 메모리에 올리지 않고 복사해 넣는다"""
+        try:
+            if os.path.getsize(path) > self.max_bytes:
+                return
+        except OSError:
+            return
+
+        def _copy(f):
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, f)
+
+        self._store(key, _copy)
+
+    def _store(self, key: str, write):
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.name.startswith(".tmp_"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.ttl:
+                    self._remove(entry.path)
+                else:
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+RESULT_CACHE = DiskLRU(RESULT_CACHE_DIR, RESULT_CACHE_MB * 1024 * 1024, RESULT_CACHE_TTL)
+register_caches(
+    {"workbook": WORKBOOK_CACHE, "template": TEMPLATE_CACHE, "result": RESULT_CACHE}
+)
+
+
+def cached_sheetnames(data: Data, digest: Optional[str] = None) -> List[str]:
+    """시트 이름 목록 (xl/workbook.xml 만 읽음, 내용 해시로 캐시)"""
+    key = ("sheets", digest or content_hash(data))
+    names = WORKBOOK_CACHE.get(key)
+    if names is None:
+        names = read_sheetnames(data)
+        WORKBOOK_CACHE.put(key, names)
+    return names
+
+
+def cached_cells(
+    data: Data,
+    sheet: Optional[str],
+    addrs: Iterable[str],
+    digest: Optional[str] = None,
+) -> Dict[str, Any]:
+    """참조 셀 스냅샷 {주소: 값} (내용 해시 + 시트 + 주소 집합으로 캐시)"""
+    addrs = frozenset(addrs)
+    key = ("cells", digest or content_hash(data), sheet, addrs)
+    cells = WORKBOOK_CACHE.get(key)
+    if cells is None:
+        cells = read_cells(data, sheet, addrs)
+        WORKBOOK_CACHE.put(key, cells)
+    return dict(cells)
+
+
+def compiled_template(data: Data, digest: Optional[str] = None, kind: str = "docx"):
+    """템플릿 해시 + 엔진 종류로 캐시된 템플릿 (세션/렌더/일괄 생성 간 공유)"""
+    key = (kind, digest or content_hash(data))
+    template = TEMPLATE_CACHE.get(key)
+    if template is None:
+        template = make_template(data, kind)
+        TEMPLATE_CACHE.put(key, template, len(data) * TEMPLATE_SIZE_FACTOR)
+    return template
@@ -0,0 +1,280 @@
+"""
+Streamlit 없이 명령줄에서 문서를 생성한다 (cron/CI 등 일괄 작업용).
+앱과 같은 파이프라인(pipeline.py)을 쓰며 진행 상황은 stderr 로 흘려보낸다.
+
+    python cli.py --xlsx 납입.xlsx --docx 템플릿.docx --out ./결과
+    python cli.py --xlsx 납입.xlsx --docx 템플릿.docx --out ./결과 --batch --name-col B --workers 4
+    python cli.py ... --batch --merge-pdf --zip     # 행별 문서를 ZIP 하나로, 병합 PDF 포함
+
+종료 코드: 0 성공, 1 생성 실패(만든 문서가 0건 포함), 2 인자 오류, 3 일부 실패(행 렌더링/PDF 변환),
+          4 입력 파일 오류
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+from zipfile import ZipFile
+
+from openpyxl.utils.exceptions import InvalidFileException
+
+import converter
+import pdf_batch
+from blobstore import BLOB_STORE, Blob
+from cache import cached_sheetnames, content_hash
+from converter import ConverterPool
+from engine import TARGET_SHEET, TEMPLATE_ENGINES, sheet_name
+from jobs import Job
+from manifest import MANIFEST_NAME, PreviousRun
+from pipeline import default_out, ensure_docx, run_batch, run_single
+from render_pool import RENDER_WORKERS
+
+EXIT_OK, EXIT_FAILED, EXIT_USAGE, EXIT_PARTIAL, EXIT_INPUT = 0, 1, 2, 3, 4
+
+_LEVEL_PREFIX = {"info": "", "success": "", "warning": "경고: ", "error": "오류: "}
+
+
+class ConsoleJob(Job):
+    """진행률/안내 문구를 화면 대신 stderr 로 출력하는 작업"""
+
+    def __init__(self, label: str = "", quiet: bool = False):
+        super().__init__("cli", None, label)
+        self.quiet = quiet
+
+    def report(self, progress: Optional[float], message: str):
+        changed = message != self.message
+        super().report(progress, message)
+        if self.quiet or not changed:
+            return
+        percent = "   -" if self.progress is None else f"{self.progress:4.0%}"
+        print(f"[{percent}] {message}", file=sys.stderr, flush=True)
+
+    def notify(self, level: str, text: str):
+        super().notify(level, text)
+        if self.quiet and level in ("info", "success"):
+            return
+        print(_LEVEL_PREFIX.get(level, "") + text, file=sys.stderr, flush=True)
+
+
+def write_atomic(path: str, write):
+    """같은 디렉터리의 임시 파일에 쓴 뒤 이름을 바꿔, 중단돼도 반쯤 쓴 파일이 남지 않게 한다"""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _copy_blob(blob: Blob):
+    def write(f):
+        with blob.open() as src:
+            while True:
+                chunk = src.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+    return write
+
+
+def _manifest_outputs(out_dir: str) -> List[str]:
+    """out_dir 에 풀어 둔 이전 일괄 생성 결과의 문서 파일 경로"""
+    previous = PreviousRun.open(out_dir)
+    if previous is None:
+        return []
+    return [
+        os.path.join(out_dir, doc["name"] + ext)
+        for doc in previous.documents
+        for ext in (".docx", ".pdf")
+    ]
+
+
+def save_outputs(job: Job, out_dir: str, keep_zip: bool) -> List[str]:
+    """
+    결과 ZIP 을 그대로 두거나 풀어서, 추가 결과(병합 PDF)와 함께 out_dir 에 저장.
+    풀어서 저장할 때 이전 결과에만 있던 문서 파일은 지운다.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    stale = [] if keep_zip else _manifest_outputs(out_dir)
+    if keep_zip:
+        path = os.path.join(out_dir, job.file_name)
+        write_atomic(path, _copy_blob(job.result))
+        written.append(path)
+    else:
+        with job.result.open() as f, ZipFile(f) as zf:
+            for info in zf.infolist():
+                path = os.path.join(out_dir, os.path.basename(info.filename))
+                write_atomic(path, lambda out: out.write(zf.read(info)))
+                written.append(path)
+    for _, file_name, blob in job.attachments:
+        path = os.path.join(out_dir, file_name)
+        write_atomic(path, _copy_blob(blob))
+        written.append(path)
+    for path in set(stale) - set(written):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    return written
+
+
+def read_input(path: str, what: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError as e:
+        raise InvalidFileException(f"{what} 파일을 읽을 수 없습니다: {e}")
+
+
+def add_generation_args(parser: argparse.ArgumentParser):
+    """생성 옵션 (cli.py / watcher.py 공통)"""
+    parser.add_argument("--docx", required=True, help="워드 템플릿 (.docx)")
+    parser.add_argument("--sheet", help=f"시트 이름 (기본: '{TARGET_SHEET}' 또는 첫 시트)")
+    parser.add_argument(
+        "--name", default="", help="출력 파일 이름 (일괄 생성은 접두어, 기본: <오늘 날짜>_#_납입요청서_DB저축은행)"
+    )
+    parser.add_argument("--engine", choices=TEMPLATE_ENGINES, default="docx", help="치환 엔진")
+    parser.add_argument("--batch", action="store_true", help="행마다 문서 1건씩 생성")
+    parser.add_argument("--start-row", type=int, default=2, help="일괄 생성 시작 행")
+    parser.add_argument("--name-col", help="일괄 생성 파일명 열 (예: B, 없으면 행 번호)")
+    parser.add_argument(
+        "--workers", type=int, default=RENDER_WORKERS, help="일괄 생성 렌더링 프로세스 수"
+    )
+    parser.add_argument("--no-pdf", action="store_true", help="PDF 변환 없이 WORD 만 생성")
+    parser.add_argument(
+        "--merge-pdf", action="store_true", help="일괄 생성 PDF 를 한 번에 병합 변환 (pypdf 필요)"
+    )
+    parser.add_argument("--zip", action="store_true", help="결과 ZIP 을 풀지 않고 그대로 저장")
+    parser.add_argument(
+        "--previous",
+        help="일괄 생성: 재사용할 이전 결과 (ZIP 또는 폴더, 기본: 출력 위치의 이전 결과)",
+    )
+    parser.add_argument(
+        "--full", action="store_true", help="일괄 생성: 이전 결과를 재사용하지 않고 모두 다시 생성"
+    )
+    parser.add_argument("--profile", action="store_true", help="단계별 프로파일 기록")
+    parser.add_argument("-q", "--quiet", action="store_true", help="진행 상황 출력 생략")
+
+
+def check_generation_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    if args.start_row < 1 or args.workers < 1:
+        parser.error("--start-row 와 --workers 는 1 이상이어야 합니다.")
+    if args.merge_pdf and (not args.batch or args.no_pdf):
+        parser.error("--merge-pdf 는 --batch 와 함께, --no-pdf 없이 써야 합니다.")
+    if args.merge_pdf and not pdf_batch.available():
+        print("경고: pypdf 가 없어 PDF 를 문서마다 변환합니다.", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="엑셀 값으로 워드 템플릿을 채워 DOCX/PDF 생성")
+    parser.add_argument("--xlsx", required=True, help="엑셀 파일 (.xlsx)")
+    parser.add_argument("--out", required=True, help="결과를 저장할 디렉터리")
+    add_generation_args(parser)
+    return parser
+
+
+def batch_base(args: argparse.Namespace) -> str:
+    name = args.name.strip()
+    return (ensure_docx(name) if name else default_out())[: -len(".docx")]
+
+
+def find_previous(args: argparse.Namespace, out_dir: str) -> Optional[str]:
+    """일괄 생성에서 재사용할 이전 결과: --previous, 없으면 out_dir 의 결과 ZIP 또는 풀어 둔 결과"""
+    if not args.batch or args.full:
+        return None
+    if args.previous:
+        return args.previous
+    if args.zip:
+        path = os.path.join(out_dir, f"{batch_base(args)}_batch.zip")
+        return path if os.path.exists(path) else None
+    return out_dir if os.path.exists(os.path.join(out_dir, MANIFEST_NAME)) else None
+
+
+def generate(
+    job: Job,
+    xlsx: bytes,
+    docx: bytes,
+    args: argparse.Namespace,
+    pool: Optional[ConverterPool],
+    previous: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    args 의 생성 옵션대로 단건/일괄 생성 → job.result. 요약 {"documents", ...} 를 돌려준다.
+    previous: 일괄 생성에서 재사용할 이전 결과 (find_previous)
+    """
+    xlsx_hash, docx_hash = content_hash(xlsx), content_hash(docx)
+    sheet = sheet_name(cached_sheetnames(xlsx, xlsx_hash), args.sheet)
+    if args.batch:
+        base = batch_base(args)
+        batch = {
+            "start_row": args.start_row,
+            "name_col": (args.name_col or "").strip().upper() or None,
+            "workers": args.workers,
+            "with_pdf": not args.no_pdf,
+            "merge_pdf": args.merge_pdf,
+        }
+        return run_batch(
+            job, xlsx, xlsx_hash, docx, docx_hash, sheet, base, batch,
+            args.engine, args.profile, pool=pool, previous=previous,
+        )
+    summary = run_single(
+        job, xlsx, xlsx_hash, docx, docx_hash, sheet, args.name.strip() or default_out(),
+        args.engine, args.profile, pool=pool, with_pdf=not args.no_pdf,
+    )
+    summary["pdf_failed"] = 0 if args.no_pdf or summary["pdf_ok"] else 1
+    return summary
+
+
+def exit_code(summary: Dict[str, int]) -> int:
+    if not summary.get("documents"):
+        return EXIT_FAILED  # 모든 행이 실패했거나 생성할 행이 없음 — 스크립트/감시자가 성공으로 보지 않게
+    if summary.get("render_failed") or summary.get("pdf_failed"):
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_generation_args(parser, args)
+
+    job = ConsoleJob(args.name or default_out(), quiet=args.quiet)
+    started = time.perf_counter()
+    try:
+        xlsx = read_input(args.xlsx, "엑셀")
+        docx = read_input(args.docx, "워드 템플릿")
+        pool = None
+        if not args.no_pdf:
+            job.report(0.0, "PDF 변환 서버 기동 중...")
+            pool = converter.start_pool()
+        summary = generate(job, xlsx, docx, args, pool, find_previous(args, args.out))
+    except InvalidFileException as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return EXIT_INPUT
+    except Exception as e:
+        print(f"오류: 문서 생성 실패 ({e!r})", file=sys.stderr)
+        return EXIT_FAILED
+
+    try:
+        if job.result is None:
+            return EXIT_FAILED
+        written = save_outputs(job, args.out, args.zip)
+    finally:
+        BLOB_STORE.release(job.id)
+
+    if not args.quiet:
+        for path in written:
+            print(f"저장: {path}", file=sys.stderr)
+        print(
+            f"{summary['documents']}건 생성, {time.perf_counter() - started:.1f}초",
+            file=sys.stderr,
+        )
+    return exit_code(summary)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,501 @@
+import atexit
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# UNO 브리지 (python3-uno). 없으면 상주 서버 없이 cold spawn 으로만 변환한다.
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except Exception:
+    uno = None
+    PropertyValue = None
+
+
+CONNECT_TIMEOUT = 30.0
+# 풀 크기 (기본값: CPU 코어 수)
+POOL_SIZE = int(os.environ.get("PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+# 변환 1건의 제한 시간 / 유휴 변환기 대기 시간 (초)
+CONVERT_TIMEOUT = float(os.environ.get("PDF_TIMEOUT", "60"))
+QUEUE_TIMEOUT = float(os.environ.get("PDF_QUEUE_TIMEOUT", "120"))
+# convert() 한 번의 전체 제한 시간 (초, 재시도/서버 재시작/cold spawn 포함)
+CALL_TIMEOUT = float(os.environ.get("PDF_CALL_TIMEOUT", "180"))
+# 재시도 횟수 / 첫 재시도 대기 (초, 매번 2배)
+RETRIES = int(os.environ.get("PDF_RETRIES", "2"))
+BACKOFF = float(os.environ.get("PDF_BACKOFF", "0.5"))
+# 연속 실패가 이만큼 쌓이면 cooldown 동안 변환을 건너뜀
+BREAKER_THRESHOLD = int(os.environ.get("PDF_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.environ.get("PDF_BREAKER_COOLDOWN", "120"))
+
+
+_SIGKILL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+class ConversionError(Exception):
+    pass
+
+
+class ConversionTimeout(ConversionError):
+    pass
+
+
+class CircuitOpenError(ConversionError):
+    pass
+
+
+# ---------- 유틸 ---------- #
+
+def _remaining(deadline: Optional[float], limit: float) -> float:
+    """limit 과 전체 제한 시각(deadline, monotonic)까지 남은 시간 중 짧은 쪽. 다 썼으면 ConversionTimeout"""
+    if deadline is None:
+        return limit
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise ConversionTimeout("PDF 변환 전체 제한 시간을 넘었습니다.")
+    return min(limit, left)
+
+
+_SOFFICE_PATH: Optional[str] = None
+_SOFFICE_PROBED = False
+
+
+def find_soffice() -> Optional[str]:
+    """soffice 실행 파일 경로 (프로세스를 띄우지 않고 PATH 만 조회, 결과 캐시)"""
+    global _SOFFICE_PATH, _SOFFICE_PROBED
+    if not _SOFFICE_PROBED:
+        _SOFFICE_PATH = shutil.which("soffice") or shutil.which("libreoffice")
+        _SOFFICE_PROBED = True
+    return _SOFFICE_PATH
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def kill_group(proc: subprocess.Popen, sig: int = _SIGKILL):
+    """start_new_session 으로 띄운 프로세스 그룹 전체 종료 (soffice → soffice.bin 포함)"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, sig)
+        elif proc.poll() is None:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+# 책갈피를 PDF 이름 있는 대상(named destination)으로 내보내는 옵션 (병합 변환 후 분할용)
+_DESTINATIONS_FILTER = (
+    'pdf:writer_pdf_Export:{"ExportBookmarksToPDFDestination":{"type":"boolean","value":"true"}}'
+)
+
+
+def _props(**kwargs):
+    props = []
+    for name, value in kwargs.items():
+        p = PropertyValue()
+        p.Name = name
+        p.Value = value
+        props.append(p)
+    return tuple(props)
+
+
+# ---------- cold spawn (fallback) ---------- #
+
+def cold_convert(
+    docx_bytes: bytes, timeout: float = CONVERT_TIMEOUT, destinations: bool = False
+) -> Optional[bytes]:
+    """soffice --convert-to 를 1회성 프로세스로 실행해 변환 (timeout 초과 시 프로세스 그룹 kill)"""
+    soffice = find_soffice()
+    if soffice is None:
+        return None
+
+    with tempfile.TemporaryDirectory() as td:
+        in_path = os.path.join(td, "doc.docx")
+        out_path = os.path.join(td, "doc.pdf")
+        with open(in_path, "wb") as f:
+            f.write(docx_bytes)
+
+        # 동시 실행 시 프로필 lock 충돌을 피하도록 호출마다 별도 프로필 사용
+        profile_uri = Path(td, "profile").as_uri()
+        proc = subprocess.Popen(
+            [
+                soffice,
+                f"-env:UserInstallation={profile_uri}",
+                "--headless",
+                "--convert-to",
+                _DESTINATIONS_FILTER if destinations else "pdf",
+                in_path,
+                "--outdir",
+                td,
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        try:
+            _, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_group(proc)
+            proc.communicate()
+            raise ConversionTimeout(f"LibreOffice 변환이 {timeout:.0f}초 안에 끝나지 않았습니다.")
+        finally:
+            # 정상 종료여도 남은 자식(soffice.bin) 정리
+            kill_group(proc)
+        if proc.returncode != 0:
+            raise ConversionError(
+                f"soffice 종료 코드 {proc.returncode}: {stderr.decode(errors='replace').strip()}"
+            )
+        if os.path.exists(out_path):
+            with open(out_path, "rb") as f:
+                return f.read()
+    return None
+
+
+# ---------- 상주 LibreOffice 서버 ---------- #
+
+class SofficeServer:
+    """
+    headless LibreOffice 를 UNO 소켓 리스너로 한 번 띄워 두고 변환 요청을 보낸다.
+    - 프로세스가 죽었거나 연결이 끊기면 다음 요청 때 자동으로 재시작
+    - 변환은 인스턴스 단위로 직렬화 (lock)
+    - 변환이 제한 시간을 넘기면 프로세스 그룹째 kill 하고 ConversionTimeout
+    """
+
+    def __init__(self, soffice: str, port: Optional[int] = None):
+        self.soffice = soffice
+        self.port = port or _free_port()
+        self.profile_dir = tempfile.mkdtemp(prefix="lo_profile_")
+        self.proc: Optional[subprocess.Popen] = None
+        self.desktop = None
+        self.lock = threading.Lock()
+        self.timed_out = False
+
+    @property
+    def accept_url(self) -> str:
+        return f"socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        """프로세스 기동 후 UNO 연결이 될 때까지 대기 (pre-warm)"""
+        self.stop()
+        self.proc = subprocess.Popen(
+            [
+                self.soffice,
+                "--headless",
+                "--invisible",
+                "--nologo",
+                "--nodefault",
+                "--norestore",
+                "--nolockcheck",
+                f"-env:UserInstallation={Path(self.profile_dir).as_uri()}",
+                f"--accept={self.accept_url}",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx
+        )
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:{self.accept_url}")
+                self.desktop = ctx.ServiceManager.createInstanceWithContext(
+                    "com.sun.star.frame.Desktop", ctx
+                )
+                return
+            except Exception:
+                if not self.alive() or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError("LibreOffice 서버 기동 실패")
+                time.sleep(0.25)
+
+    def stop(self):
+        self.desktop = None
+        if self.proc is not None:
+            kill_group(self.proc, signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                pass
+            kill_group(self.proc)
+            self.proc.wait()
+            self.proc = None
+
+    def _kill_hung(self):
+        self.timed_out = True
+        if self.proc is not None:
+            kill_group(self.proc)
+
+    def shutdown(self):
+        self.stop()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def _convert_once(self, in_path: str, out_path: str, destinations: bool = False):
+        doc = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(in_path), "_blank", 0, _props(Hidden=True)
+        )
+        if doc is None:
+            raise RuntimeError("LibreOffice 가 문서를 열지 못했습니다.")
+        options = {"FilterName": "writer_pdf_Export"}
+        if destinations:
+            options["FilterData"] = uno.Any(
+                "[]com.sun.star.beans.PropertyValue",
+                _props(ExportBookmarksToPDFDestination=True),
+            )
+        try:
+            # FilterData 는 PropertyValue 시퀀스 타입을 명시해야 해서 uno.invoke 로 호출
+            uno.invoke(doc, "storeToURL", (uno.systemPathToFileUrl(out_path), _props(**options)))
+        finally:
+            doc.close(True)
+
+    def _convert_with_deadline(
+        self, in_path: str, out_path: str, timeout: float, destinations: bool = False
+    ):
+        self.timed_out = False
+        watchdog = threading.Timer(timeout, self._kill_hung)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            self._convert_once(in_path, out_path, destinations)
+        except Exception:
+            if self.timed_out:
+                self.stop()
+                raise ConversionTimeout(
+                    f"LibreOffice 변환이 {timeout:.0f}초 안에 끝나지 않았습니다."
+                )
+            raise
+        finally:
+            watchdog.cancel()
+
+    def convert(
+        self,
+        docx_bytes: bytes,
+        timeout: float = CONVERT_TIMEOUT,
+        destinations: bool = False,
+        deadline: Optional[float] = None,
+    ) -> Optional[bytes]:
+        """deadline(monotonic) 이 있으면 재시작 후 재시도도 그 안에서만"""
+        with self.lock, tempfile.TemporaryDirectory() as td:
+            in_path = os.path.join(td, "doc.docx")
+            out_path = os.path.join(td, "doc.pdf")
+            with open(in_path, "wb") as f:
+                f.write(docx_bytes)
+
+            if not self.alive() or self.desktop is None:
+                self.start()
+            try:
+                self._convert_with_deadline(
+                    in_path, out_path, _remaining(deadline, timeout), destinations
+                )
+            except ConversionTimeout:
+                raise
+            except Exception:
+                # 연결 끊김/프로세스 사망 → 재시작 후 1회 재시도
+                _remaining(deadline, timeout)
+                self.start()
+                self._convert_with_deadline(
+                    in_path, out_path, _remaining(deadline, timeout), destinations
+                )
+
+            if os.path.exists(out_path):
+                with open(out_path, "rb") as f:
+                    return f.read()
+        return None
+
+
+# ---------- 변환기 풀 ---------- #
+
+class ConverterPool:
+    """
+    프로필 디렉터리를 각자 가진 SofficeServer 여러 개를 띄워 두고
+    유휴 서버에 작업을 배분한다. 동시 세션 수만큼 변환이 병렬로 진행된다.
+    """
+
+    def __init__(self, servers: List[SofficeServer]):
+        self.servers = servers
+        self.idle: "queue.Queue[SofficeServer]" = queue.Queue()
+        for server in servers:
+            self.idle.put(server)
+        self.waiting = 0  # 유휴 서버를 기다리는 변환 요청 수
+        self.lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.servers)
+
+    @property
+    def busy(self) -> int:
+        return len(self.servers) - self.idle.qsize()
+
+    def convert(
+        self, docx_bytes: bytes, destinations: bool = False, deadline: Optional[float] = None
+    ) -> Optional[bytes]:
+        with self.lock:
+            self.waiting += 1
+        try:
+            server = self.idle.get(timeout=_remaining(deadline, QUEUE_TIMEOUT))
+        except queue.Empty:
+            raise ConversionTimeout("사용 가능한 PDF 변환기를 기다리다 시간이 초과되었습니다.")
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        try:
+            return server.convert(docx_bytes, destinations=destinations, deadline=deadline)
+        finally:
+            self.idle.put(server)
+
+    def shutdown(self):
+        for server in self.servers:
+            server.shutdown()
+
+
+def start_pool(size: Optional[int] = None) -> Optional[ConverterPool]:
+    """서버 size 개를 병렬로 기동(pre-warm). UNO/soffice 가 없거나 하나도 못 띄우면 None"""
+    soffice = find_soffice()
+    if uno is None or soffice is None:
+        return None
+
+    servers = [SofficeServer(soffice) for _ in range(size or POOL_SIZE)]
+    started: List[SofficeServer] = []
+
+    def _start(server: SofficeServer):
+        try:
+            server.start()
+            started.append(server)
+        except Exception:
+            server.shutdown()
+
+    threads = [threading.Thread(target=_start, args=(srv,), daemon=True) for srv in servers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if not started:
+        return None
+    pool = ConverterPool(started)
+    atexit.register(pool.shutdown)
+    return pool
+
+
+# ---------- 재시도 / 서킷 브레이커 ---------- #
+
+class CircuitBreaker:
+    """
+    연속 실패가 threshold 번 쌓이면 cooldown 동안 열린(open) 상태가 되어 호출을 막는다.
+    cooldown 이 지나면 호출 하나만 시도해 보고(half-open) 성공하면 닫힘, 실패하면 다시 열림.
+    시도 중인 동안 다른 호출은 바로 막힌다 (시도가 결과를 남기지 못하고 cooldown 이 지나면 새 시도 허용).
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_at: Optional[float] = None  # half-open 시도를 통과시킨 시각
+        self.lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            now = time.monotonic()
+            if now - self.opened_at < self.cooldown:
+                return True
+            if self.probe_at is not None and now - self.probe_at < self.cooldown:
+                return True  # 다른 호출이 시도 중
+            # half-open: 이 호출 하나만 통과시킨다
+            self.probe_at = now
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probe_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self.probe_at = None
+
+
+BREAKER = CircuitBreaker()
+
+
+def convert(
+    docx_bytes: bytes,
+    pool: Optional[ConverterPool] = None,
+    retries: int = RETRIES,
+    backoff: float = BACKOFF,
+    destinations: bool = False,
+    timeout: float = CALL_TIMEOUT,
+) -> Optional[bytes]:
+    """
+    LibreOffice 로 변환: 풀 → 실패 시 cold spawn.
+    - 시도마다 CONVERT_TIMEOUT 적용, 실패하면 backoff(2배씩) 후 최대 retries 번 재시도
+    - 호출 전체(대기/재시도/재시작/cold spawn)는 timeout(CALL_TIMEOUT) 안에서만 — 넘으면 ConversionTimeout
+    - 연속 실패가 쌓여 서킷이 열려 있으면 바로 CircuitOpenError
+    - destinations=True 이면 책갈피를 PDF 이름 있는 대상으로 내보냄
+    """
+    if pool is None and find_soffice() is None:
+        return None
+    if BREAKER.is_open:
+        raise CircuitOpenError("PDF 변환이 연속으로 실패해 잠시 건너뜁니다.")
+
+    deadline = time.monotonic() + timeout
+    last_error: Optional[Exception] = None
+    for attempt in range(retries + 1):
+        if attempt:
+            delay = backoff * 2 ** (attempt - 1)
+            if time.monotonic() + delay >= deadline:
+                break  # 기다리면 제한 시간을 넘으므로 더 시도하지 않음
+            time.sleep(delay)
+        try:
+            pdf = None
+            if pool is not None:
+                try:
+                    pdf = pool.convert(docx_bytes, destinations, deadline)
+                except ConversionTimeout as e:
+                    # 이미 제한 시간을 다 쓴 시도 → cold spawn 으로 또 기다리지 않고 다음 시도로
+                    last_error = e
+                    continue
+                except Exception as e:
+                    last_error = e
+            if not pdf:
+                pdf = cold_convert(
+                    docx_bytes, _remaining(deadline, CONVERT_TIMEOUT), destinations=destinations
+                )
+            if pdf:
+                BREAKER.record_success()
+                return pdf
+        except Exception as e:
+            last_error = e
+        if time.monotonic() >= deadline:
+            break
+
+    BREAKER.record_failure()
+    if last_error is not None:
+        # 마지막 시도가 시간 초과였으면 호출 측이 구분할 수 있도록 ConversionTimeout 으로
+        error = ConversionTimeout if isinstance(last_error, ConversionTimeout) else ConversionError
+        raise error(str(last_error)) from last_error
+    return None
@@ -0,0 +1,809 @@
+import copy
+import io
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import deque
+from contextlib import nullcontext
+from functools import lru_cache
+from datetime import date, datetime
+from decimal import Decimal
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from zipfile import BadZipFile, ZipFile
+
+from docx import Document
+from docx.table import _Cell
+from docx.text.paragraph import Paragraph
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.cell import coordinate_from_string
+from openpyxl.utils.exceptions import InvalidFileException
+
+from blobstore import Blob
+from lru import SizedLRU
+
+# 고정 셀 토큰: {{B5}} = 선택 시트의 셀, {{시트!B5}} / {{'시트 이름'!B5}} = 다른 시트의 셀,
+# {{이름}} = 워크북에 정의된 이름. 토큰 키(괄호 안 문자열)가 그대로 셀 값 dict 의 키가 된다
+# (정의되지 않은 이름 — 오타나 소문자 {{b5}} 등 — 은 셀 값 dict 에 키가 없고 토큰 원문 그대로 남김)
+TOKEN_RE = re.compile(
+    r"\{\{((?:(?:'(?:[^']|'')+'|[\w.]+)!)?[A-Z]+[0-9]+|[^\W\d][\w.]*)(?:\|([^}]+))?\}\}"
+)
+# 일괄 생성용 행 기준 토큰: {{B#}} = B열의 "현재 행"
+ROW_TOKEN_RE = re.compile(r"\{\{([A-Z]+)#(?:\|([^}]+))?\}\}")
+DATE_TOKENS = ("YYYY년 MM월 DD일", "YYYY 년 MM 월 DD 일")
+TARGET_SHEET = "2. 배정후 청약시"
+# 일괄 생성 중 같은 값의 행끼리 문서를 재사용할 때 보관하는 용량 상한 (MB)
+BATCH_MEMO_MB = int(os.environ.get("BATCH_MEMO_MB", "64"))
+
+# 입력 파일: 메모리의 bytes 또는 저장소의 파일 핸들
+Data = Union[bytes, Blob]
+
+
+# ---------- 값 포맷 ---------- #
+
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_ISO_DATE_ASCII_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})", re.ASCII)
+_NUMBER_TEXT_RE = re.compile(r"-?\d+(\.\d+)?")
+_NUMBER_FMT_RE = re.compile(r"[#,0]+(?:\.[0#]+)?")
+# float 로 바꿔도 넘치지 않는 int 범위 (이 밖은 아래 일반 경로에서 처리)
+_FLOAT_SAFE = 10 ** 308
+
+
+def _date_text(v) -> str:
+    return f"{v.year}. {v.month}. {v.day}."
+
+
+def _parse_iso_date(v: str) -> Optional[date]:
+    """"YYYY-MM-DD" 문자열 → date (모양이 아니면 None, 없는 날짜면 ValueError)"""
+    s = v.strip()
+    m = _ISO_DATE_ASCII_RE.fullmatch(s)
+    if m:
+        return date(int(m[1]), int(m[2]), int(m[3]))
+    if _ISO_DATE_RE.fullmatch(s):  # ASCII 가 아닌 숫자
+        return datetime.strptime(s, "%Y-%m-%d").date()
+    return None
+
+
+def try_format_as_date(v) -> str:
+    if isinstance(v, (datetime, date)):
+        return _date_text(v)
+    if isinstance(v, str):
+        try:
+            dt = _parse_iso_date(v)
+        except ValueError:
+            return ""
+        if dt is not None:
+            return _date_text(dt)
+    return ""
+
+
+def fmt_number(v) -> str:
+    if isinstance(v, (int, float, Decimal)):
+        try:
+            return f"{float(v):,.0f}"
+        except (ValueError, OverflowError):  # signaling NaN / 너무 큰 int
+            return ""
+    if isinstance(v, str):
+        raw = v.replace(",", "")
+        if _NUMBER_TEXT_RE.fullmatch(raw):
+            return f"{float(raw):,.0f}"
+    return ""
+
+
+def _text_generic(v) -> str:
+    s = try_format_as_date(v)
+    if s:
+        return s
+    s = fmt_number(v)
+    if s:
+        return s
+    return "" if v is None else str(v)
+
+
+def _text_int(v: int) -> str:
+    if -_FLOAT_SAFE < v < _FLOAT_SAFE:
+        return f"{float(v):,.0f}"
+    return _text_generic(v)
+
+
+# 셀 값 타입별 변환 (정확히 이 타입일 때만, 하위 클래스 등은 일반 경로)
+_TEXT_BY_TYPE: Dict[type, Callable[[Any], str]] = {
+    type(None): lambda v: "",
+    float: lambda v: f"{v:,.0f}",
+    int: _text_int,
+    bool: lambda v: f"{float(v):,.0f}",
+    datetime: _date_text,
+    date: _date_text,
+}
+
+
+def value_to_text(v) -> str:
+    """날짜 → "2024. 3. 1.", 숫자(숫자 모양 문자열 포함) → 천 단위 구분 정수, 그 외 str"""
+    return _TEXT_BY_TYPE.get(type(v), _text_generic)(v)
+
+
+def _date_formatter(fmt: str) -> Callable[[Any], str]:
+    pattern = fmt.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d")
+    # % 가 없으면 str.format 으로 같은 결과 (%Y 는 1000년 이후만 네 자리로 같음)
+    template = None
+    if "%" not in fmt:
+        template = (
+            fmt.replace("{", "{{").replace("}", "}}")
+            .replace("YYYY", "{0}").replace("MM", "{1:02d}").replace("DD", "{2:02d}")
+        )
+
+    def _format(value) -> str:
+        if isinstance(value, str):
+            value = _parse_iso_date(value) or value
+        if isinstance(value, (datetime, date)):
+            if template is not None and value.year >= 1000:
+                return template.format(value.year, value.month, value.day)
+            return value.strftime(pattern)
+        return value_to_text(value)
+
+    return _format
+
+
+def _number_formatter(fmt: str) -> Callable[[Any], str]:
+    decimals = len(fmt.split(".")[1]) if "." in fmt else 0
+    spec = f",.{decimals}f"
+
+    def _format(value) -> str:
+        t = type(value)
+        if t is float:
+            num = value
+        elif t is int and -_FLOAT_SAFE < value < _FLOAT_SAFE:
+            num = float(value)
+        else:
+            # 문자열 등: 쉼표를 뺀 문자열을 숫자로 읽을 수 있을 때만
+            try:
+                num = float(str(value).replace(",", ""))
+            except ValueError:
+                return value_to_text(value)
+        return format(num, spec)
+
+    return _format
+
+
+@lru_cache(maxsize=1024)
+def compile_format(fmt: Optional[str]) -> Callable[[Any], str]:
+    """
+    인라인 포맷({{A1|#,###}} 의 "#,###") → 값 변환 함수. 포맷 문자열마다 한 번만 해석.
+    - YYYY/MM/DD 가 있으면 날짜 포맷 (예: YYYY.MM.DD)
+    - #, 0, 쉼표, 소수점으로만 되어 있으면 숫자 포맷 (소수 자리 = 소수점 뒤 글자 수)
+    - 그 외(없음 포함)는 value_to_text
+    """
+    if not fmt or not fmt.strip():
+        return value_to_text
+    if any(tok in fmt for tok in ("YYYY", "MM", "DD")):
+        return _date_formatter(fmt)
+    if _NUMBER_FMT_RE.fullmatch(fmt.replace(",", "")):
+        return _number_formatter(fmt)
+    return value_to_text
+
+
+def apply_inline_format(value, fmt: Optional[str]) -> str:
+    return compile_format(fmt)(value)
+
+
+# ---------- DOCX 치환 ---------- #
+
+def replace_in_paragraph(paragraph: Paragraph, repl_func):
+    if not paragraph.text:
+        return
+    new_text = repl_func(paragraph.text)
+    if new_text == paragraph.text:
+        return
+    set_paragraph_text(paragraph, new_text)
+
+
+def set_paragraph_text(paragraph: Paragraph, new_text: str):
+    """첫 run 에 전체 텍스트를 넣고 나머지 run 은 비운다 (첫 run 서식 유지)"""
+    for run in paragraph.runs:
+        run.text = ""
+    if paragraph.runs:
+        paragraph.runs[0].text = new_text
+    else:
+        paragraph.add_run(new_text)
+
+
+def replace_in_table(cell: _Cell, repl_func):
+    for p in cell.paragraphs:
+        replace_in_paragraph(p, repl_func)
+    for t in cell.tables:
+        for row in t.rows:
+            for c in row.cells:
+                replace_in_table(c, repl_func)
+
+
+def iter_block_items(parent):
+    if hasattr(parent, "paragraphs") and hasattr(parent, "tables"):
+        for p in parent.paragraphs:
+            yield p
+        for t in parent.tables:
+            for row in t.rows:
+                for cell in row.cells:
+                    for item in iter_block_items(cell):
+                        yield item
+
+
+def replace_everywhere(doc: Document, repl_func):
+    for item in iter_block_items(doc):
+        if isinstance(item, Paragraph):
+            replace_in_paragraph(item, repl_func)
+    for section in doc.sections:
+        for container in (section.header, section.footer):
+            for item in iter_block_items(container):
+                if isinstance(item, Paragraph):
+                    replace_in_paragraph(item, repl_func)
+
+
+def iter_parts(doc: Document) -> Iterator[Tuple[str, Any]]:
+    """(파트 이름, 컨테이너): 본문, 섹션별 머리글/바닥글"""
+    yield "body", doc
+    for i, section in enumerate(doc.sections, start=1):
+        yield f"header{i}", section.header
+        yield f"footer{i}", section.footer
+
+
+def iter_all_paragraphs(doc: Document) -> Iterator[Paragraph]:
+    """본문 + 머리글/바닥글 문단 (연결된 머리글은 한 번만)"""
+    for _, p in iter_located_paragraphs(doc):
+        yield p
+
+
+def iter_located_paragraphs(doc: Document) -> Iterator[Tuple[str, Paragraph]]:
+    # id() 는 lxml 프록시가 해제되면 재사용되므로 요소 자체를 보관해 비교
+    seen = set()
+    for part, container in iter_parts(doc):
+        for item in iter_block_items(container):
+            if isinstance(item, Paragraph) and item._p not in seen:
+                seen.add(item._p)
+                yield part, item
+
+
+def _unresolved(cells, key: str) -> bool:
+    """정의되지 않은 이름 토큰이면 True (비워 버리지 않고 원문을 남겨 템플릿 오류가 눈에 띄게)"""
+    if isinstance(cells, dict) and key in cells:
+        return False
+    return _token_ref(key)[1] is None
+
+
+def _cell_value(cells, addr: str):
+    if isinstance(cells, dict):
+        return cells.get(addr)
+    try:
+        return cells[addr].value
+    except Exception:
+        return None
+
+
+def make_replacer(ws, row: Optional[Dict[str, Any]] = None):
+    """
+    ws  : 워크시트 또는 {주소: 값} dict
+    row : 일괄 생성 시 현재 행의 {열: 값} ({{B#}} 토큰용)
+    """
+    def _repl(text: str) -> str:
+        def sub(m):
+            addr, fmt = m.group(1), m.group(2)
+            if _unresolved(ws, addr):
+                return m.group(0)
+            return apply_inline_format(_cell_value(ws, addr), fmt)
+
+        def row_sub(m):
+            col, fmt = m.group(1), m.group(2)
+            return apply_inline_format(row.get(col), fmt)
+
+        replaced = TOKEN_RE.sub(sub, text)
+        if row is not None:
+            replaced = ROW_TOKEN_RE.sub(row_sub, replaced)
+
+        today = datetime.today()
+        today_str = f"{today.year}년 {today.month}월 {today.day}일"
+        for token in DATE_TOKENS:
+            replaced = replaced.replace(token, today_str)
+
+        return replaced
+
+    return _repl
+
+
+# ---------- 템플릿 토큰 ---------- #
+
+def _has_token(text: str) -> bool:
+    return "{{" in text or any(token in text for token in DATE_TOKENS)
+
+
+# ---------- 컴파일된 템플릿 ---------- #
+
+_DATE_TOKEN_RE = re.compile("|".join(re.escape(token) for token in DATE_TOKENS))
+
+# 세그먼트: (종류, 키, 포맷, 원문) — 종류는 "text" | "cell" | "row" | "date"
+Segment = Tuple[str, str, Optional[str], str]
+
+
+def _split(text: str, pattern, kind: str, rest) -> List[Segment]:
+    segments: List[Segment] = []
+    pos = 0
+    for m in pattern.finditer(text):
+        segments.extend(rest(text[pos:m.start()]))
+        key = m.group(1) if m.groups() else ""
+        fmt = m.group(2) if m.re.groups > 1 else None
+        segments.append((kind, key, fmt, m.group(0)))
+        pos = m.end()
+    segments.extend(rest(text[pos:]))
+    return segments
+
+
+def _literal(text: str) -> List[Segment]:
+    return [("text", "", None, text)] if text else []
+
+
+def compile_text(text: str) -> List[Segment]:
+    """문단 텍스트를 리터럴/토큰 세그먼트로 분해 (make_replacer 의 치환 순서와 동일)"""
+    def dates(t):
+        return _split(t, _DATE_TOKEN_RE, "date", _literal)
+
+    def rows(t):
+        return _split(t, ROW_TOKEN_RE, "row", dates)
+
+    return _split(text, TOKEN_RE, "cell", rows)
+
+
+def no_stage(name: str, bytes_in: int = 0) -> ContextManager:
+    """render(stage=...) 기본값: 계측 없음 (timing.StageTimer.stage 와 같은 모양)"""
+    return nullcontext({"bytes_out": 0})
+
+
+def render_segments(
+    segments: List[Segment],
+    cells: Dict[str, Any],
+    row: Optional[Dict[str, Any]],
+    today_str: str,
+) -> str:
+    out = []
+    for kind, key, fmt, raw in segments:
+        if kind == "text":
+            out.append(raw)
+        elif kind == "cell":
+            if key not in cells and _unresolved(cells, key):
+                out.append(raw)
+            else:
+                out.append(apply_inline_format(cells.get(key), fmt))
+        elif kind == "row":
+            out.append(raw if row is None else apply_inline_format(row.get(key), fmt))
+        else:
+            out.append(today_str)
+    return "".join(out)
+
+
+class CompiledTemplate:
+    """
+    템플릿을 한 번 파싱하면서 토큰이 있는 문단의 위치(파트)와 세그먼트를 기록해 둔다.
+    렌더링 시에는 기록된 문단만 다시 조립 → 저장 → 원본 XML 로 되돌린다.
+    하나의 인스턴스를 여러 세션/행에서 공유하므로 render 는 lock 으로 직렬화.
+    """
+
+    kind = "docx"
+
+    def __init__(self, docx_bytes: Data):
+        self.size = len(docx_bytes)
+        with open_data(docx_bytes) as f:
+            self.doc = Document(f)
+        self.lock = threading.Lock()
+        self.parts: List[str] = []
+        self.paragraphs: List[Paragraph] = []
+        self.segments: List[List[Segment]] = []
+        for part, p in iter_located_paragraphs(self.doc):
+            text = p.text
+            if not _has_token(text):
+                continue
+            segments = compile_text(text)
+            if all(kind == "text" for kind, *_ in segments):
+                continue
+            self.parts.append(part)
+            self.paragraphs.append(p)
+            self.segments.append(segments)
+        self.originals = [copy.deepcopy(p._p) for p in self.paragraphs]
+
+        self.addrs: Set[str] = set()
+        self.cols: Set[str] = set()
+        for segments in self.segments:
+            for kind, key, _, _ in segments:
+                if kind == "cell":
+                    self.addrs.add(key)
+                elif kind == "row":
+                    self.cols.add(key)
+
+    def tokens(self) -> Tuple[Set[str], Set[str]]:
+        """(고정 셀 주소, 행 기준 열) 집합"""
+        return set(self.addrs), set(self.cols)
+
+    def render(
+        self,
+        cells: Dict[str, Any],
+        row: Optional[Dict[str, Any]] = None,
+        stage: Callable[..., ContextManager] = no_stage,
+    ) -> bytes:
+        today = datetime.today()
+        today_str = f"{today.year}년 {today.month}월 {today.day}일"
+        with self.lock:
+            try:
+                with stage("치환"):
+                    for p, segments in zip(self.paragraphs, self.segments):
+                        new_text = render_segments(segments, cells, row, today_str)
+                        if new_text != p.text:
+                            set_paragraph_text(p, new_text)
+                with stage("DOCX 저장") as rec:
+                    buf = io.BytesIO()
+                    self.doc.save(buf)
+                    rec["bytes_out"] = buf.tell()
+                return buf.getvalue()
+            finally:
+                self._restore()
+
+    def _restore(self):
+        for i, (p, original) in enumerate(zip(self.paragraphs, self.originals)):
+            fresh = copy.deepcopy(original)
+            p._p.getparent().replace(p._p, fresh)
+            self.paragraphs[i] = Paragraph(fresh, p._parent)
+
+
+# 치환 엔진: "docx" = python-docx 객체 모델, "xml" = DOCX zip/XML 직접 스트리밍
+TEMPLATE_ENGINES = {"docx": "python-docx", "xml": "XML 스트리밍"}
+
+
+def make_template(docx_bytes: Data, kind: str = "docx"):
+    """엔진 종류에 맞는 템플릿 (CompiledTemplate 또는 xml_engine.XmlTemplate)"""
+    if kind == "xml":
+        # xml_engine 이 engine 을 import 하므로 순환 import 를 피해 여기서 가져온다
+        from xml_engine import XmlTemplate
+
+        return XmlTemplate(docx_bytes)
+    return CompiledTemplate(docx_bytes)
+
+
+# ---------- 입력 데이터 ---------- #
+
+def open_data(data: Data) -> BinaryIO:
+    """bytes 또는 Blob(메모리 맵) → 읽기용 파일 객체"""
+    return data.open() if isinstance(data, Blob) else io.BytesIO(data)
+
+
+# ---------- 엑셀 로드 ---------- #
+
+def load_workbook_from_bytes(
+    data: Data, filename: str = "file.xlsx", read_only: bool = False, data_only: bool = True
+) -> Workbook:
+    """data_only=False 면 수식 셀의 값 대신 수식 문자열을 읽는다 (formula 계산기용)"""
+    if not data:
+        raise InvalidFileException("엑셀 파일이 비어 있습니다 (0 bytes).")
+    try:
+        return load_workbook(filename=open_data(data), read_only=read_only, data_only=data_only)
+    except BadZipFile:
+        raise InvalidFileException("엑셀 파일이 손상되었거나 XLS 형식일 수 있습니다.")
+    except Exception as e:
+        raise InvalidFileException(f"엑셀 파일 로드 오류: {e}")
+
+
+def read_sheetnames(data: Data) -> List[str]:
+    """xl/workbook.xml 만 읽어 시트 이름 목록을 돌려준다 (시트 데이터는 로드하지 않음)"""
+    if not data:
+        raise InvalidFileException("엑셀 파일이 비어 있습니다 (0 bytes).")
+    try:
+        with open_data(data) as f, ZipFile(f) as zf:
+            root = ET.fromstring(zf.read("xl/workbook.xml"))
+    except (BadZipFile, KeyError):
+        raise InvalidFileException("엑셀 파일이 손상되었거나 XLS 형식일 수 있습니다.")
+    except ET.ParseError as e:
+        raise InvalidFileException(f"엑셀 파일 로드 오류: {e}")
+    # transitional/strict 네임스페이스 모두 허용
+    return [el.get("name") for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "sheet"]
+
+
+def sheet_name(sheets: List[str], sheet: Optional[str] = None) -> str:
+    """지정 시트 → 없으면 TARGET_SHEET → 없으면 첫 시트 (시트 이름 목록만으로 고름)"""
+    if sheet:
+        if sheet not in sheets:
+            raise InvalidFileException(
+                f"엑셀 파일에 '{sheet}' 시트가 없습니다. (시트: {', '.join(sheets)})"
+            )
+        return sheet
+    return TARGET_SHEET if TARGET_SHEET in sheets else sheets[0]
+
+
+def pick_sheet(wb: Workbook, sheet: Optional[str] = None):
+    return wb[sheet_name(wb.sheetnames, sheet)]
+
+
+def _is_blank(v) -> bool:
+    return v is None or (isinstance(v, str) and not v.strip())
+
+
+_SHEET_REF_RE = re.compile(r"^(?:('(?:[^']|'')+'|[\w.]+)!)?([A-Z]+[0-9]+)$")
+
+
+def _token_ref(key: str) -> Tuple[Optional[str], Optional[str]]:
+    """토큰 키 → (시트 이름, 주소). 시트를 쓰지 않았으면 시트 None, 정의된 이름이면 주소 None"""
+    m = _SHEET_REF_RE.match(key)
+    if m is None:
+        return None, None
+    sheet, addr = m.groups()
+    if sheet is not None and sheet.startswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, addr
+
+
+def _name_cell(wb: Workbook, sheet: str, name: str) -> Optional[Tuple[str, str]]:
+    """
+    셀 하나를 가리키는 정의된 이름 → (시트, 주소). 시트 범위 이름이 워크북 이름보다 우선.
+    없는 이름이나 상수/수식/범위를 가리키는 이름은 None (formula 계산기에 맡김)
+    """
+    wanted = name.upper()
+    for scope in (wb[sheet].defined_names, wb.defined_names):
+        defined = next((d for n, d in scope.items() if n.upper() == wanted), None)
+        if defined is None:
+            continue
+        if defined.type != "RANGE":
+            return None
+        destinations = list(defined.destinations)
+        if len(destinations) != 1 or ":" in destinations[0][1]:
+            return None
+        title, ref = destinations[0]
+        return title, ref.replace("$", "")
+    return None
+
+
+def _has_name(wb: Workbook, sheet: str, name: str) -> bool:
+    """시트 범위 또는 워크북 범위에 정의된 이름인지 (대소문자 무시)"""
+    wanted = name.upper()
+    return any(n.upper() == wanted for scope in (wb[sheet].defined_names, wb.defined_names) for n in scope)
+
+
+def _read_addrs(ws, addrs: Iterable[str]) -> Dict[str, Any]:
+    """시트 하나에서 주소들의 값만 읽는다 (참조된 행/열 범위만 스트리밍, 마지막 행을 지나면 멈춤)"""
+    coords = {addr: coordinate_from_string(addr) for addr in addrs}
+    values: Dict[str, Any] = {addr: None for addr in coords}
+    if not coords:
+        return values
+
+    min_row = min(r for _, r in coords.values())
+    max_row = max(r for _, r in coords.values())
+    min_col = min(column_index_from_string(c) for c, _ in coords.values())
+    max_col = max(column_index_from_string(c) for c, _ in coords.values())
+    wanted: Dict[int, List[Tuple[str, int]]] = {}
+    for addr, (col, r) in coords.items():
+        wanted.setdefault(r, []).append((addr, column_index_from_string(col) - min_col))
+
+    for r, row in enumerate(
+        ws.iter_rows(
+            min_row=min_row,
+            max_row=max_row,
+            min_col=min_col,
+            max_col=max_col,
+            values_only=True,
+        ),
+        start=min_row,
+    ):
+        for addr, i in wanted.get(r, ()):
+            values[addr] = row[i] if i < len(row) else None
+    return values
+
+
+def read_cells(data: Data, sheet: Optional[str], addrs: Iterable[str]) -> Dict[str, Any]:
+    """
+    템플릿이 참조하는 토큰 키의 값만 {키: 값} 으로 읽는다.
+    - 키: "B5" (선택 시트), "시트!B5" (다른 시트), "이름" (정의된 이름)
+    - 토큰이 참조한 시트만 시트마다 한 번씩 read_only 로 스트리밍하고, 참조된 마지막 행을 지나면 멈춘다
+      (참조되지 않은 시트는 읽지 않음)
+    - 캐시된 값이 없는 수식 셀과 상수/수식 이름은 formula 계산기로 채운다.
+    - 정의되지 않은 이름은 결과에서 빠진다 (렌더링할 때 토큰 원문 그대로 둠)
+    """
+    keys = list(addrs)
+    values: Dict[str, Any] = {key: None for key in keys}
+    if not keys:
+        return values
+
+    # 시트 → {주소: [토큰 키]} (같은 셀을 가리키는 키가 여럿일 수 있음)
+    plan: Dict[str, Dict[str, List[str]]] = {}
+    names: List[str] = []
+    wb = load_workbook_from_bytes(data, read_only=True)
+    try:
+        chosen = pick_sheet(wb, sheet).title
+        titles = {title.lower(): title for title in wb.sheetnames}
+        for key in keys:
+            ref_sheet, addr = _token_ref(key)
+            if addr is None:
+                if not _has_name(wb, chosen, key):
+                    values.pop(key, None)
+                    continue
+                dest = _name_cell(wb, chosen, key)
+                if dest is None:
+                    names.append(key)
+                    continue
+                title, addr = dest
+            elif ref_sheet is None:
+                title = chosen
+            else:
+                title = titles.get(ref_sheet.lower())
+                if title is None:
+                    raise InvalidFileException(f"엑셀 파일에 '{ref_sheet}' 시트가 없습니다 ({{{{{key}}}}}).")
+            plan.setdefault(title, {}).setdefault(addr, []).append(key)
+        for title, by_addr in plan.items():
+            for addr, v in _read_addrs(wb[title], by_addr).items():
+                for key in by_addr[addr]:
+                    values[key] = v
+    finally:
+        wb.close()
+
+    # formula 가 engine 을 import 하므로 순환 import 를 피해 여기서 가져온다
+    from formula import fill_missing, name_value
+
+    for title, by_addr in plan.items():
+        missing = {addr: None for addr, ks in by_addr.items() if values[ks[0]] is None}
+        for addr, v in fill_missing(data, title, missing).items():
+            for key in by_addr[addr]:
+                values[key] = v
+    for key in names:
+        values[key] = name_value(data, chosen, key)
+    return values
+
+
+def count_rows(data: Data, sheet: Optional[str], start_row: int) -> Optional[int]:
+    """start_row 이후 행 수의 상한 (시트 dimension 기준, 빈 행 포함). 알 수 없으면 None"""
+    wb = load_workbook_from_bytes(data, read_only=True)
+    try:
+        max_row = pick_sheet(wb, sheet).max_row
+    finally:
+        wb.close()
+    return None if max_row is None else max(0, max_row - start_row + 1)
+
+
+def stream_rows(
+    data: Data, sheet: Optional[str], cols: Iterable[str], start_row: int
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    start_row 부터 한 행씩 {열: 값} 을 내보낸다. 참조 열이 모두 빈 행은 건너뜀.
+    참조 열에 캐시된 값이 없는 수식 셀이 있으면 그 셀만 formula 계산기로 채운다
+    (이때는 행 전체를 읽어 계산기에 넘겨 같은 행을 참조하는 수식이 시트를 다시 읽지 않게 함).
+    """
+    from formula import sheet_reader
+
+    index = {col: column_index_from_string(col) - 1 for col in cols}
+    max_col = max(index.values()) + 1 if index else 1
+
+    wb = load_workbook_from_bytes(data, read_only=True)
+    reader = None
+    try:
+        ws = pick_sheet(wb, sheet)
+        reader = sheet_reader(data, ws.title)
+        if reader is not None and not any(c - 1 in index.values() for _, c in reader.formulas):
+            reader.close()
+            reader = None
+        for r, values in enumerate(
+            ws.iter_rows(
+                min_row=start_row, max_col=None if reader else max_col, values_only=True
+            ),
+            start=start_row,
+        ):
+            row = {col: values[i] if i < len(values) else None for col, i in index.items()}
+            if reader is not None:
+                reader.feed(r, values)
+                for col, i in index.items():
+                    if row[col] is None and (r, i + 1) in reader.formulas:
+                        row[col] = reader.value(r, i + 1)
+            if all(_is_blank(v) for v in row.values()):
+                continue
+            yield r, row
+    finally:
+        if reader is not None:
+            reader.close()
+        wb.close()
+
+
+def row_key(row: Dict[str, Any], cols: List[str]) -> tuple:
+    # 1 == 1.0 == True 처럼 값은 같아도 포맷 결과가 다를 수 있어 타입도 키에 포함
+    return tuple((type(row.get(c)).__name__, row.get(c)) for c in cols)
+
+
+def render_batch(
+    xlsx_data: Data,
+    docx_data: Data,
+    sheet: Optional[str],
+    start_row: int = 2,
+    extra_cols: Iterable[str] = (),
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    template=None,
+    memo: Optional[SizedLRU] = None,
+    fixed: Optional[Dict[str, Any]] = None,
+) -> Iterator[Tuple[int, Dict[str, Any], Optional[bytes], Optional[str]]]:
+    """
+    행마다 문서 1개씩 (행 번호, 행 값, DOCX bytes, 오류) 를 내보낸다.
+    - 템플릿은 한 번만 파싱, 시트는 read_only 로 스트리밍
+    - extra_cols: 템플릿에 없어도 함께 읽을 열 (파일명용 등)
+    - workers > 1 이면 프로세스 풀(render_pool)로 분산, 결과 순서는 유지
+    - 행 하나의 렌더링 실패는 해당 행의 오류 메시지로만 남고 나머지는 계속 진행
+    - template: 캐시된 템플릿(CompiledTemplate/XmlTemplate)이 있으면 재사용
+    - 참조 열 값이 앞선 행과 같은 행은 다시 렌더링하지 않고 같은 bytes 객체를 돌려준다
+      (memo: 재사용할 문서를 담아 둘 LRU, 기본 BATCH_MEMO_MB — 이전 실행 결과를 미리 담아 둘 수 있음)
+    - fixed: 이미 읽어 둔 고정 셀 {주소: 값} (없으면 워크북에서 읽음)
+    """
+    template = template or CompiledTemplate(docx_data)
+    addrs, cols = template.tokens()
+    if not cols:
+        raise InvalidFileException("템플릿에 행 기준 토큰({{B#}} 형식)이 없습니다.")
+    key_cols = sorted(cols)
+    memo = memo if memo is not None else SizedLRU(BATCH_MEMO_MB * 1024 * 1024)
+
+    if fixed is None:
+        fixed = read_cells(xlsx_data, sheet, addrs)
+    rows = stream_rows(xlsx_data, sheet, cols | set(extra_cols), start_row)
+
+    def _render_local(row):
+        try:
+            return template.render(fixed, row), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+    if workers <= 1:
+        for r, row in rows:
+            key = row_key(row, key_cols)
+            docx_bytes, error = memo.get(key), None
+            if docx_bytes is None:
+                docx_bytes, error = _render_local(row)
+                if docx_bytes is not None:
+                    memo.put(key, docx_bytes, len(docx_bytes))
+            yield r, row, docx_bytes, error
+        return
+
+    # render_pool 이 engine 을 import 하므로 순환 import 를 피해 여기서 가져온다
+    from render_pool import RenderPool
+
+    # (행 번호, 행 값, 키, 앞선 행과 중복 여부)
+    pending: "deque[Tuple[int, Dict[str, Any], tuple, bool]]" = deque()
+    seen: Set[tuple] = set()
+
+    def _unique_rows():
+        for r, row in rows:
+            key = row_key(row, key_cols)
+            dup = key in seen or key in memo
+            seen.add(key)
+            pending.append((r, row, key, dup))
+            if not dup:
+                yield row
+
+    def _flush_dups():
+        # 중복 행은 원본 행이 먼저 나가므로 memo 에 있다 (밀려났거나 실패했으면 여기서 렌더링)
+        # memo 에 미리 있던 행도 여기서 나간다
+        while pending and pending[0][3]:
+            r, row, key, _ = pending.popleft()
+            docx_bytes, error = memo.get(key), None
+            if docx_bytes is None:
+                docx_bytes, error = _render_local(row)
+            yield r, row, docx_bytes, error
+
+    with RenderPool(
+        docx_data, fixed, kind=template.kind, workers=workers, chunksize=chunksize
+    ) as pool:
+        for docx_bytes, error in pool.map(_unique_rows()):
+            yield from _flush_dups()
+            r, row, key, _ = pending.popleft()
+            if docx_bytes is not None:
+                memo.put(key, docx_bytes, len(docx_bytes))
+            yield r, row, docx_bytes, error
+        yield from _flush_dups()
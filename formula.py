@@ -0,0 +1,1351 @@
+"""
+캐시된 값이 없는 수식 셀 계산기.
+
+스크립트로 만들었거나 Excel 에서 한 번도 저장하지 않은 워크북은 data_only=True 로 읽으면
+수식 셀이 None 이다. 템플릿이 참조한 셀에서 출발해 그 셀이 의존하는 셀만 따라가며
+자주 쓰는 함수(SUM, ROUND, IF, VLOOKUP, 날짜 계산 등)로 값을 계산한다.
+- 수식 파싱 결과는 수식 문자열로 캐시 (같은 수식은 한 번만 파싱)
+- 셀 결과와 함수 호출 같은 부분식 결과는 워크북(내용 해시)별로 캐시해
+  일괄 생성의 행마다 같은 부분식(SUM($D$2:$D$100) 등)을 다시 계산하지 않음
+- 계산 대상은 시트 XML 에서 훑은 "값이 없는 수식 셀" 뿐이고, 의존하는 셀은 필요한 행까지만
+  스트리밍해 읽는다 (시트 전체를 메모리에 올리지 않음, 범위는 FORMULA_MAX_CELLS 까지)
+- 지원하지 않는 함수/순환 참조/문법 오류면 지금처럼 None
+"""
+import hashlib
+import html
+import logging
+import math
+import os
+import re
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from decimal import ROUND_DOWN, ROUND_HALF_UP, ROUND_UP, Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from zipfile import BadZipFile, ZipFile
+
+from openpyxl.formula.tokenizer import Token, Tokenizer, TokenizerError
+from openpyxl.formula.translate import Translator
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.cell import coordinate_from_string
+from openpyxl.utils.datetime import from_excel, to_excel
+from openpyxl.utils.exceptions import CellCoordinatesException
+
+from blobstore import Blob
+from engine import load_workbook_from_bytes, open_data
+from lru import SizedLRU
+
+logger = logging.getLogger("leewoon.formula")
+
+# 0 이면 수식을 계산하지 않음 (캐시된 값이 없는 수식 셀은 None 그대로)
+FORMULA_EVAL = os.environ.get("FORMULA_EVAL", "1") != "0"
+# 워크북별 계산기(수식 색인, 계산 결과)를 보관하는 용량 상한 (MB)
+FORMULA_CACHE_MB = int(os.environ.get("FORMULA_CACHE_MB", "128"))
+# 계산 중 메모리에 두는 저장된 값 셀 수 상한 (시트별 행 창 크기, 범위 하나의 크기 상한)
+FORMULA_MAX_CELLS = int(os.environ.get("FORMULA_MAX_CELLS", "250000"))
+
+_CELL_BYTES = 120  # 캐시 크기 계산용 셀 1개의 대략적인 크기
+_FORMULA_TAG_RE = re.compile(rb"<(?:\w+:)?f[\s>/]")
+# 수식이 있는 셀: (셀 속성, 수식 속성, 수식 문자열, 캐시된 값이 있으면 그 첫 글자)
+_FORMULA_CELL_RE = re.compile(
+    rb"<(?:\w+:)?c\b([^>]*)>\s*<(?:\w+:)?f\b([^>]*?)(?:/>|>([^<]*)</(?:\w+:)?f>)"
+    rb"(?:\s*<(?:\w+:)?v>([^<]))?"
+)
+_ERRORS = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"}
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_MAIN_NS = re.compile(r"^\{[^}]*\}")
+
+
+class FormulaError(Exception):
+    """계산할 수 없는 수식 (지원하지 않는 함수, 순환 참조, 문법 오류)"""
+
+
+class ExcelError(str):
+    """#DIV/0!, #N/A 같은 Excel 오류 값"""
+
+
+class _Raise(Exception):
+    """계산 중 Excel 오류 값 전파 (IFERROR 등에서 잡음)"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.value = ExcelError(code)
+
+
+DIV0, NA, VALUE, REF, NAME, NUM = "#DIV/0!", "#N/A", "#VALUE!", "#REF!", "#NAME?", "#NUM!"
+
+
+class Grid(tuple):
+    """범위 값: 행들의 튜플"""
+
+    def flat(self) -> Iterable[Any]:
+        for row in self:
+            yield from row
+
+
+# ---------- 파싱 ---------- #
+
+_INFIX = {
+    "=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1,
+    "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5,
+}
+_PREFIX = 7  # 단항 -/+ 는 ^ 보다 먼저 (=-2^2 → 4)
+
+_REF_RE = re.compile(r"^(?:(?P<sheet>'(?:[^']|'')+'|[^!]+)!)?(?P<ref>[^!]+)$")
+_CELL_RE = re.compile(r"^\$?([A-Za-z]{1,3})\$?(\d+)$")
+_COLS_RE = re.compile(r"^\$?([A-Za-z]{1,3}):\$?([A-Za-z]{1,3})$")
+_ROWS_RE = re.compile(r"^\$?(\d+):\$?(\d+)$")
+
+
+def _reference(text: str) -> tuple:
+    """
+    셀/범위/이름 참조 → ("ref", 시트, 행, 열) | ("range", 시트, 행1, 열1, 행2, 열2) | ("name", 시트, 이름)
+    범위의 끝 행/열이 None 이면 시트 끝까지 (A:A, 1:1).
+    """
+    m = _REF_RE.match(text)
+    if m is None:
+        raise FormulaError(f"참조를 읽을 수 없습니다: {text}")
+    sheet, ref = m.group("sheet"), m.group("ref")
+    if sheet is not None and sheet.startswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    if ref.startswith("#"):
+        return ("err", ref)
+    parts = ref.split(":")
+    if len(parts) == 1:
+        cell = _CELL_RE.match(ref)
+        if cell:
+            return ("ref", sheet, int(cell.group(2)), column_index_from_string(cell.group(1).upper()))
+        return ("name", sheet, ref.upper())
+    if len(parts) == 2:
+        a, b = _CELL_RE.match(parts[0]), _CELL_RE.match(parts[1])
+        if a and b:
+            r1, c1 = int(a.group(2)), column_index_from_string(a.group(1).upper())
+            r2, c2 = int(b.group(2)), column_index_from_string(b.group(1).upper())
+            return ("range", sheet, min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+        cols = _COLS_RE.match(ref)
+        if cols:
+            c1, c2 = (column_index_from_string(c.upper()) for c in cols.groups())
+            return ("range", sheet, 1, min(c1, c2), None, max(c1, c2))
+        rows = _ROWS_RE.match(ref)
+        if rows:
+            r1, r2 = (int(r) for r in rows.groups())
+            return ("range", sheet, min(r1, r2), 1, max(r1, r2), None)
+    raise FormulaError(f"지원하지 않는 참조입니다: {text}")
+
+
+def _number(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() and "." not in text and "E" not in text.upper() else value
+
+
+class _Parser:
+    def __init__(self, tokens: List[Token]):
+        self.tokens = [t for t in tokens if t.type != Token.WSPACE]
+        self.pos = 0
+
+    def peek(self) -> Optional[Token]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> Token:
+        tok = self.peek()
+        if tok is None:
+            raise FormulaError("수식이 중간에 끝났습니다.")
+        self.pos += 1
+        return tok
+
+    def parse(self) -> tuple:
+        node = self.expr(0)
+        if self.peek() is not None:
+            raise FormulaError(f"예상하지 못한 토큰: {self.peek().value}")
+        return node
+
+    def expr(self, min_prec: int) -> tuple:
+        left = self.prefix()
+        while True:
+            tok = self.peek()
+            if tok is None:
+                return left
+            if tok.type == Token.OP_POST:  # %
+                self.take()
+                left = ("pct", left)
+                continue
+            prec = _INFIX.get(tok.value) if tok.type == Token.OP_IN else None
+            if prec is None or prec < min_prec:
+                return left
+            self.take()
+            left = ("op", tok.value, left, self.expr(prec + 1))
+
+    def prefix(self) -> tuple:
+        tok = self.take()
+        if tok.type == Token.OP_PRE:
+            operand = self.expr(_PREFIX)
+            return ("neg", operand) if tok.value == "-" else operand
+        if tok.type == Token.OPERAND:
+            if tok.subtype == Token.NUMBER:
+                return ("num", _number(tok.value))
+            if tok.subtype == Token.TEXT:
+                return ("str", tok.value[1:-1].replace('""', '"'))
+            if tok.subtype == Token.LOGICAL:
+                return ("bool", tok.value.upper() == "TRUE")
+            if tok.subtype == Token.ERROR:
+                return ("err", tok.value)
+            return _reference(tok.value)
+        if tok.type == Token.FUNC and tok.subtype == Token.OPEN:
+            return self.call(tok.value[:-1].upper())
+        if tok.type == Token.PAREN and tok.subtype == Token.OPEN:
+            node = self.expr(0)
+            close = self.take()
+            if close.type != Token.PAREN:
+                raise FormulaError("괄호가 맞지 않습니다.")
+            return node
+        raise FormulaError(f"예상하지 못한 토큰: {tok.value}")
+
+    def call(self, name: str) -> tuple:
+        # Excel 2010 이후 함수는 _xlfn. 접두어가 붙어 저장된다
+        name = name[len("_XLFN."):] if name.startswith("_XLFN.") else name
+        args: List[tuple] = []
+        tok = self.peek()
+        if tok is not None and tok.type == Token.FUNC and tok.subtype == Token.CLOSE:
+            self.take()
+            return ("call", name, ())
+        while True:
+            tok = self.peek()
+            if tok is not None and (tok.type == Token.SEP or tok.type == Token.FUNC and tok.subtype == Token.CLOSE):
+                args.append(("missing",))  # IF(A1,,1) 처럼 비운 인자
+            else:
+                args.append(self.expr(0))
+            tok = self.take()
+            if tok.type == Token.FUNC and tok.subtype == Token.CLOSE:
+                return ("call", name, tuple(args))
+            if tok.type != Token.SEP or tok.subtype != Token.ARG:
+                raise FormulaError(f"함수 인자를 읽을 수 없습니다: {tok.value}")
+
+
+@lru_cache(maxsize=4096)
+def parse(formula: str) -> tuple:
+    """"=..." 수식 → 구문 트리 (튜플, 같은 수식은 캐시)"""
+    try:
+        tokens = Tokenizer(formula if formula.startswith("=") else "=" + formula).items
+    except TokenizerError as e:
+        raise FormulaError(str(e))
+    return _Parser(tokens).parse()
+
+
+# 행마다 참조만 한 칸씩 밀린 수식(=B2*C2, =B3*C3 …)은 모양이 같으므로 한 번 파싱한 트리를 옮겨 쓴다
+_SHAPES: Dict[str, Tuple[tuple, List[Tuple[int, int]]]] = {}
+_SHAPES_MAX = 4096
+_QUOTED_RE = re.compile(r"(\"(?:[^\"]|\"\")*\"|'(?:[^']|'')*')")
+_TEXT_REF_RE = re.compile(r"(?<![\w.])(\$?)([A-Za-z]{1,3})(\$?)(\d+)(?![\w(])")
+
+
+def _shape(formula: str, row: int, col: int) -> Tuple[str, List[Tuple[int, int]]]:
+    """수식 → (상대 참조를 수식 셀 기준 거리로 바꾼 모양, 글자 순서대로의 참조 좌표)"""
+    refs: List[Tuple[int, int]] = []
+
+    def sub(m) -> str:
+        c, r = column_index_from_string(m.group(2).upper()), int(m.group(4))
+        refs.append((r, c))
+        cpart = f"${c}" if m.group(1) else f"c{c - col}"
+        rpart = f"${r}" if m.group(3) else f"r{r - row}"
+        return f"[{cpart},{rpart}]"
+
+    parts = _QUOTED_RE.split(formula)
+    for i in range(0, len(parts), 2):  # 홀수 번째는 문자열/따옴표 시트 이름
+        parts[i] = _TEXT_REF_RE.sub(sub, parts[i])
+    return "".join(parts), refs
+
+
+def _move(node: tuple, rows: Dict[int, int], cols: Dict[int, int]) -> tuple:
+    kind = node[0]
+    if kind == "ref":
+        return ("ref", node[1], rows[node[2]], cols[node[3]])
+    if kind == "range":
+        r1, c1, r2, c2 = node[2:6]
+        r1, c1 = rows[r1], cols[c1]
+        r2 = None if r2 is None else rows[r2]
+        c2 = None if c2 is None else cols[c2]
+        # 절대/상대가 섞인 범위($A$5:A3)는 옮기면 앞뒤가 바뀔 수 있다
+        if r2 is not None and r2 < r1:
+            r1, r2 = r2, r1
+        if c2 is not None and c2 < c1:
+            c1, c2 = c2, c1
+        return ("range", node[1], r1, c1, r2, c2)
+    if kind in ("neg", "pct"):
+        return (kind, _move(node[1], rows, cols))
+    if kind == "op":
+        return ("op", node[1], _move(node[2], rows, cols), _move(node[3], rows, cols))
+    if kind == "call":
+        return ("call", node[1], tuple(_move(a, rows, cols) for a in node[2]))
+    return node
+
+
+def parse_at(formula: str, row: int, col: int) -> tuple:
+    """(row, col) 셀의 수식 → 구문 트리. 같은 모양의 수식을 이미 파싱했으면 참조만 옮긴다"""
+    key, refs = _shape(formula, row, col)
+    found = _SHAPES.get(key)
+    if found is not None:
+        tree, base = found
+        rows: Dict[int, int] = {}
+        cols: Dict[int, int] = {}
+        # 한 좌표가 두 곳으로 옮겨져야 하면 (=$B$5+B5 등) 옮길 수 없으므로 새로 파싱
+        if all(
+            rows.setdefault(r0, r1) == r1 and cols.setdefault(c0, c1) == c1
+            for (r0, c0), (r1, c1) in zip(base, refs)
+        ):
+            try:
+                return _move(tree, rows, cols)
+            except KeyError:  # A:A, 1:1 처럼 글자로 찾지 못한 좌표
+                pass
+        return parse(formula)
+    tree = parse(formula)
+    if len(_SHAPES) >= _SHAPES_MAX:
+        _SHAPES.clear()
+    _SHAPES[key] = (tree, refs)
+    return tree
+
+
+# ---------- 값 변환 ---------- #
+
+def _is_error(value) -> bool:
+    return isinstance(value, ExcelError)
+
+
+def _check(value):
+    if isinstance(value, ExcelError):
+        raise _Raise(value)
+    return value
+
+
+def _num(value, epoch) -> float:
+    """산술용 숫자 (빈 셀 0, 날짜는 일련번호, 숫자 문자열 허용)"""
+    _check(value)
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return to_excel(value, epoch)
+    if isinstance(value, timedelta):
+        return value.total_seconds() / 86400
+    if isinstance(value, str):
+        try:
+            return _number(value.strip().replace(",", ""))
+        except ValueError:
+            raise _Raise(VALUE)
+    raise _Raise(VALUE)
+
+
+def _text(value) -> str:
+    _check(value)
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else f"{value:.15g}"
+    return str(value)
+
+
+def _bool(value, epoch) -> bool:
+    _check(value)
+    if isinstance(value, str):
+        if value.upper() in ("TRUE", "FALSE"):
+            return value.upper() == "TRUE"
+        raise _Raise(VALUE)
+    return bool(_num(value, epoch))
+
+
+def _scalar(value):
+    """범위를 값 하나로 (왼쪽 위 셀)"""
+    if isinstance(value, Grid):
+        return value[0][0] if value and value[0] else None
+    return value
+
+
+def _tidy(value):
+    """
+    계산 결과 정리: Excel 처럼 유효숫자 15자리로 맞추고 (0.1*35 → 3.5),
+    정수로 떨어지는 float 은 int (openpyxl 이 저장된 값을 읽는 것과 같게)
+    """
+    if isinstance(value, float) and math.isfinite(value):
+        value = float(f"{value:.15g}")
+        if value.is_integer() and abs(value) < 1e15:
+            return int(value)
+    return value
+
+
+_TYPE_ORDER = {int: 0, float: 0, str: 1, bool: 2}
+
+
+def _compare(a, b, epoch) -> int:
+    """Excel 비교: 숫자 < 문자 < 논리값, 문자는 대소문자 무시, 빈 셀은 상대 타입의 빈 값"""
+    _check(a)
+    _check(b)
+    if a is None:
+        a = "" if isinstance(b, str) else False if isinstance(b, bool) else 0
+    if b is None:
+        b = "" if isinstance(a, str) else False if isinstance(a, bool) else 0
+    if not isinstance(a, (str, bool)):
+        a = _num(a, epoch)
+    if not isinstance(b, (str, bool)):
+        b = _num(b, epoch)
+    ta, tb = _TYPE_ORDER[type(a)], _TYPE_ORDER[type(b)]
+    if ta != tb:
+        return -1 if ta < tb else 1
+    if isinstance(a, str):
+        a, b = a.lower(), b.lower()
+    return (a > b) - (a < b)
+
+
+def _round(x: float, digits: int, mode) -> float:
+    exp = Decimal(1).scaleb(-digits)
+    return float(Decimal(repr(float(x))).quantize(exp, rounding=mode))
+
+
+# ---------- 함수 ---------- #
+
+FUNCTIONS: Dict[str, Callable] = {}
+# 인자를 미리 계산하지 않는 함수 (고른 분기만 계산해 의존성을 줄임)
+LAZY: Dict[str, Callable] = {}
+
+
+def _function(*names: str, lazy: bool = False):
+    def register(fn):
+        for name in names:
+            (LAZY if lazy else FUNCTIONS)[name] = fn
+        return fn
+    return register
+
+
+def _numbers(ev, args, strict: bool = True) -> List[float]:
+    """집계 함수 인자의 숫자들: 범위 안의 문자/논리/빈 셀은 건너뛰고, 직접 준 값은 숫자로 변환"""
+    out = []
+    for arg in args:
+        if isinstance(arg, Grid):
+            for v in arg.flat():
+                _check(v)
+                if isinstance(v, bool) or v is None or isinstance(v, str):
+                    continue
+                out.append(_num(v, ev.epoch))
+        elif arg is not None or not strict:
+            out.append(_num(arg, ev.epoch))
+    return out
+
+
+@_function("SUM")
+def _sum(ev, *args):
+    return math.fsum(_numbers(ev, args))
+
+
+@_function("PRODUCT")
+def _product(ev, *args):
+    return math.prod(_numbers(ev, args))
+
+
+@_function("AVERAGE")
+def _average(ev, *args):
+    nums = _numbers(ev, args)
+    if not nums:
+        raise _Raise(DIV0)
+    return math.fsum(nums) / len(nums)
+
+
+@_function("MIN")
+def _min(ev, *args):
+    return min(_numbers(ev, args), default=0)
+
+
+@_function("MAX")
+def _max(ev, *args):
+    return max(_numbers(ev, args), default=0)
+
+
+@_function("COUNT")
+def _count(ev, *args):
+    n = 0
+    for arg in args:
+        values = arg.flat() if isinstance(arg, Grid) else [arg]
+        n += sum(
+            1 for v in values
+            if isinstance(v, (int, float, datetime, date)) and not isinstance(v, bool)
+        )
+    return n
+
+
+@_function("COUNTA")
+def _counta(ev, *args):
+    return sum(
+        1 for arg in args
+        for v in (arg.flat() if isinstance(arg, Grid) else [arg])
+        if v is not None
+    )
+
+
+def _criteria(ev, criteria) -> Callable[[Any], bool]:
+    """SUMIF/COUNTIF 조건: ">=5", "<>a", "abc", 5 (와일드카드 * ? 지원)"""
+    if isinstance(criteria, str):
+        m = re.match(r"^(<=|>=|<>|<|>|=)?(.*)$", criteria, re.S)
+        op, operand = m.group(1) or "=", m.group(2)
+        try:
+            target = _number(operand.strip())
+        except ValueError:
+            target = operand
+    else:
+        op, target = "=", criteria
+    if isinstance(target, str) and op in ("=", "<>") and any(ch in target for ch in "*?"):
+        pattern = re.compile(
+            "".join(".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in target),
+            re.I | re.S,
+        )
+        hit = lambda v: isinstance(v, str) and pattern.fullmatch(v) is not None  # noqa: E731
+        return hit if op == "=" else (lambda v: not hit(v))
+
+    def test(v) -> bool:
+        if _is_error(v):
+            return False
+        if v is None:
+            return op == "<>" if target != "" else op == "="
+        if isinstance(target, str) != isinstance(v, str) and op not in ("<>",):
+            return False
+        c = _compare(v, target, ev.epoch)
+        return {"=": c == 0, "<>": c != 0, "<": c < 0, ">": c > 0, "<=": c <= 0, ">=": c >= 0}[op]
+    return test
+
+
+def _grid(value) -> Grid:
+    return value if isinstance(value, Grid) else Grid(((value,),))
+
+
+@_function("SUMIF")
+def _sumif(ev, where, criteria, values=None):
+    where = _grid(where)
+    values = _grid(values) if values is not None else where
+    test = _criteria(ev, _check(_scalar(criteria)))
+    total = 0.0
+    for i, row in enumerate(where):
+        for j, v in enumerate(row):
+            if test(v):
+                s = values[i][j] if i < len(values) and j < len(values[i]) else None
+                if isinstance(s, (int, float)) and not isinstance(s, bool):
+                    total += s
+    return total
+
+
+@_function("COUNTIF")
+def _countif(ev, where, criteria):
+    test = _criteria(ev, _check(_scalar(criteria)))
+    return sum(1 for v in _grid(where).flat() if test(v))
+
+
+@_function("ROUND")
+def _round_fn(ev, x, digits=0):
+    return _round(_num(_scalar(x), ev.epoch), int(_num(_scalar(digits), ev.epoch)), ROUND_HALF_UP)
+
+
+@_function("ROUNDUP")
+def _roundup(ev, x, digits=0):
+    return _round(_num(_scalar(x), ev.epoch), int(_num(_scalar(digits), ev.epoch)), ROUND_UP)
+
+
+@_function("ROUNDDOWN", "TRUNC")
+def _rounddown(ev, x, digits=0):
+    return _round(_num(_scalar(x), ev.epoch), int(_num(_scalar(digits), ev.epoch)), ROUND_DOWN)
+
+
+@_function("INT")
+def _int(ev, x):
+    return math.floor(_num(_scalar(x), ev.epoch))
+
+
+@_function("ABS")
+def _abs(ev, x):
+    return abs(_num(_scalar(x), ev.epoch))
+
+
+@_function("MOD")
+def _mod(ev, a, b):
+    a, b = _num(_scalar(a), ev.epoch), _num(_scalar(b), ev.epoch)
+    if b == 0:
+        raise _Raise(DIV0)
+    return a - b * math.floor(a / b)
+
+
+@_function("IF", lazy=True)
+def _if(ev, sheet, cond, then=("bool", True), other=("bool", False)):
+    chosen = then if _bool(_scalar(ev.eval(cond, sheet)), ev.epoch) else other
+    return 0 if chosen == ("missing",) else ev.eval(chosen, sheet)
+
+
+@_function("IFERROR", lazy=True)
+def _iferror(ev, sheet, value, fallback):
+    try:
+        result = ev.eval(value, sheet)
+        _check(_scalar(result))
+        return result
+    except _Raise:
+        return ev.eval(fallback, sheet)
+
+
+@_function("IFNA", lazy=True)
+def _ifna(ev, sheet, value, fallback):
+    try:
+        result = ev.eval(value, sheet)
+        _check(_scalar(result))
+        return result
+    except _Raise as e:
+        if e.value != NA:
+            raise
+        return ev.eval(fallback, sheet)
+
+
+@_function("AND")
+def _and(ev, *args):
+    values = [v for a in args for v in (a.flat() if isinstance(a, Grid) else [a]) if v is not None]
+    return all(_bool(v, ev.epoch) for v in values)
+
+
+@_function("OR")
+def _or(ev, *args):
+    values = [v for a in args for v in (a.flat() if isinstance(a, Grid) else [a]) if v is not None]
+    return any(_bool(v, ev.epoch) for v in values)
+
+
+@_function("NOT")
+def _not(ev, x):
+    return not _bool(_scalar(x), ev.epoch)
+
+
+def _lookup_index(ev, key, keys: List[Any], approx: bool) -> int:
+    """찾은 위치 (0부터). 근사 일치는 정렬된 keys 에서 key 이하인 마지막 값"""
+    _check(key)
+    found = -1
+    for i, k in enumerate(keys):
+        if k is None or _is_error(k):
+            continue
+        if not approx:
+            if isinstance(k, str) and isinstance(key, str):
+                if k.lower() == key.lower():
+                    return i
+            elif isinstance(k, str) == isinstance(key, str) and _compare(k, key, ev.epoch) == 0:
+                return i
+            continue
+        if isinstance(k, str) != isinstance(key, str):
+            continue
+        if _compare(k, key, ev.epoch) > 0:
+            break
+        found = i
+    if found < 0:
+        raise _Raise(NA)
+    return found
+
+
+@_function("VLOOKUP")
+def _vlookup(ev, key, table, col, approx=True):
+    table = _grid(table)
+    col = int(_num(_scalar(col), ev.epoch))
+    if col < 1:
+        raise _Raise(VALUE)
+    if not table or col > len(table[0]):
+        raise _Raise(REF)
+    approx = _bool(_scalar(approx), ev.epoch) if approx is not None else False
+    i = _lookup_index(ev, _scalar(key), [row[0] for row in table], approx)
+    return table[i][col - 1]
+
+
+@_function("HLOOKUP")
+def _hlookup(ev, key, table, row, approx=True):
+    table = _grid(table)
+    row = int(_num(_scalar(row), ev.epoch))
+    if row < 1:
+        raise _Raise(VALUE)
+    if row > len(table):
+        raise _Raise(REF)
+    approx = _bool(_scalar(approx), ev.epoch) if approx is not None else False
+    i = _lookup_index(ev, _scalar(key), list(table[0]), approx)
+    return table[row - 1][i]
+
+
+@_function("MATCH")
+def _match(ev, key, table, kind=1):
+    table = _grid(table)
+    values = list(table.flat()) if len(table) == 1 or len(table[0]) == 1 else None
+    if values is None:
+        raise _Raise(NA)
+    kind = int(_num(_scalar(kind), ev.epoch)) if kind is not None else 0
+    key = _check(_scalar(key))
+    if kind == -1:  # 내림차순에서 key 이상인 마지막 값
+        found = -1
+        for i, v in enumerate(values):
+            if v is None or _compare(v, key, ev.epoch) < 0:
+                break
+            found = i
+        if found < 0:
+            raise _Raise(NA)
+        return found + 1
+    return _lookup_index(ev, key, values, approx=kind == 1) + 1
+
+
+@_function("INDEX")
+def _index(ev, table, row, col=None):
+    table = _grid(table)
+    row = int(_num(_scalar(row), ev.epoch))
+    col = int(_num(_scalar(col), ev.epoch)) if col is not None else None
+    if col is None:
+        if len(table) == 1:  # 한 행짜리 범위는 두 번째 인자가 열
+            row, col = 1, row
+        else:
+            col = 1
+    if row < 1 or col < 1 or row > len(table) or col > len(table[0]):
+        raise _Raise(REF)
+    return table[row - 1][col - 1]
+
+
+@_function("CONCATENATE", "CONCAT")
+def _concat(ev, *args):
+    return "".join(
+        _text(v) for a in args for v in (a.flat() if isinstance(a, Grid) else [a])
+    )
+
+
+@_function("LEFT")
+def _left(ev, text, n=1):
+    return _text(_scalar(text))[: int(_num(_scalar(n), ev.epoch))]
+
+
+@_function("RIGHT")
+def _right(ev, text, n=1):
+    n = int(_num(_scalar(n), ev.epoch))
+    return _text(_scalar(text))[-n:] if n else ""
+
+
+@_function("MID")
+def _mid(ev, text, start, n):
+    start = int(_num(_scalar(start), ev.epoch))
+    if start < 1:
+        raise _Raise(VALUE)
+    return _text(_scalar(text))[start - 1: start - 1 + int(_num(_scalar(n), ev.epoch))]
+
+
+@_function("LEN")
+def _len(ev, text):
+    return len(_text(_scalar(text)))
+
+
+@_function("TRIM")
+def _trim(ev, text):
+    return re.sub(" +", " ", _text(_scalar(text)).strip(" "))
+
+
+@_function("UPPER")
+def _upper(ev, text):
+    return _text(_scalar(text)).upper()
+
+
+@_function("LOWER")
+def _lower(ev, text):
+    return _text(_scalar(text)).lower()
+
+
+@_function("VALUE")
+def _value(ev, text):
+    return _num(_scalar(text), ev.epoch)
+
+
+# 날짜: Excel 처럼 일련번호로 계산하고, 셀 서식이 날짜면 결과를 날짜로 돌려준다
+
+def _date_of(ev, serial) -> date:
+    serial = _num(_scalar(serial), ev.epoch)
+    if serial < 0:
+        raise _Raise(NUM)
+    value = from_excel(serial, ev.epoch)
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _serial(ev, d: date) -> int:
+    return int(to_excel(datetime(d.year, d.month, d.day), ev.epoch))
+
+
+def _add_months(d: date, months: int, end_of_month: bool = False) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    year, month = d.year + y, m + 1
+    last = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+    return date(year, month, last if end_of_month else min(d.day, last))
+
+
+@_function("DATE")
+def _date(ev, year, month, day):
+    year, month, day = (int(_num(_scalar(v), ev.epoch)) for v in (year, month, day))
+    if year < 1900:
+        year += 1900
+    try:
+        first = _add_months(date(year, 1, 1), month - 1)
+    except ValueError:
+        raise _Raise(NUM)
+    return _serial(ev, first) + day - 1
+
+
+@_function("YEAR")
+def _year(ev, serial):
+    return _date_of(ev, serial).year
+
+
+@_function("MONTH")
+def _month(ev, serial):
+    return _date_of(ev, serial).month
+
+
+@_function("DAY")
+def _day(ev, serial):
+    return _date_of(ev, serial).day
+
+
+@_function("TODAY")
+def _today(ev):
+    return _serial(ev, date.today())
+
+
+@_function("NOW")
+def _now(ev):
+    return to_excel(datetime.now(), ev.epoch)
+
+
+@_function("EDATE")
+def _edate(ev, start, months):
+    return _serial(ev, _add_months(_date_of(ev, start), int(_num(_scalar(months), ev.epoch))))
+
+
+@_function("EOMONTH")
+def _eomonth(ev, start, months):
+    d = _add_months(_date_of(ev, start).replace(day=1), int(_num(_scalar(months), ev.epoch)), True)
+    return _serial(ev, d)
+
+
+@_function("DAYS")
+def _days(ev, end, start):
+    return math.floor(_num(_scalar(end), ev.epoch)) - math.floor(_num(_scalar(start), ev.epoch))
+
+
+@_function("DATEDIF")
+def _datedif(ev, start, end, unit):
+    a, b = _date_of(ev, start), _date_of(ev, end)
+    if a > b:
+        raise _Raise(NUM)
+    unit = _text(_scalar(unit)).upper()
+    months = (b.year - a.year) * 12 + b.month - a.month - (b.day < a.day)
+    if unit == "D":
+        return (b - a).days
+    if unit == "M":
+        return months
+    if unit == "Y":
+        return months // 12
+    raise _Raise(NUM)
+
+
+@_function("WEEKDAY")
+def _weekday(ev, serial, kind=1):
+    d = _date_of(ev, serial)
+    kind = int(_num(_scalar(kind), ev.epoch)) if kind is not None else 1
+    if kind == 2:
+        return d.isoweekday()
+    if kind == 3:
+        return d.weekday()
+    return d.isoweekday() % 7 + 1
+
+
+# ---------- 워크북 ---------- #
+
+class _Rows:
+    """
+    시트 하나의 저장된 값 창: 앞으로만 읽는 read_only 스트림 + 최근 행 (최대 FORMULA_MAX_CELLS 셀).
+    시트 전체를 읽지 않고 필요한 행까지만 읽으며, 창에서 밀려난 행을 다시 찾으면 그 행부터 다시 읽는다.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.max_row = ws.max_row
+        self.max_col = ws.max_column
+        self.rows: "OrderedDict[int, tuple]" = OrderedDict()
+        self.cells = 0
+        self.stream = None
+        self.pos = 0  # 스트림에서 마지막으로 읽은 행
+
+    def feed(self, r: int, values: tuple):
+        """이미 읽은 행을 창에 넣는다 (stream_rows 가 지나가는 행)"""
+        self._keep(r, values)
+
+    def get(self, r: int) -> tuple:
+        found = self.rows.get(r)
+        if found is not None:
+            return found
+        if self.stream is None or r <= self.pos:
+            self.stream = self.ws.iter_rows(min_row=r, values_only=True)
+            self.pos = r - 1
+        while self.pos < r:
+            values = next(self.stream, None)
+            self.pos += 1
+            if values is None:  # 시트 끝
+                self.pos = r
+                return ()
+            self._keep(self.pos, values)
+        return self.rows.get(r, ())
+
+    def _keep(self, r: int, values: tuple):
+        old = self.rows.pop(r, None)
+        if old is not None:
+            self.cells -= len(old)
+        self.rows[r] = values
+        self.cells += len(values)
+        while self.cells > FORMULA_MAX_CELLS and len(self.rows) > 1:
+            _, dropped = self.rows.popitem(last=False)
+            self.cells -= len(dropped)
+
+
+class Evaluator:
+    """
+    워크북 하나의 수식 계산기 (내용 해시별로 캐시, 스레드 간 공유, 잠금으로 직렬화).
+    값이 없는 수식의 위치/수식 문자열(시트별 색인)과 계산 결과만 보관하고,
+    의존하는 셀의 저장된 값은 Session 이 필요한 행까지만 스트리밍해 읽는다.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.formulas: Dict[str, Dict[Tuple[int, int], Tuple[str, bool]]] = {}
+        self.cells: Dict[Tuple[str, int, int], Any] = {}
+        self.partials: Dict[Tuple[str, tuple], Any] = {}
+        self.lock = threading.RLock()
+        self.size = 0
+        self.parts: Optional[Dict[str, str]] = None
+        self.date_styles: set = set()
+        self.epoch = None  # 워크북 정보(날짜 기준일, 시트/이름 목록)는 처음 계산할 때 읽음
+        self.titles: Dict[str, str] = {}
+        self.names: Dict[str, str] = {}
+        self.local_names: Dict[str, Dict[str, str]] = {}
+
+    def sheet_formulas(self, title: str) -> Dict[Tuple[int, int], Tuple[str, bool]]:
+        """
+        시트의 값이 없는 수식 {(행, 열): (수식, 날짜 서식 여부)}.
+        시트 XML 에서 수식 셀만 정규식으로 훑어 만든다 (셀 값을 모두 읽지 않음, 시트당 한 번).
+        """
+        with self.lock:
+            found = self.formulas.get(title)
+            if found is None:
+                try:
+                    with open_data(self.data) as f, ZipFile(f) as zf:
+                        if self.parts is None:
+                            self.parts = _sheet_parts(zf)
+                            self.date_styles = _date_styles(zf)
+                        part = self.parts.get(title)
+                        found = _scan_formulas(zf.read(part), self.date_styles) if part else {}
+                except (OSError, KeyError, BadZipFile, ET.ParseError, UnicodeDecodeError) as e:
+                    # 시트 XML 을 읽을 수 없으면 이 시트의 수식은 계산하지 않음 (지금처럼 None)
+                    logger.warning("수식 셀을 찾지 못했습니다 (%s): %r", title, e)
+                    found = {}
+                self.formulas[title] = found
+                self.size += len(found) * _CELL_BYTES
+            return found
+
+    def session(self) -> "Session":
+        return Session(self)
+
+    def _workbook_info(self, wb):
+        if self.epoch is not None:
+            return
+        self.titles = {name.lower(): name for name in wb.sheetnames}
+        self.names = {
+            name.upper(): defined.attr_text for name, defined in wb.defined_names.items()
+        }
+        # 시트 범위 이름 (그 시트에서는 워크북 이름보다 우선)
+        self.local_names = {
+            title: {name.upper(): d.attr_text for name, d in wb[title].defined_names.items()}
+            for title in wb.sheetnames
+        }
+        self.epoch = wb.epoch
+
+
+class Session:
+    """
+    한 번의 읽기(read_cells 호출, stream_rows 한 번) 동안의 계산.
+    워크북은 read_only 로 한 번 열고, 시트는 수식이 참조할 때만 _Rows 로 스트리밍한다.
+    끝나면 close() (저장된 값 창은 버리고 계산 결과는 Evaluator 에 남음).
+    """
+
+    def __init__(self, ev: Evaluator):
+        self.ev = ev
+        self.wb = load_workbook_from_bytes(ev.data, read_only=True)
+        with ev.lock:
+            ev._workbook_info(self.wb)
+        self.epoch = ev.epoch
+        self.sheets: Dict[str, _Rows] = {}
+        self.active: set = set()
+
+    def close(self):
+        self.sheets.clear()
+        self.wb.close()
+
+    def _rows(self, title: str) -> _Rows:
+        rows = self.sheets.get(title)
+        if rows is None:
+            rows = self.sheets[title] = _Rows(self.wb[title])
+        return rows
+
+    def feed(self, title: str, r: int, values: tuple):
+        self._rows(title).feed(r, values)
+
+    # 계산
+
+    def value(self, sheet: str, addr: str) -> Any:
+        """
+        값이 없는 수식 셀의 계산 값 (수식 셀이 아니면 None).
+        계산할 수 없으면 None. 오류 값은 "#N/A" 같은 문자열.
+        """
+        row, col = _reference(addr)[2:4]
+        formula = self.ev.sheet_formulas(sheet).get((row, col))
+        if formula is None:
+            return None
+        with self.ev.lock:
+            try:
+                result = _scalar(self._cell(sheet, row, col))
+            except FormulaError:
+                return None
+            return self._shown(result, formula[1])
+
+    def name_value(self, sheet: str, name: str) -> Any:
+        """정의된 이름의 값 (sheet 는 시트 범위 이름을 찾을 현재 시트). 없거나 계산할 수 없으면 None"""
+        with self.ev.lock:
+            try:
+                result = _scalar(self.eval(("name", None, name.upper()), sheet))
+            except _Raise as e:
+                result = e.value
+            except FormulaError:
+                return None
+            return None if result == NAME else self._shown(result, False)
+
+    def _shown(self, result, is_date: bool):
+        """계산 결과 → 템플릿에 넘길 값 (오류는 문자열, 날짜 서식 셀은 datetime)"""
+        if _is_error(result):
+            return str(result)
+        if isinstance(result, (int, float)) and not isinstance(result, bool):
+            if is_date:
+                return from_excel(result, self.epoch)
+            return _tidy(result)
+        return result
+
+    def _title(self, sheet: Optional[str], current: str) -> str:
+        if sheet is None:
+            return current
+        title = self.ev.titles.get(sheet.lower())
+        if title is None:
+            raise _Raise(REF)
+        return title
+
+    def _stored(self, title: str, row: int, col: int):
+        values = self._rows(title).get(row)
+        value = values[col - 1] if col <= len(values) else None
+        if isinstance(value, str) and value in _ERRORS:
+            return ExcelError(value)
+        return value
+
+    def _cell(self, title: str, row: int, col: int):
+        formula = self.ev.sheet_formulas(title).get((row, col))
+        if formula is None:
+            return self._stored(title, row, col)
+        key = (title, row, col)
+        cells = self.ev.cells
+        if key in cells:
+            return cells[key]
+        if key in self.active:
+            raise FormulaError(f"순환 참조: {title}!{row}:{col}")
+        self.active.add(key)
+        try:
+            try:
+                result = _scalar(self.eval(parse_at(formula[0], row, col), title))
+            except _Raise as e:
+                result = e.value
+        finally:
+            self.active.discard(key)
+        cells[key] = result
+        self.ev.size += _CELL_BYTES
+        return result
+
+    def eval(self, node: tuple, sheet: str):
+        kind = node[0]
+        if kind in ("num", "str", "bool"):
+            return node[1]
+        if kind == "err":
+            raise _Raise(node[1])
+        if kind == "missing":
+            return None
+        if kind == "ref":
+            return self._cell(self._title(node[1], sheet), node[2], node[3])
+        if kind == "range":
+            return self._range(node, sheet)
+        if kind in ("call", "name"):
+            key = (sheet, node)
+            partials = self.ev.partials
+            if key in partials:
+                return partials[key]
+            result = self._call(node, sheet) if kind == "call" else self._name(node, sheet)
+            # 범위 값(Grid)은 크기 제한 없이 남기지 않는다
+            if not isinstance(result, Grid):
+                partials[key] = result
+                self.ev.size += _CELL_BYTES
+            return result
+        if kind == "neg":
+            return -_num(_scalar(self.eval(node[1], sheet)), self.epoch)
+        if kind == "pct":
+            return _num(_scalar(self.eval(node[1], sheet)), self.epoch) / 100
+        if kind == "op":
+            return self._op(node[1], _scalar(self.eval(node[2], sheet)), _scalar(self.eval(node[3], sheet)))
+        raise FormulaError(f"알 수 없는 식: {kind}")
+
+    def _range(self, node: tuple, sheet: str) -> Grid:
+        title = self._title(node[1], sheet)
+        r1, c1, r2, c2 = node[2:6]
+        if r2 is None or c2 is None:  # A:A, 1:1 은 시트 크기(dimension)까지
+            rows = self._rows(title)
+            r2 = rows.max_row if r2 is None else r2
+            c2 = rows.max_col if c2 is None else c2
+            if r2 is None or c2 is None:
+                raise FormulaError("시트 크기를 알 수 없습니다.")
+        if (r2 - r1 + 1) * (c2 - c1 + 1) > FORMULA_MAX_CELLS:
+            raise FormulaError(f"범위가 너무 큽니다 (FORMULA_MAX_CELLS={FORMULA_MAX_CELLS})")
+        return Grid(
+            tuple(self._cell(title, r, c) for c in range(c1, c2 + 1))
+            for r in range(r1, r2 + 1)
+        )
+
+    def _name(self, node: tuple, sheet: str):
+        scope = self._title(node[1], sheet)
+        text = self.ev.local_names.get(scope, {}).get(node[2]) or self.ev.names.get(node[2])
+        if text is None:
+            raise _Raise(NAME)
+        return self.eval(parse(text), sheet)
+
+    def _call(self, node: tuple, sheet: str):
+        name, args = node[1], node[2]
+        lazy = LAZY.get(name)
+        if lazy is not None:
+            return lazy(self, sheet, *args)
+        fn = FUNCTIONS.get(name)
+        if fn is None:
+            raise FormulaError(f"지원하지 않는 함수: {name}")
+        values = [None if a == ("missing",) else self.eval(a, sheet) for a in args]
+        try:
+            return fn(self, *values)
+        except TypeError:  # 인자 수가 맞지 않음
+            raise _Raise(VALUE)
+
+    def _op(self, op: str, a, b):
+        if op == "&":
+            return _text(a) + _text(b)
+        if op in ("=", "<>", "<", ">", "<=", ">="):
+            c = _compare(a, b, self.epoch)
+            return {"=": c == 0, "<>": c != 0, "<": c < 0, ">": c > 0, "<=": c <= 0, ">=": c >= 0}[op]
+        x, y = _num(a, self.epoch), _num(b, self.epoch)
+        if op == "+":
+            return x + y
+        if op == "-":
+            return x - y
+        if op == "*":
+            return x * y
+        if op == "/":
+            if y == 0:
+                raise _Raise(DIV0)
+            return x / y
+        if op == "^":
+            try:
+                return float(x) ** y
+            except (OverflowError, ZeroDivisionError):
+                raise _Raise(NUM)
+        raise FormulaError(f"지원하지 않는 연산자: {op}")
+
+
+# ---------- 시트 XML 색인 ---------- #
+
+def _local(tag: str) -> str:
+    return _MAIN_NS.sub("", tag)
+
+
+def _sheet_parts(zf: ZipFile) -> Dict[str, str]:
+    """시트 이름 → zip 안의 시트 XML 경로"""
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target", "").lstrip("/") for rel in rels}
+    parts = {}
+    for el in ET.fromstring(zf.read("xl/workbook.xml")).iter():
+        if _local(el.tag) == "sheet":
+            target = targets.get(el.get(f"{{{_REL_NS}}}id"), "")
+            parts[el.get("name")] = target if target.startswith("xl/") else "xl/" + target
+    return parts
+
+
+def _date_styles(zf: ZipFile) -> set:
+    """날짜 서식인 셀 스타일 번호 (셀의 s 속성) 집합"""
+    try:
+        root = ET.fromstring(zf.read("xl/styles.xml"))
+    except KeyError:
+        return set()
+    custom = {
+        int(el.get("numFmtId")): el.get("formatCode")
+        for el in root.iter() if _local(el.tag) == "numFmt"
+    }
+    found = set()
+    for xfs in root:
+        if _local(xfs.tag) != "cellXfs":
+            continue
+        for i, xf in enumerate(xfs):
+            fmt_id = int(xf.get("numFmtId", 0))
+            code = custom.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id)
+            if code and is_date_format(code):
+                found.add(i)
+    return found
+
+
+def _attr(attrs: bytes, name: bytes) -> Optional[str]:
+    m = re.search(rb"\b" + name + rb'="([^"]*)"', attrs)
+    return m.group(1).decode("utf-8") if m else None
+
+
+def _scan_formulas(xml: bytes, date_styles: set) -> Dict[Tuple[int, int], Tuple[str, bool]]:
+    """시트 XML 에서 캐시된 값(<v>)이 없는 수식 셀 → {(행, 열): ("=수식", 날짜 서식 여부)}"""
+    found: Dict[Tuple[int, int], Tuple[str, bool]] = {}
+    shared: Dict[str, Tuple[str, str]] = {}  # 공유 수식 번호 → (수식, 기준 셀)
+    for tag in _FORMULA_TAG_RE.finditer(xml):
+        # <f> 바로 앞의 여는 태그가 수식 셀 (<c ...>) — 수식이 있는 곳만 보고 나머지 셀은 건너뜀
+        m = _FORMULA_CELL_RE.match(xml, xml.rfind(b"<", 0, tag.start()))
+        if m is None:
+            continue
+        cell_attrs, f_attrs, text, cached = m.groups()
+        coord = _attr(cell_attrs, b"r")
+        if coord is None:
+            continue
+        # &amp; &quot; &#...; 모두 — 채우기로 만든 공유 수식 셀(<f t="shared" si="0"/>)은 본문이 없음
+        text = html.unescape(text.decode("utf-8")) if text else ""
+        kind = _attr(f_attrs, b"t")
+        if kind == "dataTable":
+            continue
+        try:
+            if kind == "shared":
+                si = _attr(f_attrs, b"si")
+                if text:
+                    shared[si] = (text, coord)
+                elif si in shared:
+                    base, origin = shared[si]
+                    text = Translator("=" + base, origin=origin).translate_formula(coord)[1:]
+            if cached or not text:
+                continue
+            col, row = coordinate_from_string(coord)
+        except (TokenizerError, CellCoordinatesException, ValueError) as e:
+            logger.warning("수식 셀 %s 를 건너뜀: %r", coord, e)  # 이 셀만 계산하지 않음
+            continue
+        style = _attr(cell_attrs, b"s")
+        found[(row, column_index_from_string(col))] = (
+            "=" + text, style is not None and int(style) in date_styles
+        )
+    return found
+
+
+# ---------- 캐시 ---------- #
+
+EVALUATORS = SizedLRU(FORMULA_CACHE_MB * 1024 * 1024)
+_EVALUATORS_LOCK = threading.Lock()
+_BASE_BYTES = 64 * 1024
+
+
+def _digest(data) -> str:
+    if isinstance(data, Blob):
+        return data.digest
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def evaluator(data) -> Evaluator:
+    """워크북 내용별 계산기 (TODAY() 때문에 날짜도 키에 포함)"""
+    key = (_digest(data), date.today())
+    with _EVALUATORS_LOCK:
+        ev = EVALUATORS.get(key)
+        if ev is None:
+            ev = Evaluator(data)
+            EVALUATORS.put(key, ev, _BASE_BYTES)
+    return ev
+
+
+class SheetReader:
+    """
+    stream_rows 용: 시트를 지나가며 행을 넣어 주면 (feed) 같은 행/앞선 행을 참조하는 수식을
+    다시 읽지 않고 계산한다. 값이 없는 수식 셀만 계산 (formulas 에 있는 셀).
+    """
+
+    def __init__(self, data, sheet: str, ev: Evaluator):
+        self.key = (_digest(data), date.today())
+        self.sheet = sheet
+        self.ev = ev
+        self.formulas = ev.sheet_formulas(sheet)
+        self._session: Optional[Session] = None
+        self._last: Optional[Tuple[int, tuple]] = None  # 세션을 열기 전에 받은 마지막 행
+
+    def feed(self, r: int, values: tuple):
+        if self._session is not None:
+            self._session.feed(self.sheet, r, values)
+        else:
+            self._last = (r, values)
+
+    def value(self, r: int, col: int) -> Any:
+        """값이 없는 수식 셀 (r, col) 의 계산 값"""
+        if self._session is None:  # 실제로 계산할 때 처음 워크북을 연다
+            self._session = self.ev.session()
+            if self._last is not None:
+                self._session.feed(self.sheet, *self._last)
+        size = self.ev.size
+        value = self._session.value(self.sheet, f"{get_column_letter(col)}{r}")
+        if self.ev.size != size:  # 계산하며 늘어난 크기를 캐시 상한에 반영
+            EVALUATORS.put(self.key, self.ev, self.ev.size + _BASE_BYTES)
+        return value
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+def sheet_reader(data, sheet: str) -> Optional[SheetReader]:
+    """계산할 수식(값이 없는 수식 셀)이 있는 시트면 SheetReader, 없거나 계산이 꺼져 있으면 None"""
+    if not FORMULA_EVAL:
+        return None
+    ev = evaluator(data)
+    if not ev.sheet_formulas(sheet):
+        return None
+    return SheetReader(data, sheet, ev)
+
+
+def name_value(data, sheet: str, name: str) -> Any:
+    """정의된 이름(상수/수식/범위)의 값. 계산이 꺼져 있거나 없는 이름이면 None"""
+    if not FORMULA_EVAL:
+        return None
+    session = evaluator(data).session()
+    try:
+        return session.name_value(sheet, name)
+    finally:
+        session.close()
+
+
+def fill_missing(data, sheet: str, values: Dict[str, Any]) -> Dict[str, Any]:
+    """values 중 None 이면서 값이 없는 수식 셀인 주소를 계산 결과로 채운다"""
+    if all(v is not None for v in values.values()):
+        return values
+    reader = sheet_reader(data, sheet)
+    if reader is None:
+        return values
+    try:
+        for addr, v in values.items():
+            if v is None:
+                row, col = _reference(addr)[2:4]
+                if (row, col) in reader.formulas:
+                    values[addr] = reader.value(row, col)
+    finally:
+        reader.close()
+    return values
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from blobstore import BLOB_STORE, Blob
+from metrics import ACTIVE_JOBS
+
+# 동시에 실행할 생성 작업 수 / 끝난 작업(결과 포함)을 보관하는 시간(초)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_TTL = int(os.environ.get("JOB_TTL", "3600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    """
+    큐에 올라간 생성 작업 1건. fn(job) 이 워커 스레드에서 실행되며
+    진행률/메시지/결과를 job 에 기록하고, 페이지는 job.id 로 상태를 조회한다.
+    """
+
+    def __init__(self, session: str, fn: Callable[["Job"], None], label: str = ""):
+        self.id = uuid.uuid4().hex
+        self.session = session
+        self.fn = fn
+        self.label = label
+        self.status = QUEUED
+        self.progress: Optional[float] = 0.0  # None 이면 진행률을 알 수 없음
+        self.message = "대기 중"
+        self.notes: List[Tuple[str, str]] = []  # (st 함수 이름, 문구) — 완료 후 화면에 재생
+        self.result: Optional[Blob] = None  # 저장소의 결과 파일
+        self.attachments: List[Tuple[str, str, Blob]] = []  # 추가 다운로드 (버튼 문구, 파일명, 파일)
+        self.file_name = ""
+        self.download_label = ""
+        self.timer = None
+        self.error: Optional[Exception] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def report(self, progress: Optional[float], message: str):
+        self.progress = None if progress is None else max(0.0, min(progress, 1.0))
+        self.message = message
+
+    def notify(self, level: str, text: str):
+        """level: "info" | "warning" | "error" | "success" """
+        self.notes.append((level, text))
+
+
+class JobQueue:
+    """
+    프로세스 전체가 공유하는 생성 작업 큐.
+    - 워커 스레드 workers 개로 동시 실행 수를 제한
+    - 세션별 대기열을 라운드 로빈으로 돌아 한 세션이 큐를 독점하지 않게 함
+    - 끝난 작업은 ttl 동안 보관 (새로고침 후에도 job id 로 결과 조회)
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, ttl: int = JOB_TTL):
+        self.ttl = ttl
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.pending: Dict[str, Deque[Job]] = {}
+        self.order: Deque[str] = deque()  # 대기 작업이 있는 세션의 순번
+        self.running = 0
+        self.cond = threading.Condition()
+        self.closed = False
+        self.threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, session: str, fn: Callable[[Job], None], label: str = "") -> Job:
+        job = Job(session, fn, label)
+        with self.cond:
+            self._expire()
+            self.jobs[job.id] = job
+            if session not in self.pending:
+                self.pending[session] = deque()
+                self.order.append(session)
+            self.pending[session].append(job)
+            self.cond.notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.cond:
+            self._expire()
+            return self.jobs.get(job_id)
+
+    @property
+    def depth(self) -> int:
+        with self.cond:
+            return sum(len(q) for q in self.pending.values())
+
+    def position(self, job: Job) -> int:
+        """라운드 로빈 순서상 이 작업보다 먼저 시작될 대기 작업 수"""
+        with self.cond:
+            queue = self.pending.get(job.session)
+            if not queue or job not in queue:
+                return 0
+            i = queue.index(job)
+            ahead = 0
+            for session in self.order:
+                n = len(self.pending[session])
+                if session == job.session:
+                    ahead += i
+                    continue
+                # 순번이 앞인 세션은 i+1 라운드, 뒤인 세션은 i 라운드까지 먼저 꺼내짐
+                before = self.order.index(session) < self.order.index(job.session)
+                ahead += min(n, i + 1 if before else i)
+            return ahead
+
+    def _next(self) -> Job:
+        session = self.order.popleft()
+        queue = self.pending[session]
+        job = queue.popleft()
+        if queue:
+            self.order.append(session)
+        else:
+            del self.pending[session]
+        return job
+
+    def _work(self):
+        while True:
+            with self.cond:
+                while not self.order and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                job = self._next()
+                self.running += 1
+            job.status = RUNNING
+            job.started = time.time()
+            job.report(0.0, "시작")
+            error: Optional[Exception] = None
+            try:
+                with ACTIVE_JOBS.track_inprogress():
+                    job.fn(job)
+            except Exception as e:
+                error = e
+            job.fn = None  # 입력 Blob 을 잡고 있는 클로저 해제
+            job.error = error
+            job.finished = time.time()
+            job.status = FAILED if error else DONE
+            with self.cond:
+                self.running -= 1
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self.jobs.values() if j.done and j.finished < cutoff]:
+            del self.jobs[job_id]
+            BLOB_STORE.release(job_id)  # 입력/결과 파일 참조
+
+    def shutdown(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
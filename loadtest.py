@@ -0,0 +1,217 @@
+"""
+동시 세션 부하 테스트.
+
+Streamlit AppTest 로 세션 N 개를 스레드에서 동시에 돌려
+업로드 → 시트 선택 → 생성 흐름을 반복하고, 동시성 단계별로
+처리량 / p50·p95·p99 지연 / 프로세스 메모리 증가를 보고한다.
+실제 서버처럼 한 프로세스 안에서 캐시·변환기 풀·작업 큐·지표를 공유한다.
+지연은 생성 버튼부터 결과가 화면에 보일 때까지 (작업 큐 대기 포함).
+AppTest 는 프로세스에 하나뿐인 Runtime 을 쓰므로 스크립트 실행 자체는 한 번에 하나씩
+돌리고, 생성 작업은 실제 서버처럼 작업 큐 워커에서 동시에 진행된다.
+
+    python loadtest.py --levels 1 2 4 8 --iterations 3 --stub-pdf 0.5
+    python loadtest.py --xlsx 실제.xlsx --docx 템플릿.docx --levels 4 --batch
+
+--stub-pdf 초 를 주면 LibreOffice 대신 지정 시간만큼 기다렸다가
+가짜 PDF 를 돌려주는 변환기를 쓴다 (LibreOffice 없는 환경용).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+STUB_PDF = b"%PDF-1.4\n% loadtest stub\n%%EOF\n"
+# 작업 완료를 확인하는 간격(초) — 지연 측정 해상도
+POLL = 0.05
+_RUN_LOCK = threading.Lock()
+
+
+def _run(element):
+    """AppTest 또는 위젯의 .run() — 동시에 두 스크립트가 Runtime 을 만들지 않도록 직렬화"""
+    with _RUN_LOCK:
+        return element.run()
+
+
+def current_rss() -> Optional[int]:
+    """현재 RSS (bytes, Linux /proc 기준). 없으면 최대 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        from timing import max_rss_bytes
+
+        return max_rss_bytes()
+
+
+def install_stub_converter(delay: float):
+    """
+    converter 모듈의 LibreOffice 진입점을 대체한다.
+    app.py 는 실행될 때마다 converter 에서 이름을 다시 가져오고 pipeline.py 는
+    converter.convert 를 모듈 속성으로 부르므로 모듈 속성만 바꾸면 된다.
+    """
+    import converter
+
+    sem = threading.BoundedSemaphore(converter.POOL_SIZE)
+
+    def convert(docx_bytes: bytes, pool=None, **_) -> bytes:
+        with sem:  # 상주 서버 풀처럼 동시 변환 수를 제한
+            time.sleep(delay)
+        return STUB_PDF
+
+    converter.convert = convert
+    converter.start_pool = lambda size=None: None
+    converter.find_soffice = lambda: "stub"
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_session(
+    xlsx: bytes, docx: bytes, batch: bool, unique: bool, timeout: float
+) -> Dict[str, Any]:
+    """세션 1개: 업로드(세션 상태 주입) → 시트 선택 → 생성. 생성 실행 시간을 잰다"""
+    from streamlit.testing.v1 import AppTest
+
+    from blobstore import BLOB_STORE
+
+    at = AppTest.from_file(APP, default_timeout=timeout)
+    # AppTest 는 file_uploader 를 조작할 수 없어 업로드 결과(저장소 Blob)를 세션 상태로 넣는다
+    xlsx_blob, docx_blob = BLOB_STORE.put(xlsx), BLOB_STORE.put(docx)
+    for key, value in {
+        "xlsx_data": xlsx_blob,
+        "xlsx_name": "load.xlsx",
+        "xlsx_hash": xlsx_blob.digest,
+        "docx_data": docx_blob,
+        "docx_name": "load.docx",
+        "docx_hash": docx_blob.digest,
+    }.items():
+        at.session_state[key] = value
+    _run(at)
+
+    sheets = at.selectbox[0]
+    _run(sheets.set_value(sheets.options[0]))
+    if unique:
+        # 결과 캐시를 피하려고 세션마다 다른 출력 파일명
+        _run(at.text_input[0].set_value(f"load_{random.getrandbits(48):012x}.docx"))
+    if batch:
+        _run(at.checkbox(key="batch_mode").check())
+
+    t0 = time.perf_counter()
+    _run(at.button(key="btn_bottom").click())
+    # 생성은 작업 큐에서 돌아가므로 결과가 보일 때까지 페이지를 다시 실행해 본다
+    deadline = t0 + timeout
+    while not (at.success or at.error or at.exception) and time.perf_counter() < deadline:
+        time.sleep(POLL)
+        _run(at)
+    latency = time.perf_counter() - t0
+
+    errors = [e.value for e in at.exception] + [e.value for e in at.error]
+    ok = not errors and any("준비되었습니다" in s.value for s in at.success)
+    return {"latency": latency, "ok": ok, "error": "; ".join(map(str, errors))[:200]}
+
+
+def run_level(
+    concurrency: int, iterations: int, xlsx: bytes, docx: bytes, args
+) -> Dict[str, Any]:
+    rss_before = current_rss()
+    started = time.perf_counter()
+
+    def _worker(_):
+        return [
+            run_session(xlsx, docx, args.batch, not args.allow_cache, args.timeout)
+            for _ in range(iterations)
+        ]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        sessions = [s for chunk in pool.map(_worker, range(concurrency)) for s in chunk]
+    elapsed = time.perf_counter() - started
+    rss_after = current_rss()
+
+    latencies = [s["latency"] for s in sessions if s["ok"]]
+    failures = [s["error"] for s in sessions if not s["ok"]]
+    return {
+        "concurrency": concurrency,
+        "sessions": len(sessions),
+        "failed": len(failures),
+        "first_error": failures[0] if failures else None,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "p99": round(percentile(latencies, 99), 3),
+        "mean": round(statistics.mean(latencies), 3) if latencies else 0.0,
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "rss_growth": (rss_after - rss_before) if rss_before and rss_after else None,
+    }
+
+
+def _inputs(args):
+    if args.xlsx and args.docx:
+        with open(args.xlsx, "rb") as f:
+            xlsx = f.read()
+        with open(args.docx, "rb") as f:
+            docx = f.read()
+        return xlsx, docx
+
+    from benchmark import make_docx, make_workbook
+
+    rng = random.Random(args.seed)
+    cells = 40 * args.size
+    return make_workbook(cells, rng), make_docx(args.case, args.size, cells, rng)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Streamlit 앱 동시 세션 부하 테스트")
+    parser.add_argument("--levels", nargs="+", type=int, default=[1, 2, 4, 8], help="동시 세션 수 단계")
+    parser.add_argument("--iterations", type=int, default=3, help="세션(스레드)마다 반복 횟수")
+    parser.add_argument("--xlsx", help="엑셀 파일 (없으면 합성 입력)")
+    parser.add_argument("--docx", help="워드 템플릿 (없으면 합성 입력)")
+    parser.add_argument("--case", default="tokens", help="합성 입력 종류 (benchmark.CASES)")
+    parser.add_argument("--size", type=int, default=1, help="합성 입력 크기")
+    parser.add_argument("--seed", type=int, default=20240301)
+    parser.add_argument("--batch", action="store_true", help="행별 일괄 생성으로 실행")
+    parser.add_argument("--stub-pdf", type=float, metavar="SECONDS", help="가짜 PDF 변환기 사용 (지연 초)")
+    parser.add_argument("--allow-cache", action="store_true", help="결과 캐시 재사용 허용")
+    parser.add_argument("--timeout", type=float, default=300, help="AppTest 실행 제한 시간(초)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args(argv)
+
+    if args.stub_pdf is not None:
+        install_stub_converter(args.stub_pdf)
+    xlsx, docx = _inputs(args)
+
+    print(f"{'동시':>4} {'세션':>5} {'실패':>4} {'처리량/s':>9} {'p50':>7} {'p95':>7} {'p99':>7} {'RSS 증가(MB)':>12}")
+    results = []
+    for level in args.levels:
+        r = run_level(level, args.iterations, xlsx, docx, args)
+        growth = f"{r['rss_growth'] / 1024 / 1024:.1f}" if r["rss_growth"] is not None else "-"
+        print(
+            f"{r['concurrency']:>4} {r['sessions']:>5} {r['failed']:>4} {r['throughput']:>9.2f}"
+            f" {r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} {growth:>12}"
+        )
+        if r["first_error"]:
+            print(f"     첫 실패: {r['first_error']}")
+        results.append(r)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    return 1 if any(r["failed"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
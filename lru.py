@@ -0,0 +1,55 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+def approx_size(value: Any) -> int:
+    """캐시 상한 계산용 대략적인 크기 (bytes)"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value) + 64
+    if isinstance(value, dict):
+        return sum(approx_size(k) + approx_size(v) for k, v in value.items()) + 64
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(approx_size(v) for v in value) + 64
+    return sys.getsizeof(value)
+
+
+class SizedLRU:
+    """총 크기가 max_bytes 를 넘으면 가장 오래 쓰지 않은 항목부터 버리는 LRU (thread-safe)"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return key in self.items
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None):
+        size = approx_size(value) if size is None else size
+        with self.lock:
+            old = self.items.pop(key, None)
+            if old is not None:
+                self.total -= old[1]
+            if size > self.max_bytes:
+                return
+            self.items[key] = (value, size)
+            self.total += size
+            while self.total > self.max_bytes:
+                _, (_, evicted) = self.items.popitem(last=False)
+                self.total -= evicted
@@ -0,0 +1,204 @@
+"""
+일괄 생성 결과의 매니페스트 (결과 ZIP/출력 폴더의 manifest.json).
+문서마다 어떤 참조 값으로 만들었는지 기록해 두었다가, 수정된 워크북으로 다시 생성할 때
+값이 그대로인 문서는 이전 DOCX/PDF 를 재사용하고 바뀐 문서만 다시 렌더링/변환한다.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+from zipfile import BadZipFile, ZipFile
+
+from engine import Data, open_data
+from lru import SizedLRU
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def fingerprint(value: Any) -> str:
+    """참조 값의 지문 (row_key 처럼 타입까지 담긴 값의 repr 해시)"""
+    return hashlib.blake2b(repr(value).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _shown(values: Dict[str, Any]) -> Dict[str, str]:
+    return {k: "" if v is None else str(v) for k, v in sorted(values.items())}
+
+
+class Manifest:
+    """
+    이번 실행의 매니페스트.
+    header 의 템플릿/엔진/날짜/고정 셀이 모두 같아야 문서 단위 재사용이 가능하다
+    (하나라도 다르면 모든 문서의 내용이 달라질 수 있음).
+    """
+
+    def __init__(self, template: str, engine: str, today: str, fixed: Dict[str, Any]):
+        self.header = {
+            "template": template,
+            "engine": engine,
+            "date": today,
+            "fixed": fingerprint(sorted((k, type(v).__name__, v) for k, v in fixed.items())),
+        }
+        self.fixed_values = _shown(fixed)
+        self.documents: List[Dict[str, Any]] = []
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, stem: str, row_idx: int, key: tuple, values: Dict[str, Any], docx_hash: str):
+        doc = {
+            "name": stem,
+            "row": row_idx,
+            "key": fingerprint(key),
+            "docx_hash": docx_hash,
+            "pdf": False,
+            "values": _shown(values),
+        }
+        self.documents.append(doc)
+        self._by_name[stem] = doc
+
+    def mark_pdf(self, stem: str):
+        self._by_name[stem]["pdf"] = True
+
+    def to_bytes(self) -> bytes:
+        return json.dumps(
+            {
+                "version": MANIFEST_VERSION,
+                **self.header,
+                "fixed_values": self.fixed_values,
+                "documents": self.documents,
+            },
+            ensure_ascii=False,
+            indent=1,
+        ).encode("utf-8")
+
+
+class PreviousRun:
+    """
+    이전 실행 결과 (결과 ZIP 또는 ZIP 을 푼 출력 폴더) 와 그 매니페스트.
+    문서 내용은 필요할 때만 읽는다.
+    """
+
+    def __init__(self, manifest: Dict[str, Any], read, close=lambda: None):
+        self.manifest = manifest
+        self._read = read
+        self._close = close
+        self.documents: List[Dict[str, Any]] = manifest.get("documents", [])
+        self.by_key = {doc["key"]: doc for doc in self.documents}
+        self.by_hash = {doc["docx_hash"]: doc for doc in self.documents if doc.get("pdf")}
+
+    @classmethod
+    def open(cls, source: Union[Data, str]) -> Optional["PreviousRun"]:
+        """source: 결과 ZIP (bytes/Blob/파일 경로) 또는 출력 폴더 경로. 매니페스트가 없으면 None"""
+        if isinstance(source, str) and os.path.isdir(source):
+            def read(name: str) -> bytes:
+                with open(os.path.join(source, os.path.basename(name)), "rb") as f:
+                    return f.read()
+            try:
+                return cls._load(read(MANIFEST_NAME), read)
+            except OSError:
+                return None
+        try:
+            fp = open(source, "rb") if isinstance(source, str) else open_data(source)
+        except OSError:
+            return None
+        try:
+            zf = ZipFile(fp)
+            run = cls._load(zf.read(MANIFEST_NAME), zf.read, lambda: (zf.close(), fp.close()))
+        except (BadZipFile, KeyError):
+            run = None
+        if run is None:
+            fp.close()
+        return run
+
+    @classmethod
+    def _load(cls, raw: bytes, read, close=lambda: None) -> Optional["PreviousRun"]:
+        try:
+            manifest = json.loads(raw)
+        except ValueError:
+            return None
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(manifest, read, close)
+
+    def mismatch(self, current: Manifest) -> Optional[str]:
+        """문서 단위 재사용이 불가능한 이유 (가능하면 None)"""
+        labels = {"template": "템플릿", "engine": "치환 엔진", "date": "날짜", "fixed": "고정 셀 값"}
+        for field, label in labels.items():
+            if self.manifest.get(field) != current.header[field]:
+                if field == "fixed":
+                    changed = _changed(self.manifest.get("fixed_values", {}), current.fixed_values)
+                    return f"{label} ({', '.join(changed)})" if changed else label
+                return label
+        return None
+
+    def docx(self, key: tuple) -> Optional[bytes]:
+        doc = self.by_key.get(fingerprint(key))
+        return self._read_member(doc["name"] + ".docx") if doc else None
+
+    def pdf(self, docx_hash: str) -> Optional[bytes]:
+        doc = self.by_hash.get(docx_hash)
+        return self._read_member(doc["name"] + ".pdf") if doc else None
+
+    def _read_member(self, name: str) -> Optional[bytes]:
+        try:
+            return self._read(name)
+        except (KeyError, OSError):
+            return None
+
+    def close(self):
+        self._close()
+
+
+class ReuseMemo(SizedLRU):
+    """render_batch 의 memo: 이번 실행에서 만든 문서 + 이전 실행의 같은 참조 값 문서"""
+
+    def __init__(self, max_bytes: int, previous: PreviousRun):
+        super().__init__(max_bytes)
+        self.previous = previous
+        self.reused = 0
+
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key) or fingerprint(key) in self.previous.by_key
+
+    def get(self, key):
+        value = super().get(key)
+        if value is None:
+            value = self.previous.docx(key)
+            if value is not None:
+                self.reused += 1
+                self.put(key, value, len(value))
+        return value
+
+
+def _changed(old: Dict[str, str], new: Dict[str, str]) -> List[str]:
+    return [
+        f"{k}: {old.get(k, '')} → {new.get(k, '')}"
+        for k in sorted(set(old) | set(new))
+        if old.get(k) != new.get(k)
+    ]
+
+
+def diff(previous: PreviousRun, current: Manifest) -> Tuple[Dict[str, int], List[str]]:
+    """
+    이전/이번 문서를 파일 이름으로 맞춰 본 변경 요약.
+    ({"unchanged", "changed", "added", "removed"}, 바뀐 문서별 설명 줄)
+    """
+    old = {doc["name"]: doc for doc in previous.documents}
+    counts = {"unchanged": 0, "changed": 0, "added": 0, "removed": 0}
+    lines: List[str] = []
+    names = set()
+    for doc in current.documents:
+        names.add(doc["name"])
+        before = old.get(doc["name"])
+        if before is None:
+            counts["added"] += 1
+            lines.append(f"+ {doc['name']} ({doc['row']}행)")
+        elif before["key"] == doc["key"]:
+            counts["unchanged"] += 1
+        else:
+            counts["changed"] += 1
+            lines.append(f"~ {doc['name']}: " + ", ".join(_changed(before["values"], doc["values"])))
+    for name, doc in old.items():
+        if name not in names:
+            counts["removed"] += 1
+            lines.append(f"- {name} ({doc['row']}행)")
+    return counts, lines
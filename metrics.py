@@ -0,0 +1,296 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 프로세스 전체 지표를 Prometheus 텍스트 형식으로 노출하는 로컬 HTTP 엔드포인트
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))  # 0 이면 끔
+# 마지막 실행 후 이 시간(초)이 지난 세션은 세션 데이터 크기 집계에서 뺀다
+SESSION_IDLE = int(os.environ.get("METRICS_SESSION_IDLE", "3600"))
+
+GENERATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+CONVERSION_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _fmt_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.children: Dict[Labels, object] = {}
+
+    def _key(self, kw: Dict[str, str]) -> Labels:
+        if set(kw) != set(self.labelnames):
+            raise ValueError(f"{self.name}: 레이블 {self.labelnames} 이 필요합니다 ({sorted(kw)})")
+        return tuple((name, str(kw[name])) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def labels(self, **kw) -> "_Bound":
+        return _Bound(self, self._key(kw))
+
+    def inc(self, amount: float = 1, _key: Labels = ()):
+        with self.lock:
+            self.children[_key] = self.children.get(_key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = list(self.children.items())
+        return [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, _key: Labels = ()):
+        with self.lock:
+            self.children[_key] = value
+
+    def dec(self, amount: float = 1, _key: Labels = ()):
+        self.inc(-amount, _key)
+
+    @contextmanager
+    def track_inprogress(self, _key: Labels = ()):
+        self.inc(1, _key)
+        try:
+            yield
+        finally:
+            self.dec(1, _key)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (), buckets=GENERATION_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def labels(self, **kw) -> "_Bound":
+        return _Bound(self, self._key(kw))
+
+    def observe(self, value: float, _key: Labels = ()):
+        with self.lock:
+            counts, total = self.children.get(_key) or ([0] * len(self.buckets), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.children[_key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, _key: Labels = ()):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, _key)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = [(k, list(counts), total) for k, (counts, total) in self.children.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = (("le", _fmt_value(bound) if bound == float("inf") else str(bound)),)
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {cumulative}")
+        return lines
+
+
+class _Bound:
+    """metric.labels(...) 결과: 레이블이 고정된 inc/set/observe"""
+
+    def __init__(self, metric: _Metric, key: Labels):
+        self.metric = metric
+        self.key = key
+
+    def __getattr__(self, name: str):
+        method = getattr(self.metric, name)
+        return lambda *args, **kw: method(*args, _key=self.key, **kw)
+
+
+class GaugeFunc(_Metric):
+    """수집 시점에 fn() 으로 값을 읽는 게이지. fn 은 {레이블 dict 튜플: 값} 또는 숫자를 돌려준다"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, doc: str, fn: Callable[[], object], kind: str = "gauge"):
+        super().__init__(name, doc)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """같은 이름은 교체 (Streamlit 재실행 시 콜백 재등록 허용)"""
+        with self.lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def gauge_func(self, name: str, doc: str, fn: Callable[[], object], kind: str = "gauge"):
+        return self.register(GaugeFunc(name, doc, fn, kind))
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+GENERATION_SECONDS = REGISTRY.register(Histogram(
+    "leewoon_generation_seconds", "문서 생성 1회(단건/일괄) 소요 시간", ("run", "engine"),
+))
+GENERATIONS = REGISTRY.register(Counter(
+    "leewoon_generations_total", "문서 생성 결과 수", ("run", "engine", "outcome"),
+))
+CONVERSION_SECONDS = REGISTRY.register(Histogram(
+    "leewoon_conversion_seconds", "DOCX → PDF 변환 1건 소요 시간", ("converter",),
+    buckets=CONVERSION_BUCKETS,
+))
+CONVERSIONS = REGISTRY.register(Counter(
+    "leewoon_conversions_total", "DOCX → PDF 변환 결과 수", ("converter", "outcome"),
+))
+ACTIVE_JOBS = REGISTRY.register(Gauge(
+    "leewoon_active_jobs", "진행 중인 생성 작업 수",
+))
+
+
+class SessionSizes:
+    """세션별 보관 데이터(업로드 파일 등) 크기. 최근 SESSION_IDLE 초 안에 실행된 세션만 센다"""
+
+    def __init__(self, idle: int = SESSION_IDLE):
+        self.idle = idle
+        self.sizes: Dict[str, Tuple[int, float]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, session_id: str, nbytes: int):
+        with self.lock:
+            self.sizes[session_id] = (nbytes, time.time())
+
+    def _live(self) -> Iterable[int]:
+        cutoff = time.time() - self.idle
+        with self.lock:
+            for sid in [sid for sid, (_, seen) in self.sizes.items() if seen < cutoff]:
+                del self.sizes[sid]
+            return [size for size, _ in self.sizes.values()]
+
+    def totals(self) -> Dict[Labels, int]:
+        sizes = list(self._live())
+        return {
+            (("stat", "sessions"),): len(sizes),
+            (("stat", "bytes"),): sum(sizes),
+            (("stat", "max_bytes"),): max(sizes, default=0),
+        }
+
+
+SESSIONS = SessionSizes()
+REGISTRY.gauge_func(
+    "leewoon_session_data", "활성 세션 수와 세션 데이터 크기 합/최대 (bytes)", SESSIONS.totals,
+)
+
+
+def register_caches(caches: Dict[str, object]):
+    """{이름: hits/misses 속성이 있는 캐시} 의 적중/실패 수, 적중률, (메모리 캐시면) 점유 bytes"""
+
+    def _each(fn):
+        return lambda: {(("cache", name),): fn(cache) for name, cache in caches.items()}
+
+    def _ratio(cache):
+        total = cache.hits + cache.misses
+        return cache.hits / total if total else 0.0
+
+    REGISTRY.gauge_func(
+        "leewoon_cache_hits_total", "캐시 적중 수", _each(lambda c: c.hits), kind="counter"
+    )
+    REGISTRY.gauge_func(
+        "leewoon_cache_misses_total", "캐시 실패 수", _each(lambda c: c.misses), kind="counter"
+    )
+    REGISTRY.gauge_func("leewoon_cache_hit_ratio", "캐시 적중률 (기동 이후 누적)", _each(_ratio))
+    memory = {name: cache for name, cache in caches.items() if hasattr(cache, "total")}
+    REGISTRY.gauge_func(
+        "leewoon_cache_bytes",
+        "메모리 캐시 점유 크기 (bytes)",
+        lambda: {(("cache", name),): cache.total for name, cache in memory.items()},
+    )
+
+
+# ---------- HTTP 엔드포인트 ---------- #
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(
+    host: str = METRICS_HOST, port: int = METRICS_PORT
+) -> Optional[ThreadingHTTPServer]:
+    """/metrics 를 서비스하는 데몬 스레드. 포트가 0 이거나 이미 쓰이면 None"""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
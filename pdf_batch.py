@@ -0,0 +1,209 @@
+import io
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.oxml.parser import parse_xml
+from lxml import etree
+
+from xml_engine import copy_member_raw, main_part_name
+
+# 변환된 PDF 를 문서별로 나눌 때 필요. 없으면 병합 변환을 하지 않고 문서마다 변환한다.
+try:
+    from pypdf import PdfReader, PdfWriter
+except Exception:
+    PdfReader = PdfWriter = None
+
+# 한 번에 병합해 변환할 최대 문서 수 (변환 제한 시간 PDF_TIMEOUT 안에 끝나는 정도)
+PDF_MERGE_MAX = int(os.environ.get("PDF_MERGE_MAX", "100"))
+
+# 문서 시작 위치 책갈피 → PDF 이름 있는 대상(named destination) 으로 내보내 시작 페이지를 찾음
+BOOKMARK_PREFIX = "leewoon_doc_"
+
+_W_P = qn("w:p")
+_W_SECTPR = qn("w:sectPr")
+_W_ID = qn("w:id")
+_BOOKMARK_TAGS = (qn("w:bookmarkStart"), qn("w:bookmarkEnd"))
+# w:sectPr 자식 순서에서 w:pgNumType 뒤에 오는 요소들
+_AFTER_PGNUMTYPE = (
+    "w:cols", "w:formProt", "w:vAlign", "w:noEndnote", "w:titlePg", "w:textDirection",
+    "w:bidi", "w:rtlGutter", "w:docGrid", "w:printerSettings", "w:sectPrChange",
+)
+
+
+def available() -> bool:
+    return PdfReader is not None
+
+
+def bookmark_name(index: int) -> str:
+    return f"{BOOKMARK_PREFIX}{index:05d}"
+
+
+# ---------- DOCX 병합 ---------- #
+
+def _signature(zf: ZipFile, main: str) -> Dict[str, Tuple[int, int]]:
+    """본문 외 파트의 {이름: (CRC, 크기)} — 압축을 풀지 않고 비교"""
+    return {i.filename: (i.CRC, i.file_size) for i in zf.infolist() if i.filename != main}
+
+
+def _counts_pages(zf: ZipFile) -> bool:
+    """전체 쪽수 필드(NUMPAGES)가 있으면 병합 문서의 쪽수가 찍히므로 병합 불가"""
+    return any(
+        name.startswith("word/") and name.endswith(".xml") and b"NUMPAGES" in zf.read(name)
+        for name in zf.namelist()
+    )
+
+
+def _restart_section(sectPr):
+    """문서의 첫 섹션: 새 페이지에서 시작하고 쪽 번호는 1부터"""
+    sectPr.start_type = None  # w:type 이 없으면 nextPage
+    pgNumType = sectPr.find(qn("w:pgNumType"))
+    if pgNumType is None:
+        pgNumType = OxmlElement("w:pgNumType")
+        sectPr.insert_element_before(pgNumType, *_AFTER_PGNUMTYPE)
+    pgNumType.set(qn("w:start"), "1")
+
+
+def merge_docx(docs: List[bytes]) -> Optional[bytes]:
+    """
+    같은 템플릿으로 만든 DOCX 들을 섹션 나누기(다음 페이지)로 이어 붙인 DOCX 하나.
+    문서마다 첫 문단에 책갈피(bookmark_name(i))를 넣어 변환된 PDF 에서 시작 페이지를 찾는다.
+    본문 외 파트(머리글/바닥글/각주/관계/미디어 등)가 문서마다 다르면 합칠 수 없으므로 None.
+    """
+    if not docs:
+        return None
+    with ZipFile(io.BytesIO(docs[0])) as first:
+        main = main_part_name(first)
+        shared = _signature(first, main)
+        if _counts_pages(first):
+            return None
+        root = parse_xml(first.read(main))
+
+    body = root.find(qn("w:body"))
+    for child in list(body):
+        body.remove(child)
+
+    next_id = 0
+    last = len(docs) - 1
+    for index, data in enumerate(docs):
+        with ZipFile(io.BytesIO(data)) as zf:
+            if main_part_name(zf) != main or _signature(zf, main) != shared:
+                return None
+            doc_body = parse_xml(zf.read(main)).find(qn("w:body"))
+
+        children = list(doc_body)
+        final_sect = children.pop() if children and children[-1].tag == _W_SECTPR else None
+
+        # 책갈피 id 는 문서 전체에서 유일해야 하므로 다시 매김
+        ids: Dict[str, str] = {}
+        for child in children:
+            for mark in child.iter(*_BOOKMARK_TAGS):
+                old = mark.get(_W_ID)
+                if old not in ids:
+                    ids[old] = str(next_id)
+                    next_id += 1
+                mark.set(_W_ID, ids[old])
+
+        first_p = next((p for child in children for p in child.iter(_W_P)), None)
+        if first_p is None:
+            first_p = OxmlElement("w:p")
+            children.insert(0, first_p)
+        at = 1 if first_p.pPr is not None else 0
+        first_p.insert(at, OxmlElement(
+            "w:bookmarkStart", {qn("w:id"): str(next_id), qn("w:name"): bookmark_name(index)}
+        ))
+        first_p.insert(at + 1, OxmlElement("w:bookmarkEnd", {qn("w:id"): str(next_id)}))
+        next_id += 1
+
+        sects = [s for child in children for s in child.iter(_W_SECTPR)]
+        if final_sect is not None:
+            sects.append(final_sect)
+        if sects:
+            _restart_section(sects[0])
+
+        for child in children:
+            body.append(child)
+        if final_sect is None:
+            continue
+        if index == last:
+            body.append(final_sect)
+            continue
+        # 문서의 마지막 섹션을 끝 문단에서 닫는다 (끝이 표이거나 이미 섹션 끝이면 빈 문단 추가)
+        end_p = children[-1] if children and children[-1].tag == _W_P else None
+        if end_p is None or (end_p.pPr is not None and end_p.pPr.sectPr is not None):
+            end_p = OxmlElement("w:p")
+            body.append(end_p)
+        end_p.set_sectPr(final_sect)
+
+    out = io.BytesIO()
+    with ZipFile(io.BytesIO(docs[0])) as src, ZipFile(out, "w", ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            if info.filename == main:
+                dst.writestr(info.filename, etree.tostring(root, encoding="UTF-8", standalone=True))
+            else:
+                copy_member_raw(src, info, dst)
+    return out.getvalue()
+
+
+# ---------- PDF 분할 ---------- #
+
+def split_pdf(pdf: bytes, count: int) -> Optional[List[bytes]]:
+    """
+    병합 변환한 PDF 를 문서 시작 책갈피(이름 있는 대상) 위치에서 count 개로 나눈다.
+    책갈피를 못 찾거나 순서가 맞지 않으면 None.
+    """
+    if PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(io.BytesIO(pdf))
+        dests = reader.named_destinations
+        starts = [reader.get_destination_page_number(dests[bookmark_name(i)]) for i in range(count)]
+    except Exception:
+        return None
+    if not starts or starts[0] != 0 or any(b <= a for a, b in zip(starts, starts[1:])):
+        return None
+
+    parts = []
+    for begin, end in zip(starts, starts[1:] + [len(reader.pages)]):
+        writer = PdfWriter()
+        for page in reader.pages[begin:end]:
+            writer.add_page(page)
+        buf = io.BytesIO()
+        writer.write(buf)
+        parts.append(buf.getvalue())
+    return parts
+
+
+def join_pdfs(pdfs: List[bytes]) -> bytes:
+    if len(pdfs) == 1:
+        return pdfs[0]
+    writer = PdfWriter()
+    for pdf in pdfs:
+        writer.append(io.BytesIO(pdf))
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def convert_merged(
+    docs: List[bytes], convert: Callable[[bytes], Optional[bytes]]
+) -> Optional[Tuple[bytes, List[bytes]]]:
+    """
+    docs 를 DOCX 하나로 합쳐 한 번만 변환하고 문서별로 나눈다 → (병합 PDF, 문서별 PDF).
+    convert 는 책갈피를 이름 있는 대상으로 내보내는 변환 함수.
+    병합/변환/분할 중 하나라도 안 되면 None (호출 측에서 문서마다 변환).
+    """
+    if PdfReader is None:
+        return None
+    merged = merge_docx(docs)
+    if merged is None:
+        return None
+    pdf = convert(merged)
+    if not pdf:
+        return None
+    parts = split_pdf(pdf, len(docs))
+    if parts is None:
+        return None
+    return pdf, parts
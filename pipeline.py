@@ -0,0 +1,484 @@
+"""
+문서 생성 파이프라인 (엑셀 로드 → 치환 → PDF 변환 → ZIP 묶기).
+Streamlit 에 의존하지 않아 UI(app.py), 명령줄(cli.py) 등에서 같이 쓴다.
+진행 상황/안내 문구는 st.* 대신 job.report / job.notify 로 전달한다.
+"""
+import os
+import platform
+import re
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import converter
+import pdf_batch
+from archive import add_member
+from blobstore import BLOB_STORE
+from cache import RESULT_CACHE, cached_cells, compiled_template, content_hash, result_key
+from converter import CircuitOpenError, ConversionError, ConversionTimeout, ConverterPool
+from engine import BATCH_MEMO_MB, Data, count_rows, render_batch, row_key
+from jobs import Job
+from lru import SizedLRU
+from manifest import MANIFEST_NAME, Manifest, PreviousRun, ReuseMemo, diff
+from metrics import CONVERSION_SECONDS, CONVERSIONS, GENERATION_SECONDS, GENERATIONS
+from timing import StageTimer
+
+# docx → pdf (MS Word or LibreOffice)
+try:
+    from docx2pdf import convert as docx2pdf_convert
+except Exception:
+    docx2pdf_convert = None
+
+def default_out() -> str:
+    """기본 출력 파일 이름 — 요청마다 그날 날짜로 만든다 (오래 떠 있는 서버/감시자도 날짜가 맞게)"""
+    return f"{datetime.today():%Y%m%d}_#_납입요청서_DB저축은행.docx"
+
+Notify = Callable[[str, str], None]
+
+# 이전 결과 대비 변경 요약에 보여 줄 최대 문서 수
+DIFF_LINES = 30
+
+
+# ---------- 유틸 ---------- #
+
+def ensure_docx(name: str) -> str:
+    name = (name or "").strip()
+    return name if name.lower().endswith(".docx") else name + ".docx"
+
+
+def ensure_pdf(name: str) -> str:
+    base = (name or "output").strip()
+    return base if base.lower().endswith(".pdf") else base + ".pdf"
+
+
+def has_soffice() -> bool:
+    # converter 모듈 속성으로 찾아야 부하 테스트의 가짜 변환기 교체가 반영된다
+    return converter.find_soffice() is not None
+
+
+def safe_filename(name: str) -> str:
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(name)).strip("_")
+
+
+def row_stem(base: str, row_idx: int, row: Dict[str, Any], name_col: Optional[str], used: set) -> str:
+    """일괄 생성 문서의 파일 이름(확장자 제외). 이름 열 값이 겹치면 행 번호를 붙인다"""
+    label = safe_filename(row.get(name_col) or "") if name_col else ""
+    stem = f"{base}_{label or row_idx}"
+    if stem in used:
+        stem = f"{stem}_{row_idx}"
+    used.add(stem)
+    return stem
+
+
+def quiet(level: str, text: str):
+    """notify 기본값: 안내 문구를 버린다"""
+    pass
+
+
+# ---------- PDF 변환 ---------- #
+
+def _observe_conversion(converter: str, outcome: str, started: Optional[float] = None):
+    if started is not None:
+        CONVERSION_SECONDS.labels(converter=converter).observe(time.perf_counter() - started)
+    CONVERSIONS.labels(converter=converter, outcome=outcome).inc()
+
+
+def convert_docx_to_pdf_bytes(
+    docx_bytes: bytes,
+    pool: Optional[ConverterPool] = None,
+    verbose: bool = True,
+    notify: Notify = quiet,
+    destinations: bool = False,
+) -> Optional[bytes]:
+    """
+    DOCX → PDF 변환.
+    - 1순위: Windows + MS Word(docx2pdf)
+    - 2순위: 상주 LibreOffice 서버 풀(UNO) → 실패 시 soffice 1회성 실행
+    verbose=False 이면 사용 엔진 안내/실패 메시지를 생략 (일괄 생성용)
+    pool 은 호출 측이 관리하는 상주 서버 풀 (없으면 1회성 실행만)
+    notify 로 안내 문구를 전달 (백그라운드 작업에서는 job.notify)
+    destinations=True 이면 책갈피를 PDF 이름 있는 대상으로 내보냄 (LibreOffice 만 지원)
+    """
+    try:
+        system = platform.system().lower()
+
+        # 1) Windows + docx2pdf (Word) 우선
+        if system == "windows" and docx2pdf_convert is not None and not destinations:
+            with tempfile.TemporaryDirectory() as td:
+                in_path = os.path.join(td, "doc.docx")
+                out_path = os.path.join(td, "doc.pdf")
+                with open(in_path, "wb") as f:
+                    f.write(docx_bytes)
+                started = time.perf_counter()
+                try:
+                    if verbose:
+                        notify("info", "PDF 변환: MS Word(docx2pdf) 엔진 사용 중...")
+                    docx2pdf_convert(in_path, out_path)
+                    if os.path.exists(out_path):
+                        with open(out_path, "rb") as f:
+                            pdf_bytes = f.read()
+                        _observe_conversion("docx2pdf", "success", started)
+                        return pdf_bytes
+                    _observe_conversion("docx2pdf", "failure", started)
+                except Exception as e:
+                    _observe_conversion("docx2pdf", "failure", started)
+                    notify("warning", f"MS Word(docx2pdf) 변환 실패, LibreOffice로 재시도합니다. ({e})")
+
+        # 2) LibreOffice: 상주 서버 풀 → 1회성 실행 (제한 시간/재시도/서킷 브레이커)
+        if pool is not None or has_soffice():
+            started = time.perf_counter()
+            try:
+                if verbose:
+                    notify("info", "PDF 변환: LibreOffice 엔진 사용 중 (폰트가 일부 바뀔 수 있습니다).")
+                pdf_bytes = converter.convert(docx_bytes, pool, destinations=destinations)
+                _observe_conversion("soffice", "success" if pdf_bytes else "failure", started)
+                return pdf_bytes
+            except CircuitOpenError as e:
+                _observe_conversion("soffice", "circuit_open")
+                if verbose:
+                    notify("warning", f"{e} PDF 없이 WORD 만 생성합니다.")
+            except ConversionError as e:
+                outcome = "timeout" if isinstance(e, ConversionTimeout) else "failure"
+                _observe_conversion("soffice", outcome, started)
+                if verbose:
+                    notify("error", f"LibreOffice 변환 실패: {e}")
+
+    except Exception as e:
+        notify("error", f"PDF 변환 중 예외 발생: {e}")
+
+    return None
+
+
+# ---------- 생성 ---------- #
+
+def finish_run(timer: StageTimer, engine: str, outcome: str, **extra):
+    """단계 기록을 JSON 로그로 남기고 프로세스 지표(소요 시간/결과 수)에 반영"""
+    timer.finish(engine=engine, outcome=outcome, **extra)
+    GENERATION_SECONDS.labels(run=timer.run, engine=engine).observe(timer.total_seconds)
+    GENERATIONS.labels(run=timer.run, engine=engine, outcome=outcome).inc()
+
+
+def run_single(
+    job: Job,
+    xlsx: Data,
+    xlsx_hash: str,
+    docx: Data,
+    docx_hash: str,
+    sheet_choice: Optional[str],
+    out_name: str,
+    engine: str,
+    profile: bool,
+    key: Optional[str] = None,
+    pool: Optional[ConverterPool] = None,
+    with_pdf: bool = True,
+) -> Dict[str, Any]:
+    """
+    단건 생성 → job.result 에 ZIP (WORD + PDF, with_pdf=False 이면 WORD 만).
+    key 가 있으면 결과 캐시에 넣는다. 요약 {"documents", "pdf_ok"} 를 돌려준다.
+    """
+    timer = StageTimer("single", profile=profile)
+    job.timer = timer
+    steps = 6
+
+    def stage(name: str, bytes_in: int = 0):
+        job.report(len(timer.stages) / steps, f"{name} 중...")
+        return timer.stage(name, bytes_in)
+
+    try:
+        # 1) 워드 템플릿 컴파일 (템플릿 해시로 캐시)
+        with stage("템플릿 파싱", len(docx)):
+            template = compiled_template(docx, docx_hash, engine)
+
+        # 2) 엑셀에서 참조 셀만 로드
+        with stage("엑셀 로드", len(xlsx)):
+            cells = cached_cells(xlsx, sheet_choice, template.addrs, xlsx_hash)
+
+        # 3) 치환 + 4) DOCX 저장
+        docx_bytes = template.render(cells, stage=stage)
+
+        # 5) PDF 변환
+        pdf_bytes = None
+        if with_pdf:
+            with stage("PDF 변환", len(docx_bytes)) as rec:
+                pdf_bytes = convert_docx_to_pdf_bytes(docx_bytes, pool, notify=job.notify)
+                rec["bytes_out"] = len(pdf_bytes or b"")
+        pdf_ok = pdf_bytes is not None
+
+        # 6) ZIP 묶기 (저장소 파일로 바로 씀)
+        with stage("ZIP 묶기", len(docx_bytes) + len(pdf_bytes or b"")) as rec:
+            with BLOB_STORE.writer() as f:
+                build_zip(f, docx_bytes, pdf_bytes, pdf_ok, out_name)
+            zip_blob = f.blob
+            rec["bytes_out"] = len(zip_blob)
+        # PDF 변환이 실패한 결과는 다음에 다시 시도하도록 캐시하지 않음
+        if pdf_ok and key:
+            RESULT_CACHE.put_file(key, zip_blob.path)
+    except Exception as e:
+        finish_run(timer, engine, "failure", error=repr(e))
+        raise
+
+    finish_run(timer, engine, "success", pdf_ok=pdf_ok)
+    BLOB_STORE.acquire(job.id, zip_blob)
+    job.result = zip_blob
+    job.file_name = zip_file_name(out_name)
+    job.download_label = "📥 ZIP 다운로드 (WORD + PDF)"
+    job.notify("success", "✅ ZIP 파일이 준비되었습니다!")
+    job.report(1.0, "완료")
+    return {"documents": 1, "pdf_ok": pdf_ok}
+
+
+def run_batch(
+    job: Job,
+    xlsx: Data,
+    xlsx_hash: str,
+    docx: Data,
+    docx_hash: str,
+    sheet_choice: Optional[str],
+    base: str,
+    batch: dict,
+    engine: str,
+    profile: bool,
+    key: Optional[str] = None,
+    pool: Optional[ConverterPool] = None,
+    previous=None,
+) -> Dict[str, Any]:
+    """
+    행별 일괄 생성 → job.result 에 행별 문서 + manifest.json 을 담은 ZIP (병합 PDF 는 job.attachments).
+    previous 가 이전 결과 (ZIP 또는 출력 폴더) 이면 참조 값이 그대로인 문서는 이전 DOCX/PDF 를 재사용하고
+    바뀐 문서만 다시 렌더링/변환한다.
+    요약 {"documents", "render_failed", "pdf_failed"} (+ 이전 결과 대비 변경 수) 를 돌려준다.
+    """
+    name_col = batch["name_col"]
+    timer = StageTimer("batch", profile=profile)
+    job.timer = timer
+    # 같은 값의 행은 render_batch 가 같은 DOCX 를 돌려주므로 PDF 도 내용 해시로 재사용
+    pdf_memo = SizedLRU(64 * 1024 * 1024)
+    count = pdf_failed = pdf_reused = 0
+    render_failed = []
+    # 병합 변환: 변환을 미룬 (파일명, DOCX) 와 묶음별 병합 PDF
+    pending: List[Tuple[str, bytes]] = []
+    merged_pdfs: List[bytes] = []
+    merged_stems = set()  # 병합 변환으로 PDF 를 얻은 문서
+    # 병합 변환을 거치지 않은 문서가 있으면 병합 PDF 를 문서별 PDF 로 다시 잇는다 (파일명 → PDF, 문서 순서)
+    merge_parts: Dict[str, bytes] = {}
+    stems: List[str] = []
+    prev_run = PreviousRun.open(previous) if previous is not None else None
+    reuse: Optional[PreviousRun] = None  # 템플릿/날짜/고정 셀이 같아 문서를 재사용할 수 있는 이전 결과
+
+    def add_pdf(stem: str, docx_bytes: bytes, docx_hash_row: str):
+        """문서 1건 변환 (같은 내용이면 이전 변환 재사용) 후 ZIP 에 추가"""
+        nonlocal pdf_failed
+        pdf_bytes = pdf_memo.get(docx_hash_row)
+        if pdf_bytes is None:
+            with timer.stage("PDF 변환", len(docx_bytes)) as rec:
+                pdf_bytes = convert_docx_to_pdf_bytes(
+                    docx_bytes, pool, verbose=False, notify=job.notify
+                )
+                rec["bytes_out"] = len(pdf_bytes or b"")
+        if pdf_bytes:
+            pdf_memo.put(docx_hash_row, pdf_bytes, len(pdf_bytes))
+            add_pdf_member(stem, pdf_bytes)
+        else:
+            pdf_failed += 1
+
+    def add_pdf_member(stem: str, pdf_bytes: bytes):
+        with timer.stage("ZIP 묶기", len(pdf_bytes)):
+            add_member(zf, f"{stem}.pdf", pdf_bytes)
+        manifest.mark_pdf(stem)
+        if batch["merge_pdf"]:
+            merge_parts[stem] = pdf_bytes
+
+    def previous_pdf(docx_hash_row: str) -> Optional[bytes]:
+        nonlocal pdf_reused
+        pdf_bytes = reuse.pdf(docx_hash_row) if reuse is not None else None
+        if pdf_bytes is not None:
+            pdf_reused += 1
+        return pdf_bytes
+
+    def flush_merged():
+        """모아 둔 문서를 한 번에 변환해 나누고, 안 되면 문서마다 변환"""
+        job.report(None, f"PDF 병합 변환 중 ({len(pending)}건)")
+        with timer.stage("PDF 병합 변환", sum(len(d) for _, d in pending)) as rec:
+            converted = pdf_batch.convert_merged(
+                [d for _, d in pending],
+                lambda data: convert_docx_to_pdf_bytes(
+                    data, pool, verbose=False, notify=job.notify, destinations=True
+                ),
+            )
+            rec["bytes_out"] = len(converted[0]) if converted else 0
+        if converted is None:
+            job.notify("info", "PDF 를 병합 변환할 수 없어 문서마다 변환했습니다.")
+            for stem, docx_bytes in pending:
+                add_pdf(stem, docx_bytes, content_hash(docx_bytes))
+        else:
+            merged_pdfs.append(converted[0])
+            for (stem, _), pdf_bytes in zip(pending, converted[1]):
+                add_pdf_member(stem, pdf_bytes)
+                merged_stems.add(stem)
+        pending.clear()
+
+    try:
+        total = count_rows(xlsx, sheet_choice, batch["start_row"])
+        # 결과 ZIP 은 메모리에 모으지 않고 저장소 파일로 바로 씀
+        with BLOB_STORE.writer() as f, ZipFile(f, "w", ZIP_DEFLATED) as zf:
+            used = set()
+            with timer.stage("템플릿 파싱", len(docx)):
+                template = compiled_template(docx, docx_hash, engine)
+            key_cols = sorted(template.tokens()[1])
+            fixed = cached_cells(xlsx, sheet_choice, template.addrs, xlsx_hash)
+            manifest = Manifest(docx_hash, engine, date.today().isoformat(), fixed)
+            memo = None
+            if prev_run is not None:
+                reason = prev_run.mismatch(manifest)
+                if reason:
+                    job.notify("info", f"이전 결과와 {reason} 이(가) 달라 모든 문서를 다시 만듭니다.")
+                else:
+                    reuse = prev_run
+                    memo = ReuseMemo(BATCH_MEMO_MB * 1024 * 1024, reuse)
+            results = render_batch(
+                xlsx,
+                docx,
+                sheet_choice,
+                start_row=batch["start_row"],
+                extra_cols=[name_col] if name_col else (),
+                workers=batch["workers"],
+                template=template,
+                memo=memo,
+                fixed=fixed,
+            )
+            while True:
+                # 행 읽기 + 치환 + DOCX 저장 (프로세스 풀이면 대기 시간) 을 한 단계로 잰다
+                with timer.stage("행별 렌더링") as rec:
+                    item = next(results, None)
+                    if item is not None:
+                        rec["bytes_out"] = len(item[2] or b"")
+                if item is None:
+                    break
+                row_idx, row, docx_bytes, error = item
+                if error:
+                    render_failed.append(f"{row_idx}행: {error}")
+                    continue
+
+                stem = row_stem(base, row_idx, row, name_col, used)
+                docx_hash_row = content_hash(docx_bytes)
+                manifest.add(
+                    stem, row_idx, row_key(row, key_cols), {c: row.get(c) for c in key_cols},
+                    docx_hash_row,
+                )
+                stems.append(stem)
+                with timer.stage("ZIP 묶기", len(docx_bytes)):
+                    add_member(zf, f"{stem}.docx", docx_bytes)
+                if batch["with_pdf"]:
+                    pdf_bytes = pdf_memo.get(docx_hash_row) or previous_pdf(docx_hash_row)
+                    if pdf_bytes is not None:
+                        pdf_memo.put(docx_hash_row, pdf_bytes, len(pdf_bytes))
+                        add_pdf_member(stem, pdf_bytes)
+                    elif batch["merge_pdf"]:
+                        pending.append((stem, docx_bytes))
+                        if len(pending) >= pdf_batch.PDF_MERGE_MAX:
+                            flush_merged()
+                    else:
+                        add_pdf(stem, docx_bytes, docx_hash_row)
+                count += 1
+                done = count + len(render_failed)
+                job.report(done / total if total else None, f"{count}건 생성 (현재 {row_idx}행)")
+            if pending:
+                flush_merged()
+            zf.writestr(MANIFEST_NAME, manifest.to_bytes())
+    except Exception as e:
+        finish_run(timer, engine, "failure", error=repr(e))
+        raise
+    finally:
+        if prev_run is not None:
+            prev_run.close()
+
+    if "ZIP 묶기" in timer.stages:
+        timer.stages["ZIP 묶기"]["bytes_out"] = len(f.blob)
+    finish_run(
+        timer,
+        engine,
+        "success" if count and not render_failed else "failure",
+        workers=batch["workers"],
+        documents=count,
+        render_failed=len(render_failed),
+        pdf_failed=pdf_failed,
+    )
+
+    if render_failed:
+        job.notify(
+            "warning",
+            f"⚠️ 문서 생성 실패 {len(render_failed)}건\n\n"
+            + "\n".join(f"- {line}" for line in render_failed),
+        )
+    job.report(1.0, "완료")
+    summary = {"documents": count, "render_failed": len(render_failed), "pdf_failed": pdf_failed}
+    if count == 0:
+        job.notify("warning", "생성할 행이 없습니다. 시작 행과 {{B#}} 토큰의 열을 확인하세요.")
+        return summary
+    if pdf_failed:
+        job.notify("warning", f"PDF 변환 실패 {pdf_failed}건 (DOCX 는 모두 포함됨)")
+
+    if prev_run is not None:
+        changes, lines = diff(prev_run, manifest)
+        summary.update(changes, reused=memo.reused if memo is not None else 0, pdf_reused=pdf_reused)
+        shown = "\n".join(f"- {line}" for line in lines[:DIFF_LINES])
+        more = f"\n- … 외 {len(lines) - DIFF_LINES}건" if len(lines) > DIFF_LINES else ""
+        job.notify(
+            "info",
+            f"이전 결과 대비: 변경 {changes['changed']}건, 추가 {changes['added']}건, "
+            f"삭제 {changes['removed']}건, 그대로 {changes['unchanged']}건 "
+            f"(렌더링 재사용 {summary['reused']}건, PDF 재사용 {pdf_reused}건)"
+            + (f"\n\n{shown}{more}" if lines else ""),
+        )
+
+    if merge_parts and any(s not in merged_stems for s in stems):
+        # 재사용한 PDF, 같은 값의 행, 병합에 실패해 문서마다 변환한 묶음은 병합 PDF 에 없으므로
+        # 문서별 PDF 를 문서 순서대로 다시 잇는다 (이을 수 없으면 빠진 병합 PDF 는 내놓지 않음)
+        merged_pdfs = []
+        if pdf_batch.available():
+            merged_pdfs = [pdf_batch.join_pdfs([merge_parts[s] for s in stems if s in merge_parts])]
+    merged_blob = None
+    if merged_pdfs:
+        merged_blob = BLOB_STORE.put(pdf_batch.join_pdfs(merged_pdfs))
+        BLOB_STORE.acquire(job.id, merged_blob)
+        job.attachments.append(
+            ("📄 병합 PDF 다운로드", f"{base}_merged.pdf", merged_blob)
+        )
+    # PDF 변환에 실패한 문서가 있으면 병합 PDF 가 전체가 아니므로 둘 다 캐시하지 않음
+    if key and not render_failed and not pdf_failed:
+        RESULT_CACHE.put_file(key, f.blob.path)
+        if merged_blob is not None:
+            RESULT_CACHE.put_file(result_key("merged", key), merged_blob.path)
+
+    BLOB_STORE.acquire(job.id, f.blob)
+    job.result = f.blob
+    job.file_name = f"{base}_batch.zip"
+    job.download_label = "📥 ZIP 다운로드 (행별 WORD + PDF)"
+    job.notify("success", f"✅ {count}건의 문서가 담긴 ZIP 파일이 준비되었습니다!")
+    return summary
+
+
+# ---------- ZIP ---------- #
+
+def build_zip(
+    out: BinaryIO,
+    docx_bytes: bytes,
+    pdf_bytes: Optional[bytes],
+    pdf_ok: bool,
+    out_name: str,
+):
+    with ZipFile(out, "w", ZIP_DEFLATED) as zf:
+        docx_name = ensure_docx(out_name) if out_name.strip() else default_out()
+        add_member(zf, docx_name, docx_bytes)
+
+        if pdf_ok and pdf_bytes:
+            pdf_name = ensure_pdf(out_name)
+            add_member(zf, pdf_name, pdf_bytes)
+
+
+def zip_file_name(out_name: str) -> str:
+    base_zip_name = (ensure_docx(out_name) if out_name.strip() else default_out())
+    base_zip_name = base_zip_name.replace(".docx", "")
+    return f"{base_zip_name}_both.zip"
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from engine import Data, make_template
+
+# 프로세스 수 / chunk 크기 (환경변수로 조정 가능)
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "0")) or (os.cpu_count() or 1)
+RENDER_CHUNKSIZE = int(os.environ.get("RENDER_CHUNKSIZE", "8"))
+
+# RenderResult = (DOCX bytes 또는 None, 오류 메시지 또는 None)
+RenderResult = Tuple[Optional[bytes], Optional[str]]
+
+
+# ---------- 워커 프로세스 ---------- #
+
+_TEMPLATE = None
+_FIXED: Dict[str, Any] = {}
+
+
+def _init_worker(docx_bytes: Data, fixed: Dict[str, Any], kind: str):
+    """워커 기동 시 1회: 템플릿 컴파일 + 고정 셀 값 보관"""
+    global _TEMPLATE, _FIXED
+    _TEMPLATE = make_template(docx_bytes, kind)
+    _FIXED = fixed
+
+
+def _render_job(row: Dict[str, Any]) -> RenderResult:
+    try:
+        return _TEMPLATE.render(_FIXED, row), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+# ---------- 풀 ---------- #
+
+class RenderPool:
+    """
+    행 단위 렌더링을 ProcessPoolExecutor 로 분산한다.
+    - 템플릿(bytes 또는 Blob 경로)과 고정 셀 값은 워커 기동 시 한 번만 전달, 작업마다 행 값만 전달
+    - 결과는 입력 순서대로, 작업별 오류는 (None, 메시지) 로 격리
+    - 입력은 window 단위로 끊어 제출하므로 행 전체를 메모리에 올리지 않는다
+    """
+
+    def __init__(
+        self,
+        docx_bytes: Data,
+        fixed: Dict[str, Any],
+        kind: str = "docx",
+        workers: Optional[int] = None,
+        chunksize: Optional[int] = None,
+    ):
+        self.workers = workers or RENDER_WORKERS
+        self.chunksize = chunksize or RENDER_CHUNKSIZE
+        self.window = self.workers * self.chunksize * 4
+        # Streamlit 은 멀티스레드라 fork 대신 spawn 사용
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(docx_bytes, fixed, kind),
+        )
+
+    def map(self, rows: Iterable[Dict[str, Any]]) -> Iterator[RenderResult]:
+        it = iter(rows)
+        while True:
+            window = list(islice(it, self.window))
+            if not window:
+                return
+            yield from self.executor.map(_render_job, window, chunksize=self.chunksize)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,84 @@
+import io
+import os
+import sys
+from zipfile import ZIP_DEFLATED, ZipFile
+
+import pytest
+from openpyxl import Workbook
+
+# 저장소 루트의 모듈(engine, formula, ...)을 그대로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def replace_part(data: bytes, name: str, edit) -> bytes:
+    """xlsx 안의 파트 하나를 edit(bytes) → bytes 로 바꾼 사본"""
+    out = io.BytesIO()
+    with ZipFile(io.BytesIO(data)) as src, ZipFile(out, "w", ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            body = src.read(info.filename)
+            dst.writestr(info, edit(body) if info.filename == name else body)
+    return out.getvalue()
+
+
+@pytest.fixture
+def shared_formula_xlsx() -> bytes:
+    """
+    Excel 이 채우기(fill down)로 저장하는 모양의 공유 수식 시트 (캐시된 값 없음):
+    B2 = <f t="shared" ref="B2:B4" si="0">A2*10</f>, B3/B4 = <f t="shared" si="0"/>
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    ws.append(["값", "계산"])
+    for value in (1, 2, 3):
+        ws.append([value, "__F__"])
+    buf = io.BytesIO()
+    wb.save(buf)
+
+    def edit(xml: bytes) -> bytes:
+        cells = {
+            b"B2": b'<f t="shared" ref="B2:B4" si="0">A2*10</f>',
+            b"B3": b'<f t="shared" si="0"/>',
+            b"B4": b'<f t="shared" si="0"/>',
+        }
+        for coord, formula in cells.items():
+            start = xml.index(b'<c r="' + coord + b'"')
+            end = xml.index(b"</c>", start) + len(b"</c>")
+            xml = xml[:start] + b'<c r="' + coord + b'">' + formula + b"</c>" + xml[end:]
+        return xml
+
+    return replace_part(buf.getvalue(), "xl/worksheets/sheet1.xml", edit)
+
+
+@pytest.fixture
+def token_xlsx() -> bytes:
+    """B5 = 7, 정의된 이름 Rate → Sheet1!$B$5, 상수 이름 Konst = 0.3"""
+    from openpyxl.workbook.defined_name import DefinedName
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    ws["B5"] = 7
+    ws["B6"] = "행"
+    wb.defined_names["Rate"] = DefinedName("Rate", attr_text="Sheet1!$B$5")
+    wb.defined_names["Konst"] = DefinedName("Konst", attr_text="0.3")
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def make_docx(*paragraphs: str) -> bytes:
+    from docx import Document
+
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def docx_text(data: bytes) -> list:
+    from docx import Document
+
+    return [p.text for p in Document(io.BytesIO(data)).paragraphs]
@@ -0,0 +1,48 @@
+import io
+from zipfile import ZipFile
+
+import pytest
+from conftest import docx_text, make_docx
+
+import api
+from api import RequestError, render_stream
+
+
+def _form(xlsx: bytes, **fields) -> dict:
+    form = {"docx": make_docx("{{Rate}}: {{B#}}"), "xlsx": xlsx, "pdf": b"0", "name": b"doc"}
+    form.update({k: v.encode() for k, v in fields.items()})
+    return form
+
+
+def test_batch_renders_in_process_with_cached_fixed_cells(token_xlsx, monkeypatch):
+    seen = {}
+    render_batch = api.render_batch
+
+    def spy(*args, **kwargs):
+        seen.update(kwargs)
+        return render_batch(*args, **kwargs)
+
+    monkeypatch.setattr(api, "render_batch", spy)
+    out = io.BytesIO()
+    summary = render_stream(_form(token_xlsx, start_row="5"), None, out)
+
+    assert seen["workers"] == 1 and seen["fixed"] == {"Rate": 7}
+    assert summary["documents"] == 2
+    with ZipFile(out) as zf:
+        assert sorted(zf.namelist()) == ["doc_5.docx", "doc_6.docx"]
+        assert docx_text(zf.read("doc_6.docx")) == ["7: 행"]
+
+
+def test_batch_workers_capped(token_xlsx, monkeypatch):
+    seen = {}
+    monkeypatch.setattr(api, "RENDER_WORKERS", 2)
+    monkeypatch.setattr(api, "render_batch", lambda *a, **kw: seen.update(kw) or iter(()))
+    render_stream(_form(token_xlsx, workers="64"), None, io.BytesIO())
+    assert seen["workers"] == 2
+
+
+@pytest.mark.parametrize("start_row", ["0", "-3", "x"])
+def test_batch_rejects_bad_start_row(token_xlsx, start_row):
+    with pytest.raises(RequestError) as e:
+        render_stream(_form(token_xlsx, start_row=start_row), None, io.BytesIO())
+    assert e.value.status == 400
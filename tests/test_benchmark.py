@@ -0,0 +1,48 @@
+import io
+import random
+
+import pytest
+from docx import Document
+
+from benchmark import CASES, SEED, make_docx, make_workbook, verify_format
+from engine import (
+    TEMPLATE_ENGINES,
+    iter_located_paragraphs,
+    load_workbook_from_bytes,
+    make_replacer,
+    make_template,
+    pick_sheet,
+    read_cells,
+    replace_everywhere,
+)
+
+CELLS = 60
+
+
+def located_text(data: bytes):
+    return [(part, p.text) for part, p in iter_located_paragraphs(Document(io.BytesIO(data)))]
+
+
+def render_classic(xlsx: bytes, docx: bytes) -> bytes:
+    doc = Document(io.BytesIO(docx))
+    replace_everywhere(doc, make_replacer(pick_sheet(load_workbook_from_bytes(xlsx))))
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("case", [c for c in CASES if c != "media"])
+@pytest.mark.parametrize("kind", sorted(TEMPLATE_ENGINES))
+def test_compiled_matches_classic(case, kind):
+    rng = random.Random(SEED)
+    xlsx = make_workbook(CELLS, rng)
+    docx = make_docx(case, 1, CELLS, rng)
+    template = make_template(docx, kind)
+    compiled = template.render(read_cells(xlsx, None, template.addrs))
+    expected = located_text(render_classic(xlsx, docx))
+    assert any("{{" in text for _, text in located_text(docx))
+    assert located_text(compiled) == expected
+
+
+def test_value_formats_match_reference():
+    assert verify_format(300) == []
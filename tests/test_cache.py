@@ -0,0 +1,27 @@
+import os
+
+from blobstore import Blob
+from cache import DiskLRU
+
+
+def test_disk_lru_returns_file_handle(tmp_path):
+    cache = DiskLRU(str(tmp_path / "results"), 1024 * 1024, 3600)
+    src = tmp_path / "result.zip"
+    src.write_bytes(b"zip" * 100)
+    cache.put_file("k", str(src))
+
+    blob = cache.get("k")
+    assert isinstance(blob, Blob)
+    assert len(blob) == 300 and blob.read_bytes() == b"zip" * 100
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_disk_lru_expires_and_evicts(tmp_path):
+    cache = DiskLRU(str(tmp_path), 250, 3600)
+    cache.put("old", b"a" * 100)
+    os.utime(cache._path("old"), (1, 1))
+    cache.put("mid", b"b" * 100)
+    assert cache.get("old") is None  # ttl 이 지남
+    cache.put("new", b"c" * 200)
+    assert cache.get("mid") is None and cache.get("new").read_bytes() == b"c" * 200
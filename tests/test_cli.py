@@ -0,0 +1,21 @@
+import cli
+from cli import EXIT_FAILED, EXIT_OK, EXIT_PARTIAL, exit_code
+from conftest import make_docx
+
+
+def test_exit_code():
+    assert exit_code({"documents": 3, "render_failed": 0, "pdf_failed": 0}) == EXIT_OK
+    assert exit_code({"documents": 2, "render_failed": 1, "pdf_failed": 0}) == EXIT_PARTIAL
+    assert exit_code({"documents": 0, "render_failed": 4, "pdf_failed": 0}) == EXIT_FAILED
+    assert exit_code({"documents": 0, "render_failed": 0, "pdf_failed": 0}) == EXIT_FAILED
+
+
+def test_batch_without_documents_fails(token_xlsx, tmp_path):
+    xlsx, docx = tmp_path / "in.xlsx", tmp_path / "t.docx"
+    xlsx.write_bytes(token_xlsx)
+    docx.write_bytes(make_docx("{{B#}}"))
+    args = ["--xlsx", str(xlsx), "--docx", str(docx), "--batch", "--no-pdf", "-q", "--name", "doc"]
+
+    assert cli.main(args + ["--out", str(tmp_path / "ok"), "--start-row", "5"]) == EXIT_OK
+    assert sorted(p.name for p in (tmp_path / "ok").iterdir()) == ["doc_5.docx", "doc_6.docx", "manifest.json"]
+    assert cli.main(args + ["--out", str(tmp_path / "none"), "--start-row", "100"]) == EXIT_FAILED
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+import converter
+from converter import CircuitBreaker, ConversionError
+
+
+class SlowFailingPool:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.calls = 0
+
+    def convert(self, docx_bytes, destinations=False, deadline=None):
+        self.calls += 1
+        time.sleep(self.seconds)
+        raise RuntimeError("soffice 연결 끊김")
+
+
+def test_convert_stops_at_overall_deadline(monkeypatch):
+    monkeypatch.setattr(converter, "BREAKER", CircuitBreaker(threshold=100))
+    monkeypatch.setattr(converter, "find_soffice", lambda: None)  # cold spawn 없음
+    pool = SlowFailingPool(0.1)
+    started = time.monotonic()
+    with pytest.raises(ConversionError):
+        converter.convert(b"docx", pool, retries=50, backoff=0.01, timeout=0.35)
+    assert time.monotonic() - started < 0.6
+    assert pool.calls < 50
+
+
+def test_breaker_lets_one_probe_through_half_open():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    breaker.record_failure()
+    assert not breaker.is_open
+    breaker.record_failure()
+    assert breaker.is_open
+
+    time.sleep(0.06)
+    assert not breaker.is_open  # 시도 하나
+    assert breaker.is_open and breaker.is_open  # 나머지는 바로 막힘
+    breaker.record_failure()  # 시도 실패 → 다시 열림
+    assert breaker.is_open
+
+    time.sleep(0.06)
+    assert not breaker.is_open
+    breaker.record_success()
+    assert not breaker.is_open and not breaker.is_open
@@ -0,0 +1,12 @@
+import pytest
+from conftest import docx_text, make_docx
+
+from engine import TEMPLATE_ENGINES, make_template, read_cells
+
+
+@pytest.mark.parametrize("kind", sorted(TEMPLATE_ENGINES))
+def test_unresolved_name_tokens_stay_literal(token_xlsx, kind):
+    template = make_template(make_docx("{{B5}} {{Rate}} {{Konst|0.0}}", "{{foo}} {{b5}} {{foo|#,##0}}"), kind)
+    cells = read_cells(token_xlsx, None, template.addrs)
+    assert "foo" not in cells and "b5" not in cells
+    assert docx_text(template.render(cells)) == ["7 7 0.3", "{{foo}} {{b5}} {{foo|#,##0}}"]
@@ -0,0 +1,23 @@
+from engine import read_cells, stream_rows
+from formula import fill_missing, sheet_reader
+
+
+def test_shared_formula_children_are_evaluated(shared_formula_xlsx):
+    reader = sheet_reader(shared_formula_xlsx, "Sheet1")
+    assert reader is not None
+    try:
+        assert {(2, 2), (3, 2), (4, 2)} <= set(reader.formulas)
+    finally:
+        reader.close()
+
+    values = fill_missing(shared_formula_xlsx, "Sheet1", {"B2": None, "B3": None, "B4": None})
+    assert values == {"B2": 10, "B3": 20, "B4": 30}
+
+
+def test_shared_formula_tokens(shared_formula_xlsx):
+    assert read_cells(shared_formula_xlsx, "Sheet1", ["B3", "Sheet1!B4"]) == {"B3": 20, "Sheet1!B4": 30}
+
+
+def test_shared_formula_rows(shared_formula_xlsx):
+    rows = [row for _, row in stream_rows(shared_formula_xlsx, "Sheet1", ["B"], start_row=2)]
+    assert [row["B"] for row in rows] == [10, 20, 30]
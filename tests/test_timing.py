@@ -0,0 +1,34 @@
+import threading
+import time
+import tracemalloc
+
+from timing import StageTimer
+
+
+def test_concurrent_profiled_runs_are_serialized():
+    errors = []
+    summaries = []
+
+    def run(i: int):
+        try:
+            timer = StageTimer("test", profile=True)
+            with timer.stage("할당"):
+                data = [bytes(1024) for _ in range(2000)]
+                time.sleep(0.02 * (i + 1))  # 먼저 끝난 실행이 추적을 끄는 동안 다른 실행은 단계 안
+            del data
+            summaries.append(timer.finish())
+        except Exception as e:  # cProfile 이 둘 다 켜지면 ValueError
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(summaries) == 4
+    for summary in summaries:
+        (stage,) = summary["stages"]
+        assert stage["peak_traced_bytes"] >= 2000 * 1024
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,33 @@
+import io
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+import pytest
+
+import xml_engine
+from xml_engine import copy_member_raw
+
+
+def _source() -> bytes:
+    buf = io.BytesIO()
+    with ZipFile(buf, "w") as zf:
+        zf.writestr("word/document.xml", b"<w:document/>" * 500, compress_type=ZIP_DEFLATED)
+        zf.writestr("word/media/image1.png", bytes(range(256)) * 40, compress_type=ZIP_STORED)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("raw", [True, False])
+def test_copy_member_raw_with_and_without_zipfile_internals(monkeypatch, raw):
+    monkeypatch.setattr(xml_engine, "_RAW_COPY", raw)
+    out = io.BytesIO()
+    with ZipFile(io.BytesIO(_source())) as src, ZipFile(out, "w", ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            copy_member_raw(src, info, dst)
+        dst.writestr("extra.txt", b"after")
+
+    with ZipFile(io.BytesIO(_source())) as src, ZipFile(out) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == src.namelist() + ["extra.txt"]
+        for info in src.infolist():
+            copied = zf.getinfo(info.filename)
+            assert zf.read(info) == src.read(info)
+            assert (copied.compress_type, copied.date_time) == (info.compress_type, info.date_time)
@@ -0,0 +1,161 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from zipfile import ZIP_DEFLATED, ZipFile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 단계별 기록은 JSON 한 줄씩 남긴다 (TIMING_LOG 가 있으면 파일, 없으면 stderr)
+logger = logging.getLogger("leewoon.timing")
+if not logger.handlers:
+    _handler = (
+        logging.FileHandler(os.environ["TIMING_LOG"], encoding="utf-8")
+        if os.environ.get("TIMING_LOG")
+        else logging.StreamHandler()
+    )
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# cProfile / tracemalloc 은 프로세스 전체에 걸리므로 프로파일링하는 실행은 한 번에 하나씩
+# (동시 작업이 서로의 최대 할당을 초기화하거나 추적을 끄지 않게)
+_PROFILE_LOCK = threading.Lock()
+
+
+def max_rss_bytes() -> Optional[int]:
+    """프로세스 최대 RSS (Linux 는 KB, macOS 는 bytes 단위로 보고됨)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class StageTimer:
+    """
+    생성 파이프라인의 단계별 소요 시간 / 입출력 bytes / 최대 메모리를 기록한다.
+    - 같은 이름의 단계를 여러 번 열면 시간과 bytes 가 합산된다 (일괄 생성 등)
+    - profile=True 이면 실행 전체를 cProfile + tracemalloc 으로 캡처
+      (프로파일링하는 실행은 _PROFILE_LOCK 으로 하나씩 — 다른 실행은 finish() 까지 기다림.
+       단계별 최대 할당도 이 실행만 잰다)
+    """
+
+    def __init__(self, run: str, profile: bool = False):
+        self.run = run
+        self.run_id = uuid.uuid4().hex[:12]
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.profiler: Optional[cProfile.Profile] = None
+        self.memory_report = ""
+        self._profile_zip: Optional[bytes] = None
+        self._own_tracemalloc = False
+        if profile:
+            _PROFILE_LOCK.acquire()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracemalloc = True
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @contextmanager
+    def stage(self, name: str, bytes_in: int = 0):
+        """with timer.stage("PDF 변환", len(docx)) as rec: ... rec["bytes_out"] = len(pdf)"""
+        rec = self.stages.setdefault(
+            name,
+            {"stage": name, "seconds": 0.0, "calls": 0, "bytes_in": 0, "bytes_out": 0},
+        )
+        rec["calls"] += 1
+        rec["bytes_in"] += bytes_in
+        traced = self.profiler is not None and tracemalloc.is_tracing()
+        if traced:
+            tracemalloc.reset_peak()
+        out = {"bytes_out": 0}
+        t0 = time.perf_counter()
+        try:
+            yield out
+        finally:
+            rec["seconds"] += time.perf_counter() - t0
+            rec["bytes_out"] += out["bytes_out"]
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+                rec["peak_traced_bytes"] = max(rec.get("peak_traced_bytes", 0), peak)
+            rec["max_rss_bytes"] = max_rss_bytes()
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [dict(rec, seconds=round(rec["seconds"], 4)) for rec in self.stages.values()]
+
+    def finish(self, top: int = 40, **extra) -> Dict[str, Any]:
+        """프로파일러 정지 + 요약을 JSON 로그로 남기고 돌려준다"""
+        profiling = self.profiler is not None and self.finished is None
+        self.finished = time.perf_counter()
+        if profiling:
+            try:
+                self.profiler.disable()
+                if tracemalloc.is_tracing():
+                    snapshot = tracemalloc.take_snapshot()
+                    self.memory_report = "\n".join(
+                        str(s) for s in snapshot.statistics("lineno")[:top]
+                    )
+                    if self._own_tracemalloc:
+                        tracemalloc.stop()
+            finally:
+                _PROFILE_LOCK.release()
+        summary = {
+            "event": "generation",
+            "run": self.run,
+            "run_id": self.run_id,
+            "total_seconds": round(self.total_seconds, 4),
+            "max_rss_bytes": max_rss_bytes(),
+            "stages": self.rows(),
+            **extra,
+        }
+        logger.info(json.dumps(summary, ensure_ascii=False, default=str))
+        return summary
+
+    def profile_zip(self, top: int = 40) -> Optional[bytes]:
+        """finish() 이후: cProfile(.pstats + 텍스트 요약) 과 tracemalloc 상위 할당 위치를 ZIP 으로"""
+        if self.profiler is None:
+            return None
+        if self._profile_zip is not None:
+            return self._profile_zip
+
+        stats_text = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stats_text)
+        stats.sort_stats("cumulative").print_stats(top)
+
+        buf = io.BytesIO()
+        with ZipFile(buf, "w", ZIP_DEFLATED) as zf:
+            zf.writestr(f"{self.run_id}.pstats", _dump_stats(self.profiler))
+            zf.writestr(f"{self.run_id}_cprofile.txt", stats_text.getvalue())
+            zf.writestr(f"{self.run_id}_tracemalloc.txt", self.memory_report)
+            zf.writestr(
+                f"{self.run_id}_stages.json",
+                json.dumps(self.rows(), ensure_ascii=False, indent=2, default=str),
+            )
+        self._profile_zip = buf.getvalue()
+        return self._profile_zip
+
+
+def _dump_stats(profiler: cProfile.Profile) -> bytes:
+    import marshal
+
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
@@ -0,0 +1,316 @@
+"""
+입력 폴더를 지켜보다가 엑셀 파일이 들어오면 정해진 템플릿으로 문서를 만들어 출력 폴더에 쓴다.
+(백오피스가 공유 폴더에 배정 워크북을 넣으면 사람이 업로드하지 않아도 생성)
+
+    python watcher.py --in /share/inbox --out /share/outbox --docx 템플릿.docx
+    python watcher.py --in ... --out ... --docx ... --batch --name-col B --jobs 2
+
+- inotify(inotify_simple) 가 있으면 이벤트로 깨어나고, 없으면 WATCH_POLL 초마다 폴더를 훑는다
+- 크기/수정 시각이 WATCH_SETTLE 초 동안 그대로인 파일만 처리 (복사 중인 파일 제외)
+- 결과는 출력 폴더의 <입력 파일 이름>/ 아래에 파일마다 원자적으로 씀
+- 처리한 입력은 (엑셀 내용, 템플릿 내용, 생성 옵션) 해시와 결과 상태로 상태 파일에 기록해 재시작 후 다시 만들지 않음
+  (실패/일부 실패한 입력은 기록만 남기고 재시작 때 다시 처리 — 이미 만든 문서는 재사용)
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from openpyxl.utils.exceptions import InvalidFileException
+
+import converter
+from blobstore import BLOB_STORE
+from cache import content_hash, result_key
+from cli import (
+    EXIT_FAILED,
+    EXIT_INPUT,
+    EXIT_OK,
+    ConsoleJob,
+    add_generation_args,
+    check_generation_args,
+    exit_code,
+    find_previous,
+    generate,
+    read_input,
+    save_outputs,
+    write_atomic,
+)
+from converter import ConverterPool
+from pipeline import safe_filename
+
+# 변경 알림(inotify) — Linux 전용. 없으면 주기적으로 폴더를 훑는다.
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except Exception:
+    INotify = inotify_flags = None
+
+# 폴더를 훑는 주기(초, inotify 가 없을 때) / 파일이 이 시간(초) 동안 그대로면 다 쓴 것으로 봄
+WATCH_POLL = float(os.environ.get("WATCH_POLL", "5"))
+WATCH_SETTLE = float(os.environ.get("WATCH_SETTLE", "3"))
+# 동시에 처리할 입력 파일 수
+WATCH_JOBS = int(os.environ.get("WATCH_JOBS", "2"))
+
+STATE_FILE = ".watcher-state.json"
+_EXTENSIONS = (".xlsx", ".xlsm")
+
+OK, PARTIAL, FAILED = "ok", "partial", "failed"
+_STATUS = {EXIT_OK: OK, EXIT_FAILED: FAILED, EXIT_INPUT: FAILED}
+
+
+def is_candidate(name: str) -> bool:
+    """엑셀 파일만 (Office 잠금 파일 ~$..., 숨김/임시 파일 제외)"""
+    return (
+        name.lower().endswith(_EXTENSIONS)
+        and not name.startswith(("~$", "."))
+        and ".tmp" not in name.lower()
+    )
+
+
+class ProcessedState:
+    """처리한 입력 {키: 기록(status 포함)} — JSON 파일에 원자적으로 저장"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries: Dict[str, Dict] = json.load(f).get("processed", {})
+        except FileNotFoundError:
+            self.entries = {}
+
+    def __contains__(self, key: str) -> bool:
+        """성공(ok)한 입력만 처리한 것으로 본다 (failed/partial 은 다시 처리)"""
+        with self.lock:
+            entry = self.entries.get(key)
+        return entry is not None and entry.get("status") == OK
+
+    def record(self, key: str, entry: Dict):
+        with self.lock:
+            self.entries[key] = entry
+            payload = json.dumps({"processed": self.entries}, ensure_ascii=False, indent=1)
+        write_atomic(self.path, lambda f: f.write(payload.encode("utf-8")))
+
+
+class Watcher:
+    """
+    입력 폴더의 엑셀 파일을 안정화(debounce) → 중복 확인 → 작업 스레드 jobs 개로 생성.
+    같은 파일을 다시 쓰면 내용 해시가 바뀌므로 새로 처리한다.
+    """
+
+    def __init__(
+        self,
+        in_dir: str,
+        out_dir: str,
+        docx: bytes,
+        args: argparse.Namespace,
+        pool: Optional[ConverterPool] = None,
+        jobs: int = WATCH_JOBS,
+        settle: float = WATCH_SETTLE,
+        poll: float = WATCH_POLL,
+        state_path: Optional[str] = None,
+    ):
+        self.in_dir = in_dir
+        self.out_dir = out_dir
+        self.docx = docx
+        self.args = args
+        self.pool = pool
+        self.settle = settle
+        self.poll = poll
+        self.state = ProcessedState(state_path or os.path.join(out_dir, STATE_FILE))
+        self.jobs = max(1, jobs)
+        self.executor = ThreadPoolExecutor(self.jobs, thread_name_prefix="watch")
+        # 이름 → (크기, 수정 시각, 그 상태를 처음 본 시각 — 작업에 넘겼으면 None)
+        self.sizes: Dict[str, Tuple[int, int, Optional[float]]] = {}
+        self.inflight: Set[str] = set()  # 작업 중인 파일 이름
+        self.claimed: Set[str] = set()  # 작업 중인 입력 키
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        # 템플릿 내용과 결과에 영향을 주는 옵션이 같아야 같은 처리로 본다
+        self.options = result_key(
+            content_hash(docx), args.sheet or "", args.name, args.engine, args.batch,
+            args.start_row, args.name_col or "", args.no_pdf, args.merge_pdf, args.zip,
+        )  # --previous/--full 은 결과가 아닌 재사용 여부만 바꾸므로 제외
+
+    def log(self, text: str):
+        print(f"{datetime.now():%Y-%m-%d %H:%M:%S} {text}", file=sys.stderr, flush=True)
+
+    # ---------- 폴더 감시 ---------- #
+
+    def scan(self) -> bool:
+        """안정된 새 파일을 작업에 넘긴다. 아직 안정되지 않은 파일이 있으면 True"""
+        now = time.monotonic()
+        unsettled = False
+        seen = set()
+        try:
+            entries = list(os.scandir(self.in_dir))
+        except OSError as e:
+            self.log(f"입력 폴더를 읽을 수 없습니다: {e}")
+            return False
+        for entry in entries:
+            if not is_candidate(entry.name) or not entry.is_file():
+                continue
+            seen.add(entry.name)
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            size, mtime = st.st_size, st.st_mtime_ns
+            prev = self.sizes.get(entry.name)
+            if prev is None or prev[:2] != (size, mtime):
+                self.sizes[entry.name] = (size, mtime, now)
+                prev = self.sizes[entry.name]
+            if prev[2] is None:
+                continue  # 이미 작업에 넘긴 내용 그대로
+            if now - prev[2] < self.settle or size == 0:
+                unsettled = True
+                continue
+            with self.lock:
+                if entry.name in self.inflight:
+                    unsettled = True
+                    continue
+                self.inflight.add(entry.name)
+            self.sizes[entry.name] = (size, mtime, None)
+            self.executor.submit(self.process, entry.name)
+        for name in set(self.sizes) - seen:
+            del self.sizes[name]
+        return unsettled
+
+    def run(self):
+        mode = "inotify" if INotify is not None else f"{self.poll:g}초 주기 폴링"
+        self.log(f"{self.in_dir} 감시 시작 ({mode}, 동시 {self.jobs}건)")
+        inotify = None
+        if INotify is not None:
+            try:
+                inotify = INotify()
+                inotify.add_watch(
+                    self.in_dir,
+                    inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE
+                    | inotify_flags.MODIFY | inotify_flags.DELETE | inotify_flags.MOVED_FROM,
+                )
+            except OSError as e:  # 네트워크 드라이브 등 inotify 를 못 쓰는 경우
+                self.log(f"inotify 를 쓸 수 없어 폴링합니다: {e}")
+                inotify = None
+        try:
+            unsettled = True
+            while not self.stop.is_set():
+                if unsettled or inotify is None:
+                    unsettled = self.scan()
+                if inotify is None:
+                    self.stop.wait(min(self.poll, self.settle) if unsettled else self.poll)
+                    continue
+                # 안정화를 기다리는 파일이 있으면 그 시간만큼만 기다렸다가 다시 훑는다
+                timeout = self.settle if unsettled else self.poll
+                unsettled = bool(inotify.read(timeout=int(timeout * 1000))) or unsettled
+        finally:
+            if inotify is not None:
+                inotify.close()
+            self.executor.shutdown(wait=True)
+
+    # ---------- 생성 ---------- #
+
+    def process(self, name: str):
+        path = os.path.join(self.in_dir, name)
+        try:
+            xlsx = read_input(path, "엑셀")
+            key = result_key(content_hash(xlsx), self.options)
+            with self.lock:
+                # 같은 내용의 파일이 동시에 들어와도 한 번만 만든다
+                if key in self.state or key in self.claimed:
+                    key = None
+                else:
+                    self.claimed.add(key)
+            if key is None:
+                self.log(f"{name}: 이미 처리한 내용이라 건너뜀")
+                return
+            try:
+                self.log(f"{name}: 생성 시작")
+                status, entry = self._generate(name, xlsx)
+                self.state.record(key, entry)
+            finally:
+                with self.lock:
+                    self.claimed.discard(key)
+            detail = entry.get("error") or f"{entry.get('documents', 0)}건"
+            self.log(f"{name}: {status} — {detail}, {entry['seconds']}초")
+        except Exception as e:
+            self.log(f"{name}: 처리 실패 ({e!r})")
+        finally:
+            with self.lock:
+                self.inflight.discard(name)
+
+    def _generate(self, name: str, xlsx: bytes) -> Tuple[str, Dict]:
+        started = time.perf_counter()
+        job = ConsoleJob(name, quiet=True)
+        entry: Dict = {"file": name, "finished": None, "outputs": []}
+        out_dir = os.path.join(self.out_dir, safe_filename(os.path.splitext(name)[0]))
+        try:
+            # 같은 이름의 워크북을 고쳐서 다시 넣으면 바뀐 문서만 다시 만든다
+            previous = find_previous(self.args, out_dir)
+            summary = generate(job, xlsx, self.docx, self.args, self.pool, previous)
+            code = exit_code(summary)
+            entry.update(summary)
+            if job.result is None:
+                code = EXIT_FAILED
+            else:
+                entry["outputs"] = [
+                    os.path.relpath(p, self.out_dir) for p in save_outputs(job, out_dir, self.args.zip)
+                ]
+        except InvalidFileException as e:
+            code, entry["error"] = EXIT_INPUT, str(e)
+        except Exception as e:
+            code, entry["error"] = EXIT_FAILED, repr(e)
+        finally:
+            BLOB_STORE.release(job.id)
+        notes = [text for level, text in job.notes if level in ("warning", "error")]
+        if notes:
+            entry["notes"] = notes
+        status = _STATUS.get(code, PARTIAL)
+        entry["status"] = status
+        entry["finished"] = datetime.now().isoformat(timespec="seconds")
+        entry["seconds"] = round(time.perf_counter() - started, 2)
+        return status, entry
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="입력 폴더의 엑셀 파일로 문서를 자동 생성")
+    parser.add_argument("--in", dest="in_dir", required=True, help="감시할 입력 폴더")
+    parser.add_argument("--out", required=True, help="결과를 저장할 폴더")
+    add_generation_args(parser)
+    parser.add_argument("--jobs", type=int, default=WATCH_JOBS, help="동시에 처리할 입력 파일 수")
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE, help="파일 안정화 대기(초)")
+    parser.add_argument("--poll", type=float, default=WATCH_POLL, help="폴링 주기(초)")
+    parser.add_argument("--state", help=f"처리 기록 파일 (기본: <out>/{STATE_FILE})")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_generation_args(parser, args)
+    if not os.path.isdir(args.in_dir):
+        parser.error(f"입력 폴더가 없습니다: {args.in_dir}")
+    try:
+        docx = read_input(args.docx, "워드 템플릿")
+    except InvalidFileException as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return EXIT_INPUT
+    os.makedirs(args.out, exist_ok=True)
+
+    pool = None if args.no_pdf else converter.start_pool()
+    watcher = Watcher(
+        args.in_dir, args.out, docx, args, pool,
+        jobs=args.jobs, settle=args.settle, poll=args.poll, state_path=args.state,
+    )
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: watcher.stop.set())
+    watcher.run()
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import copy
+import io
+import posixpath
+import shutil
+import struct
+import sys
+import zipfile
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Set, Tuple
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+from docx.oxml.ns import nsmap, qn
+from docx.oxml.parser import element_class_lookup
+from docx.oxml.simpletypes import ST_Merge
+from docx.text.paragraph import Paragraph
+from lxml import etree
+
+from engine import (
+    ROW_TOKEN_RE,
+    TOKEN_RE,
+    Data,
+    make_replacer,
+    no_stage,
+    open_data,
+    replace_in_paragraph,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+_W_P = qn("w:p")
+_W_TC = qn("w:tc")
+_W_TR = qn("w:tr")
+_W_TBL = qn("w:tbl")
+_ROOT_TAGS = {qn("w:body"), qn("w:hdr"), qn("w:ftr")}
+_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_OFFICE_DOCUMENT = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+)
+
+
+# ---------- XML 파트 스트리밍 ---------- #
+
+def _in_scope(p) -> bool:
+    """
+    replace_everywhere 가 보는 문단인지:
+    본문/머리글/바닥글 바로 아래, 또는 (중첩) 표 셀 바로 아래 문단.
+    세로 병합의 연속 셀(vMerge=continue)은 python-docx 도 건너뛰므로 제외.
+    """
+    parent = p.getparent()
+    while parent is not None:
+        if parent.tag in _ROOT_TAGS:
+            return True
+        if parent.tag != _W_TC or parent.vMerge == ST_Merge.CONTINUE:
+            return False
+        tr = parent.getparent()
+        tbl = tr.getparent() if tr is not None else None
+        if tr is None or tr.tag != _W_TR or tbl is None or tbl.tag != _W_TBL:
+            return False
+        parent = tbl.getparent()
+    return False
+
+
+def stream_part(fp, on_paragraph: Callable[[Any], bool]) -> Tuple[Any, bool]:
+    """
+    XML 파트를 청크 단위로 pull parser 에 흘려 넣고, 문단(w:p)이 닫힐 때마다
+    on_paragraph 를 호출한다. (루트 요소, 변경 여부) 를 돌려준다.
+    python-docx 와 같은 요소 클래스/공백 처리를 써서 직렬화 결과가 동일하다.
+    """
+    parser = etree.XMLPullParser(
+        events=("end",), tag=_W_P, remove_blank_text=True, resolve_entities=False
+    )
+    parser.set_element_class_lookup(element_class_lookup)
+    changed = False
+
+    def _drain():
+        nonlocal changed
+        for _, p in parser.read_events():
+            if _in_scope(p) and on_paragraph(p):
+                changed = True
+
+    while True:
+        chunk = fp.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        _drain()
+    root = parser.close()
+    _drain()
+    return root, changed
+
+
+def _serialize(root) -> bytes:
+    # docx.opc.oxml.serialize_part_xml 과 동일
+    return etree.tostring(root, encoding="UTF-8", standalone=True)
+
+
+# ---------- ZIP 원본 복사 ---------- #
+
+# 압축 데이터를 그대로 옮기는 빠른 경로는 zipfile 내부 속성(_writecheck, start_dir, _didModify,
+# NameToInfo)에 기대므로 확인한 버전에서만 쓰고, 그 밖에는 공개 API 로 다시 압축해 복사한다
+_RAW_COPY = (3, 6) <= sys.version_info[:2] <= (3, 13)
+_RAW_ATTRS = ("_writecheck", "start_dir", "_didModify", "NameToInfo", "fp", "filelist")
+
+
+def copy_member_raw(src: ZipFile, info: ZipInfo, dst: ZipFile):
+    """src 의 멤버를 dst 로 복사 (가능하면 압축을 풀지 않고 압축 데이터 그대로)"""
+    if _RAW_COPY and all(hasattr(dst, name) for name in _RAW_ATTRS):
+        _copy_compressed(src, info, dst)
+    else:
+        copy_member(src, info, dst)
+
+
+def copy_member(src: ZipFile, info: ZipInfo, dst: ZipFile):
+    """공개 API(ZipFile.open 읽기/쓰기)로 멤버를 스트리밍 복사 — 같은 이름/시각/압축 방식/속성"""
+    zinfo = ZipInfo(info.filename, date_time=info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.comment = info.comment
+    zinfo.create_system = info.create_system
+    zinfo.external_attr = info.external_attr
+    zinfo.file_size = info.file_size
+    with src.open(info) as fin, dst.open(
+        zinfo, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT
+    ) as fout:
+        shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+
+
+def _copy_compressed(src: ZipFile, info: ZipInfo, dst: ZipFile):
+    """압축을 풀지 않고 로컬 헤더 뒤의 압축 데이터를 그대로 옮겨 쓴다"""
+    src.fp.seek(info.header_offset)
+    header = src.fp.read(zipfile.sizeFileHeader)
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    src.fp.seek(info.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+    raw = src.fp.read(info.compress_size)
+
+    zinfo = copy.copy(info)
+    zinfo.flag_bits &= ~0x08  # 크기/CRC 를 로컬 헤더에 바로 기록 (data descriptor 없음)
+    # zipfile 에 raw 쓰기 API 가 없어 ZipFile.open("w") 와 같은 절차를 직접 밟는다
+    dst.fp.seek(dst.start_dir)
+    zinfo.header_offset = dst.fp.tell()
+    dst._writecheck(zinfo)
+    dst._didModify = True
+    dst.fp.write(zinfo.FileHeader())
+    dst.fp.write(raw)
+    dst.start_dir = dst.fp.tell()
+    dst.filelist.append(zinfo)
+    dst.NameToInfo[zinfo.filename] = zinfo
+
+
+# ---------- 템플릿 ---------- #
+
+def _rels(zf: ZipFile, rels_name: str, base: str) -> Dict[str, str]:
+    """관계 파일의 {Id: 파트 경로}"""
+    try:
+        root = etree.fromstring(zf.read(rels_name))
+    except KeyError:
+        return {}
+    targets = {}
+    for rel in root.iterfind(f"{{{_REL_NS}}}Relationship"):
+        target = rel.get("Target", "")
+        if rel.get("TargetMode") == "External":
+            continue
+        if target.startswith("/"):
+            targets[rel.get("Id")] = target.lstrip("/")
+        else:
+            targets[rel.get("Id")] = posixpath.normpath(posixpath.join(base, target))
+    return targets
+
+
+def main_part_name(zf: ZipFile) -> str:
+    """패키지 관계(_rels/.rels)에서 본문 파트 경로를 찾는다"""
+    try:
+        root = etree.fromstring(zf.read("_rels/.rels"))
+    except KeyError:
+        return "word/document.xml"
+    for rel in root.iterfind(f"{{{_REL_NS}}}Relationship"):
+        if rel.get("Type") == _OFFICE_DOCUMENT:
+            return rel.get("Target", "").lstrip("/")
+    return "word/document.xml"
+
+
+class XmlTemplate:
+    """
+    python-docx 객체 모델 없이 DOCX zip 을 직접 다루는 치환 엔진.
+    - 본문/기본 머리글·바닥글 XML 을 pull parser 로 스트리밍하며 문단 단위로 치환
+      (run 에 나뉜 토큰 포함, 치환 규칙은 replace_in_paragraph 와 동일)
+    - 치환이 없는 파트와 미디어/스타일 등은 압축 데이터 그대로 복사
+    CompiledTemplate 과 같은 인터페이스(addrs, cols, render)를 가진다.
+    """
+
+    kind = "xml"
+
+    def __init__(self, docx_bytes: Data):
+        self.data = docx_bytes
+        self.size = len(docx_bytes)
+        with open_data(docx_bytes) as f, ZipFile(f) as zf:
+            self.main_part = main_part_name(zf)
+            self.parts: List[str] = [self.main_part] + self._header_footer_parts(zf)
+
+            self.addrs: Set[str] = set()
+            self.cols: Set[str] = set()
+            for name in self.parts:
+                with zf.open(name) as fp:
+                    stream_part(fp, self._scan)
+
+    def _header_footer_parts(self, zf: ZipFile) -> List[str]:
+        """각 섹션의 기본(default) 머리글/바닥글 파트 (python-docx section.header/footer 와 동일)"""
+        base = posixpath.dirname(self.main_part)
+        rels_name = posixpath.join(base, "_rels", posixpath.basename(self.main_part) + ".rels")
+        targets = _rels(zf, rels_name, base)
+
+        root = etree.fromstring(zf.read(self.main_part))
+        names: List[str] = []
+        refs = root.xpath(
+            "./w:body/w:p/w:pPr/w:sectPr/*[self::w:headerReference or self::w:footerReference]"
+            " | ./w:body/w:sectPr/*[self::w:headerReference or self::w:footerReference]",
+            namespaces={"w": nsmap["w"]},
+        )
+        for ref in refs:
+            if ref.get(qn("w:type"), "default") != "default":
+                continue
+            name = targets.get(ref.get(qn("r:id")))
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    def _scan(self, p) -> bool:
+        text = Paragraph(p, None).text
+        if "{{" in text:
+            self.addrs.update(m.group(1) for m in TOKEN_RE.finditer(text))
+            self.cols.update(m.group(1) for m in ROW_TOKEN_RE.finditer(text))
+        return False
+
+    def tokens(self) -> Tuple[Set[str], Set[str]]:
+        """(고정 셀 주소, 행 기준 열) 집합"""
+        return set(self.addrs), set(self.cols)
+
+    def render(
+        self,
+        cells: Dict[str, Any],
+        row: Optional[Dict[str, Any]] = None,
+        stage: Callable[..., ContextManager] = no_stage,
+    ) -> bytes:
+        """파트 스트리밍/치환은 "치환", 직렬화와 zip 쓰기는 "DOCX 저장" 단계로 기록"""
+        repl_func = make_replacer(cells, row)
+
+        def _replace(p) -> bool:
+            paragraph = Paragraph(p, None)
+            before = paragraph.text
+            replace_in_paragraph(paragraph, repl_func)
+            return paragraph.text != before
+
+        out = io.BytesIO()
+        with open_data(self.data) as f, ZipFile(f) as src, ZipFile(out, "w", ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                if info.filename in self.parts:
+                    with stage("치환"), src.open(info) as fp:
+                        root, changed = stream_part(fp, _replace)
+                    if changed:
+                        with stage("DOCX 저장"):
+                            zinfo = ZipInfo(info.filename, date_time=info.date_time)
+                            zinfo.compress_type = ZIP_DEFLATED
+                            dst.writestr(zinfo, _serialize(root))
+                        continue
+                with stage("DOCX 저장"):
+                    copy_member_raw(src, info, dst)
+        with stage("DOCX 저장") as rec:
+            data = out.getvalue()
+            rec["bytes_out"] = len(data)
+        return data